@@ -0,0 +1,83 @@
+"""add hot path indexes
+
+Revision ID: 18a51ce5e3bb
+Revises: da621f4fdb32
+Create Date: 2026-10-19 14:40:12.301945
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "18a51ce5e3bb"
+down_revision = "da621f4fdb32"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Nothing stopped duplicate configs from being created before, so
+    # keep the oldest config for each (channel, user) pair before
+    # adding the constraint
+    op.execute(
+        """
+        DELETE FROM user_channel_configs duplicate
+        USING user_channel_configs original
+        WHERE duplicate.channel_id = original.channel_id
+          AND duplicate.user_id = original.user_id
+          AND duplicate.id > original.id
+        """
+    )
+    op.create_unique_constraint(
+        "uq_user_channel_configs_channel_id_user_id",
+        "user_channel_configs",
+        ["channel_id", "user_id"],
+    )
+
+    # assigned_reviews only ever grows, so build these without locking
+    # out writes. CONCURRENTLY can't run inside a transaction.
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_assigned_reviews_pr_url",
+            "assigned_reviews",
+            ["pr_url"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_assigned_reviews_assignee_id_completed_at",
+            "assigned_reviews",
+            ["assignee_id", "completed_at"],
+            postgresql_concurrently=True,
+        )
+        op.create_index(
+            "ix_assigned_reviews_active_assignee_id",
+            "assigned_reviews",
+            ["assignee_id", "assigned_at"],
+            postgresql_where=sa.text("completed_at IS NULL"),
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_assigned_reviews_active_assignee_id",
+            table_name="assigned_reviews",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_assigned_reviews_assignee_id_completed_at",
+            table_name="assigned_reviews",
+            postgresql_concurrently=True,
+        )
+        op.drop_index(
+            "ix_assigned_reviews_pr_url",
+            table_name="assigned_reviews",
+            postgresql_concurrently=True,
+        )
+    op.drop_constraint(
+        "uq_user_channel_configs_channel_id_user_id",
+        "user_channel_configs",
+        type_="unique",
+    )
@@ -0,0 +1,58 @@
+"""add pull requests
+
+Revision ID: 7c2e9a41d0b6
+Revises: 18a51ce5e3bb
+Create Date: 2026-10-19 15:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "7c2e9a41d0b6"
+down_revision = "18a51ce5e3bb"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "pull_requests",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("owner", sa.String(255), nullable=False),
+        sa.Column("repo", sa.String(255), nullable=False),
+        sa.Column("number", sa.Integer, nullable=False),
+        sa.Column("html_url", sa.String(1024), nullable=False),
+        sa.Column("author_login", sa.String(255), nullable=False),
+        sa.Column("title", sa.String(1024), nullable=True),
+        sa.Column("state", sa.String(32), nullable=False),
+        sa.Column("head_sha", sa.String(40), nullable=True),
+        sa.Column("fetched_at", sa.DateTime, nullable=False),
+        sa.UniqueConstraint(
+            "owner", "repo", "number", name="uq_pull_requests_owner_repo_number"
+        ),
+    )
+    # Existing assignments are left unlinked, since filling in the rows
+    # would need a GitHub fetch per PR. The bot links one the first time
+    # it is rerolled; completed ones stay unlinked.
+    op.add_column(
+        "assigned_reviews",
+        sa.Column(
+            "pull_request_id",
+            sa.Integer,
+            sa.ForeignKey("pull_requests.id"),
+            nullable=True,
+        ),
+    )
+    op.create_index(
+        "ix_assigned_reviews_pull_request_id",
+        "assigned_reviews",
+        ["pull_request_id"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_assigned_reviews_pull_request_id", table_name="assigned_reviews")
+    op.drop_column("assigned_reviews", "pull_request_id")
+    op.drop_table("pull_requests")
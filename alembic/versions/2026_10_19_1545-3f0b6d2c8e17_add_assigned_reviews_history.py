@@ -0,0 +1,69 @@
+"""add assigned reviews history
+
+Revision ID: 3f0b6d2c8e17
+Revises: 7c2e9a41d0b6
+Create Date: 2026-10-19 15:45:03.562190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "3f0b6d2c8e17"
+down_revision = "7c2e9a41d0b6"
+branch_labels = None
+depends_on = None
+
+COLUMNS = (
+    "id, assignee_id, requestor_id, channel_id, pull_request_id, pr_url, "
+    "assigned_at, acknowledged_at, rerolled_at, completed_at"
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        "assigned_reviews_history",
+        sa.Column("id", sa.Integer, primary_key=True, autoincrement=False),
+        sa.Column("assignee_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column(
+            "requestor_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False
+        ),
+        sa.Column("channel_id", sa.Integer, sa.ForeignKey("channels.id")),
+        sa.Column(
+            "pull_request_id",
+            sa.Integer,
+            sa.ForeignKey("pull_requests.id"),
+            nullable=True,
+        ),
+        sa.Column("pr_url", sa.String(1024), nullable=False),
+        sa.Column("assigned_at", sa.DateTime, nullable=False),
+        sa.Column("acknowledged_at", sa.DateTime, nullable=True),
+        sa.Column("rerolled_at", sa.DateTime, nullable=True),
+        sa.Column("completed_at", sa.DateTime, nullable=True),
+    )
+    op.create_index(
+        "ix_assigned_reviews_history_assigned_at",
+        "assigned_reviews_history",
+        ["assigned_at"],
+    )
+    op.execute(
+        "CREATE VIEW assigned_reviews_all AS "
+        f"SELECT {COLUMNS}, false AS archived FROM assigned_reviews "
+        "UNION ALL "
+        f"SELECT {COLUMNS}, true AS archived FROM assigned_reviews_history"
+    )
+
+
+def downgrade() -> None:
+    # Put archived rows back so that downgrading doesn't lose history
+    op.execute(
+        f"INSERT INTO assigned_reviews ({COLUMNS}) "
+        f"SELECT {COLUMNS} FROM assigned_reviews_history"
+    )
+    op.execute("DROP VIEW assigned_reviews_all")
+    op.drop_index(
+        "ix_assigned_reviews_history_assigned_at",
+        table_name="assigned_reviews_history",
+    )
+    op.drop_table("assigned_reviews_history")
@@ -0,0 +1,41 @@
+"""add open review counts
+
+Revision ID: b94d1e07a3c5
+Revises: 3f0b6d2c8e17
+Create Date: 2026-10-19 16:20:51.774020
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b94d1e07a3c5"
+down_revision = "3f0b6d2c8e17"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "user_channel_configs",
+        sa.Column("open_reviews", sa.Integer, nullable=False, server_default="0"),
+    )
+    op.execute(
+        """
+        UPDATE user_channel_configs
+        SET open_reviews = actual.open_reviews
+        FROM (
+            SELECT assignee_id, channel_id, count(*) AS open_reviews
+            FROM assigned_reviews
+            WHERE completed_at IS NULL AND rerolled_at IS NULL
+            GROUP BY assignee_id, channel_id
+        ) actual
+        WHERE user_channel_configs.user_id = actual.assignee_id
+          AND user_channel_configs.channel_id = actual.channel_id
+        """
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("user_channel_configs", "open_reviews")
@@ -0,0 +1,34 @@
+"""add channel assignment strategy
+
+Revision ID: 5e8a0c3f61d2
+Revises: b94d1e07a3c5
+Create Date: 2026-10-19 17:05:22.904117
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "5e8a0c3f61d2"
+down_revision = "b94d1e07a3c5"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "channels",
+        sa.Column("assignment_strategy", sa.String(32), nullable=True),
+    )
+    op.add_column(
+        "channels",
+        sa.Column(
+            "round_robin_cursor", sa.Integer, nullable=False, server_default="0"
+        ),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("channels", "round_robin_cursor")
+    op.drop_column("channels", "assignment_strategy")
@@ -0,0 +1,48 @@
+"""add assignment dashboard indexes
+
+Revision ID: a4d7e2b91c58
+Revises: 5e8a0c3f61d2
+Create Date: 2026-10-19 17:50:41.381207
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "a4d7e2b91c58"
+down_revision = "5e8a0c3f61d2"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_assigned_reviews_assigned_at_id": ["assigned_at", "id"],
+    "ix_assigned_reviews_channel_id_assigned_at_id": [
+        "channel_id",
+        "assigned_at",
+        "id",
+    ],
+    "ix_assigned_reviews_assignee_id_assigned_at_id": [
+        "assignee_id",
+        "assigned_at",
+        "id",
+    ],
+}
+
+
+def upgrade() -> None:
+    # assigned_reviews only ever grows, so build these without locking
+    # out writes. CONCURRENTLY can't run inside a transaction.
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(
+                name, "assigned_reviews", columns, postgresql_concurrently=True
+            )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name in reversed(INDEXES):
+            op.drop_index(
+                name, table_name="assigned_reviews", postgresql_concurrently=True
+            )
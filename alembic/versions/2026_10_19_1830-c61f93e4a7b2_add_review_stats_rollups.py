@@ -0,0 +1,81 @@
+"""add review stats rollups
+
+Revision ID: c61f93e4a7b2
+Revises: a4d7e2b91c58
+Create Date: 2026-10-19 18:30:12.402871
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "c61f93e4a7b2"
+down_revision = "a4d7e2b91c58"
+branch_labels = None
+depends_on = None
+
+
+# Fill them in afterwards with
+#
+#     python -mslacker.jobs backfill-review-stats
+def upgrade() -> None:
+    op.create_table(
+        "review_stats_daily",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("day", sa.Date, nullable=False),
+        sa.Column(
+            "channel_id", sa.Integer, sa.ForeignKey("channels.id"), nullable=False
+        ),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("assigned", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("acknowledged", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("rerolled", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("completed", sa.Integer, nullable=False, server_default="0"),
+        sa.Column("acknowledge_seconds", sa.Float, nullable=False, server_default="0"),
+        sa.Column("complete_seconds", sa.Float, nullable=False, server_default="0"),
+        sa.UniqueConstraint(
+            "day",
+            "channel_id",
+            "user_id",
+            name="uq_review_stats_daily_day_channel_id_user_id",
+        ),
+    )
+    op.create_index(
+        "ix_review_stats_daily_user_id_day", "review_stats_daily", ["user_id", "day"]
+    )
+    op.create_table(
+        "review_stats_histograms",
+        sa.Column("id", sa.Integer, primary_key=True),
+        sa.Column("day", sa.Date, nullable=False),
+        sa.Column(
+            "channel_id", sa.Integer, sa.ForeignKey("channels.id"), nullable=False
+        ),
+        sa.Column("user_id", sa.Integer, sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("metric", sa.String(16), nullable=False),
+        sa.Column("bucket", sa.Integer, nullable=False),
+        sa.Column("count", sa.Integer, nullable=False),
+        sa.UniqueConstraint(
+            "day",
+            "channel_id",
+            "user_id",
+            "metric",
+            "bucket",
+            name="uq_review_stats_histograms_day_channel_id_user_id_metric_bucket",
+        ),
+    )
+    op.create_index(
+        "ix_review_stats_histograms_user_id_day",
+        "review_stats_histograms",
+        ["user_id", "day"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_review_stats_histograms_user_id_day", table_name="review_stats_histograms"
+    )
+    op.drop_table("review_stats_histograms")
+    op.drop_index("ix_review_stats_daily_user_id_day", table_name="review_stats_daily")
+    op.drop_table("review_stats_daily")
@@ -0,0 +1,37 @@
+"""add slack event deliveries
+
+Revision ID: e2b8d54c1f93
+Revises: c61f93e4a7b2
+Create Date: 2026-10-19 19:10:47.215630
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "e2b8d54c1f93"
+down_revision = "c61f93e4a7b2"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "slack_event_deliveries",
+        sa.Column("event_id", sa.String(64), primary_key=True),
+        sa.Column("received_at", sa.DateTime, nullable=False),
+    )
+    op.create_index(
+        "ix_slack_event_deliveries_received_at",
+        "slack_event_deliveries",
+        ["received_at"],
+    )
+
+
+def downgrade() -> None:
+    op.drop_index(
+        "ix_slack_event_deliveries_received_at", table_name="slack_event_deliveries"
+    )
+    op.drop_table("slack_event_deliveries")
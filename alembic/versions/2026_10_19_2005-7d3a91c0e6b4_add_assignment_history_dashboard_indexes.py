@@ -0,0 +1,66 @@
+"""add assignment history dashboard indexes
+
+Revision ID: 7d3a91c0e6b4
+Revises: e2b8d54c1f93
+Create Date: 2026-10-19 20:05:12.480391
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "7d3a91c0e6b4"
+down_revision = "e2b8d54c1f93"
+branch_labels = None
+depends_on = None
+
+INDEXES = {
+    "ix_assigned_reviews_history_assigned_at_id": ["assigned_at", "id"],
+    "ix_assigned_reviews_history_channel_id_assigned_at_id": [
+        "channel_id",
+        "assigned_at",
+        "id",
+    ],
+    "ix_assigned_reviews_history_assignee_id_assigned_at_id": [
+        "assignee_id",
+        "assigned_at",
+        "id",
+    ],
+}
+
+
+def upgrade() -> None:
+    # The archive job keeps inserting into assigned_reviews_history, so
+    # build these without locking it out. The (assigned_at, id) index
+    # makes the old assigned_at one redundant.
+    with op.get_context().autocommit_block():
+        for name, columns in INDEXES.items():
+            op.create_index(
+                name,
+                "assigned_reviews_history",
+                columns,
+                postgresql_concurrently=True,
+            )
+        op.drop_index(
+            "ix_assigned_reviews_history_assigned_at",
+            table_name="assigned_reviews_history",
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_assigned_reviews_history_assigned_at",
+            "assigned_reviews_history",
+            ["assigned_at"],
+            postgresql_concurrently=True,
+        )
+        for name in reversed(INDEXES):
+            op.drop_index(
+                name,
+                table_name="assigned_reviews_history",
+                postgresql_concurrently=True,
+            )
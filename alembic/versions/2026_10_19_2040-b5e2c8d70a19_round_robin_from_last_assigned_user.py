@@ -0,0 +1,44 @@
+"""round robin from last assigned user
+
+Revision ID: b5e2c8d70a19
+Revises: 7d3a91c0e6b4
+Create Date: 2026-10-19 20:40:33.918275
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "b5e2c8d70a19"
+down_revision = "7d3a91c0e6b4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "channels",
+        sa.Column(
+            "round_robin_last_user_id",
+            sa.Integer,
+            sa.ForeignKey(
+                "users.id",
+                name="channels_round_robin_last_user_id_fkey",
+                ondelete="SET NULL",
+            ),
+            nullable=True,
+        ),
+    )
+    # A count of assignments doesn't say who was last, so rotations
+    # start again from the lowest user id
+    op.drop_column("channels", "round_robin_cursor")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "channels",
+        sa.Column("round_robin_cursor", sa.Integer, nullable=False, server_default="0"),
+    )
+    op.drop_column("channels", "round_robin_last_user_id")
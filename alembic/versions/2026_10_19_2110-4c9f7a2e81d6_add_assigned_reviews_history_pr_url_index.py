@@ -0,0 +1,36 @@
+"""add assigned reviews history pr url index
+
+Revision ID: 4c9f7a2e81d6
+Revises: b5e2c8d70a19
+Create Date: 2026-10-19 21:10:05.662184
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "4c9f7a2e81d6"
+down_revision = "b5e2c8d70a19"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_assigned_reviews_history_pr_url",
+            "assigned_reviews_history",
+            ["pr_url"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_assigned_reviews_history_pr_url",
+            table_name="assigned_reviews_history",
+            postgresql_concurrently=True,
+        )
@@ -0,0 +1,49 @@
+"""link assignments to pull requests
+
+Revision ID: 9d3b6f0e2a57
+Revises: 4c9f7a2e81d6
+Create Date: 2026-10-19 21:20:41.318205
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = "9d3b6f0e2a57"
+down_revision = "4c9f7a2e81d6"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    # Assignments whose PR is already stored; the rest are linked by the
+    # bot when their PR is first fetched
+    pull_requests = sa.table("pull_requests", sa.column("id"), sa.column("html_url"))
+    for name in ("assigned_reviews", "assigned_reviews_history"):
+        assignments = sa.table(name, sa.column("pull_request_id"), sa.column("pr_url"))
+        op.execute(
+            sa.update(assignments)
+            .where(
+                assignments.c.pull_request_id.is_(None),
+                assignments.c.pr_url == pull_requests.c.html_url,
+            )
+            .values(pull_request_id=pull_requests.c.id)
+        )
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_assigned_reviews_history_pull_request_id",
+            "assigned_reviews_history",
+            ["pull_request_id"],
+            postgresql_concurrently=True,
+        )
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_assigned_reviews_history_pull_request_id",
+            table_name="assigned_reviews_history",
+            postgresql_concurrently=True,
+        )
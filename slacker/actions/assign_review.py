@@ -1,25 +1,62 @@
-from typing import Optional
+from typing import Optional, Sequence
 from sqlalchemy.orm import Session
-from dataclasses import dataclass
-from datetime import datetime
-import random
+from dataclasses import dataclass, field
+import logging
 
-from slacker.github import PullRequest
-from slacker.model import User, Channel, AssignedReview
+from slacker.model import User, Channel, PullRequest
 from slacker.data_broker import DataBroker
+from slacker.assignment_strategies import (
+    AssignmentStrategy,
+    DEFAULT_ASSIGNMENT_STRATEGY,
+    strategy_for_name,
+)
+
+# Nobody needs more approvals than this, and it stops a typo from
+# assigning the whole channel
+MAX_REVIEWERS_PER_PR = 5
 
 
 @dataclass
 class AssignReviewResult:
     messages: list[str]
-    reviewer: Optional[User]
+    reviewers: list[User] = field(default_factory=list)
+
+    @property
+    def reviewer(self) -> Optional[User]:
+        return self.reviewers[0] if self.reviewers else None
+
+
+# What AssignReview.prepare() works out about the request and channel
+@dataclass
+class AssignReviewContext:
+    requesting_user: User
+    channel: Channel
+    eligible_reviewers: list[User]
+    strategy: AssignmentStrategy
+    open_reviews: dict[int, int]
 
 
 class AssignReview:
     broker: DataBroker
+    default_strategy: str
 
-    def __init__(self, broker: DataBroker):
+    def __init__(
+        self, broker: DataBroker, default_strategy: str = DEFAULT_ASSIGNMENT_STRATEGY
+    ):
         self.broker = broker
+        self.default_strategy = default_strategy
+        self.logger = logging.getLogger(__name__)
+
+    def strategy_for_channel(self, channel: Channel) -> AssignmentStrategy:
+        name = channel.assignment_strategy or self.default_strategy
+        try:
+            return strategy_for_name(name, self.broker)
+        except ValueError:
+            self.logger.error(
+                f"Unknown assignment strategy {name!r} for {channel!r}, "
+                f"using {DEFAULT_ASSIGNMENT_STRATEGY}"
+            )
+            return strategy_for_name(DEFAULT_ASSIGNMENT_STRATEGY, self.broker)
 
     def perform(
         self,
@@ -27,9 +64,32 @@ class AssignReview:
         requestor_slack_id: str,
         channel_slack_id: str,
         pr: PullRequest,
+        reviewers: int = 1,
     ) -> AssignReviewResult:
-        result = AssignReviewResult(messages=[], reviewer=None)
+        results = self.perform_batch(
+            session, requestor_slack_id, channel_slack_id, [pr], reviewers
+        )
+        return results[0]
 
+    # Assigns reviewers to each of the PRs, computing the channel's
+    # eligible reviewers only once. Where possible each PR gets
+    # different reviewers.
+    def perform_batch(
+        self,
+        session: Session,
+        requestor_slack_id: str,
+        channel_slack_id: str,
+        prs: Sequence[PullRequest],
+        reviewers: int = 1,
+    ) -> list[AssignReviewResult]:
+        context = self.prepare(session, requestor_slack_id, channel_slack_id)
+        return self.assign(session, context, prs, reviewers)
+
+    # Everything that doesn't depend on the PRs, so that it can be done
+    # while they are still being fetched
+    def prepare(
+        self, session: Session, requestor_slack_id: str, channel_slack_id: str
+    ) -> AssignReviewContext:
         requesting_user = self.broker.fetch_user_by_slack_id_or_create_from_slack(
             session, requestor_slack_id
         )
@@ -37,72 +97,163 @@ class AssignReview:
             session, channel_slack_id
         )
 
-        if requesting_user.github_username is None:
-            requesting_user.github_username = pr.user.login
-            session.add(requesting_user)
-            result.messages.append(
-                f"Assuming that {requesting_user.name} is {pr.user.login} on github"
-            )
-
-        potential_reviewers = self.calculate_eligible_reviewers_in_channel(
+        eligible_reviewers = self.calculate_eligible_reviewers_in_channel(
             session, channel
         )
-        existing_assignments = self.broker.fetch_assignments_for_pr_url(
-            session, pr.html_url
+        # Users that were just created from slack need ids before we can
+        # look up their open review counts
+        session.flush()
+        strategy = self.strategy_for_channel(channel)
+        open_reviews: dict[int, int] = {}
+        if strategy.needs_open_reviews:
+            open_reviews = self.broker.fetch_open_review_counts(
+                session, channel, eligible_reviewers
+            )
+        return AssignReviewContext(
+            requesting_user, channel, eligible_reviewers, strategy, open_reviews
         )
-        assigned_users = [assignment.assignee for assignment in existing_assignments]
-
-        potential_reviewers = [
-            user
-            for user in potential_reviewers
-            if user != requesting_user
-            and user.github_username != pr.user.login
-            and user not in assigned_users
-        ]
 
-        if not any(potential_reviewers):
-            result.messages.append(f"No eligible reviewers for {pr.html_url}")
-            return result
+    def assign(
+        self,
+        session: Session,
+        context: AssignReviewContext,
+        prs: Sequence[PullRequest],
+        reviewers: int = 1,
+    ) -> list[AssignReviewResult]:
+        reviewers = max(1, min(reviewers, MAX_REVIEWERS_PER_PR))
+        results = []
+        requesting_user = context.requesting_user
+        channel = context.channel
+        eligible_reviewers = context.eligible_reviewers
+        strategy = context.strategy
+        open_reviews = context.open_reviews
+        chosen: list[User] = []
 
-        # this isn't for cryptography or security purposes, so B311
-        # doesn't apply
-        reviewer = random.choice(potential_reviewers)  # nosec B311
+        for pr in prs:
+            result = AssignReviewResult(messages=[])
+            results.append(result)
 
-        assign = AssignedReview(
-            assignee=reviewer,
-            requestor=requesting_user,
-            channel=channel,
-            pr_url=pr.html_url,
-            assigned_at=datetime.now(),
-        )
-        session.add(assign)
+            if requesting_user.github_username is None:
+                requesting_user.github_username = pr.author_login
+                session.add(requesting_user)
+                result.messages.append(
+                    f"Assuming that {requesting_user.name} is {pr.author_login} on github"
+                )
+
+            # Nobody gets the same PR twice, even once it's archived
+            assigned_ids = self.broker.fetch_assignee_ids_for_pull_request(session, pr)
+            excluded_ids = {requesting_user.id} | assigned_ids
 
-        result.reviewer = reviewer
-        return result
+            potential_reviewers = [
+                user
+                for user in eligible_reviewers
+                if user.id not in excluded_ids
+                and user.github_username != pr.author_login
+            ]
 
+            # Chosen again if another assignment in the channel changed
+            # the strategy's state (e.g. the round robin position) first
+            while True:
+                result.reviewers = self.choose_reviewers(
+                    session,
+                    channel,
+                    strategy,
+                    potential_reviewers,
+                    open_reviews,
+                    chosen,
+                    reviewers,
+                )
+                if not result.reviewers or strategy.assigned(
+                    session, channel, result.reviewers
+                ):
+                    break
+
+            if not result.reviewers:
+                result.messages.append(f"No eligible reviewers for {pr.html_url}")
+                continue
+
+            if len(result.reviewers) < reviewers:
+                result.messages.append(
+                    f"Only found {len(result.reviewers)} of {reviewers} reviewers for {pr.html_url}"
+                )
+
+            self.broker.create_assignments(
+                session,
+                assignees=result.reviewers,
+                requestor=requesting_user,
+                channel=channel,
+                pull_request=pr,
+            )
+            for reviewer in result.reviewers:
+                open_reviews[reviewer.id] = open_reviews.get(reviewer.id, 0) + 1
+            chosen += result.reviewers
+
+        return results
+
+    # Draws up to count distinct reviewers in the order the strategy
+    # ranks them, with anyone already chosen earlier in the batch moved
+    # to the back. Presence is only checked while walking down that
+    # ranking, so normally only about count users need a presence
+    # lookup.
+    def choose_reviewers(
+        self,
+        session: Session,
+        channel: Channel,
+        strategy: AssignmentStrategy,
+        candidates: list[User],
+        open_reviews: dict[int, int],
+        chosen: list[User],
+        count: int,
+    ) -> list[User]:
+        if not candidates:
+            return []
+
+        ranked = strategy.rank(session, channel, candidates, open_reviews, count)
+        # sorted() is stable, so this keeps the strategy's order otherwise
+        chosen_ids = {user.id for user in chosen}
+        ranked = sorted(ranked, key=lambda user: user.id in chosen_ids)
+
+        # Presence is looked up concurrently for as many users as are
+        # still needed, then for the next few if some of them were away
+        reviewers: list[User] = []
+        position = 0
+        while len(reviewers) < count and position < len(ranked):
+            window = ranked[position : position + count - len(reviewers)]
+            position += len(window)
+            presences = self.broker.get_user_presences_for_slack_ids(
+                [user.slack_id for user in window]
+            )
+            reviewers += [user for user, present in zip(window, presences) if present]
+
+        return reviewers
+
+    # Channel members that are reviewers in the channel, regardless of
+    # whether they are currently active. Answered from the broker's
+    # reviewer index when it has the channel, otherwise worked out from
+    # the channel's members and used to build the index.
     def calculate_eligible_reviewers_in_channel(
         self, session: Session, channel: Channel
     ) -> list[User]:
+        reviewer_ids = self.broker.reviewer_index.reviewers_in_channel(channel.id)
+        if reviewer_ids is not None:
+            return self.broker.fetch_users_by_ids(session, reviewer_ids)
+
         channel_members = self.broker.fetch_slack_user_ids_from_channel(channel)
-        print(f"channel_members = {channel_members}")
-        active_members = [
-            member
-            for member in channel_members
-            if self.broker.get_user_presence_for_slack_id(member)
-        ]
-        print(f"active_members = {active_members}")
         users = [
             self.broker.fetch_user_by_slack_id_or_create_from_slack(session, member)
-            for member in active_members
+            for member in channel_members
         ]
-        print(f"users = {users}")
         channel_configs = [
             self.broker.fetch_or_create_channel_config_for_user_in_channel(
                 session, user, channel
             )
             for user in users
         ]
-        print(f"channel_configs = {channel_configs}")
         reviewers = [config.user for config in channel_configs if config.reviewer]
-        print(f"reviewers = {reviewers}")
+
+        # Everything needs an id to go in the index
+        session.flush()
+        self.broker.reviewer_index.build(
+            channel.id, [user.id for user in users], [user.id for user in reviewers]
+        )
         return reviewers
@@ -0,0 +1,62 @@
+import logging
+from typing import Any
+
+from sqlalchemy.orm import Session
+
+from slacker.data_broker import DataBroker
+from slacker.github import PullRequestRecord
+
+# Reviews that count as having reviewed the PR. A plain comment is
+# often a question rather than a review, so doesn't.
+COMPLETING_REVIEW_STATES = {"approved", "changes_requested"}
+
+
+class HandleGitHubEvent:
+    broker: DataBroker
+
+    def __init__(self, broker: DataBroker):
+        self.broker = broker
+        self.logger = logging.getLogger(__name__)
+
+    # Handles a pull_request or pull_request_review webhook event,
+    # returning how many assignments it completed
+    def perform(self, session: Session, event: str, payload: dict[str, Any]) -> int:
+        pr_data = payload.get("pull_request")
+        if pr_data is None:
+            return 0
+        record = PullRequestRecord.from_json(pr_data)
+
+        pull_request = self.broker.fetch_pull_request_by_url(session, record.html_url)
+        if pull_request is not None:
+            self.broker.update_pull_request_from_github(pull_request, record)
+
+        active = self.broker.fetch_active_assignments_for_pr_url(
+            session, record.html_url
+        )
+        action = payload.get("action")
+
+        if event == "pull_request" and action == "closed":
+            finished = active
+        elif event == "pull_request_review" and action == "submitted":
+            review = payload.get("review") or {}
+            if review.get("state", "").lower() not in COMPLETING_REVIEW_STATES:
+                return 0
+            login = (review.get("user") or {}).get("login", "").lower()
+            finished = [
+                assignment
+                for assignment in active
+                if (assignment.assignee.github_username or "").lower() == login
+            ]
+        else:
+            return 0
+
+        completed = self.broker.complete_assignments(
+            session, [assignment.id for assignment in finished]
+        ).total()
+        self.logger.info(
+            f"{event} {action} for {record.html_url} completed {completed} assignments"
+        )
+        return completed
+
+
+__all__ = ["HandleGitHubEvent", "COMPLETING_REVIEW_STATES"]
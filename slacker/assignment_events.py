@@ -0,0 +1,156 @@
+import json
+import logging
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from queue import Full, Queue
+from threading import Event, Lock
+from typing import Any, Callable, Optional, Sequence
+
+from sqlalchemy import ARRAY, Text, bindparam, text
+from sqlalchemy.orm import Session
+
+from slacker.model import AssignedReview
+from slacker.notifications import NotificationListener
+
+# The Postgres channel assignment state changes are announced on
+NOTIFY_CHANNEL = "assignment_events"
+# Events a subscriber can fall behind by before it is dropped
+DEFAULT_BUFFER_SIZE = 100
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AssignmentEvent:
+    event: str
+    id: int
+    assignee_id: int
+    channel_id: Optional[int]
+    pr_url: str
+    at: datetime
+
+    @classmethod
+    def for_assignment(
+        cls, event: str, assignment: AssignedReview, at: datetime
+    ) -> "AssignmentEvent":
+        return cls(
+            event,
+            assignment.id,
+            assignment.assignee_id,
+            assignment.channel_id,
+            assignment.pr_url,
+            at,
+        )
+
+    def as_json(self) -> dict[str, Any]:
+        return {**asdict(self), "at": self.at.isoformat()}
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "AssignmentEvent":
+        return cls(**{**data, "at": datetime.fromisoformat(data["at"])})
+
+
+# Queues a notification for each event with one statement. Postgres
+# only delivers them when the transaction commits, so run it in the
+# same transaction as the state change and listeners never hear about
+# changes that were rolled back.
+def publish(session: Session, events: Sequence[AssignmentEvent]) -> None:
+    if not events:
+        return
+    statement = text(
+        "SELECT pg_notify(:channel, payload) FROM unnest(:payloads) AS payload"
+    ).bindparams(bindparam("payloads", type_=ARRAY(Text)))
+    session.execute(
+        statement,
+        {
+            "channel": NOTIFY_CHANNEL,
+            "payloads": [json.dumps(event.as_json()) for event in events],
+        },
+    )
+
+
+# One subscriber's view of the events, buffered up to a point
+class Subscription:
+    queue: Queue[AssignmentEvent]
+    matches: Callable[[AssignmentEvent], bool]
+    # Set once the subscriber has fallen too far behind and stopped
+    # getting events
+    dropped: bool
+
+    def __init__(
+        self,
+        buffer_size: int,
+        matches: Callable[[AssignmentEvent], bool] = lambda _event: True,
+    ):
+        self.queue = Queue(maxsize=buffer_size)
+        self.matches = matches
+        self.dropped = False
+
+
+# Listens for assignment events on a single database connection and
+# fans them out to any number of subscribers in this process, so that
+# watchers don't each need a connection or a polling loop. Nothing
+# blocks on a slow subscriber: one whose buffer is full is dropped.
+class AssignmentEventPublisher:
+    database_url: str
+    buffer_size: int
+    subscriptions: set[Subscription]
+    lock: Lock
+    listener: NotificationListener
+    listening: Event
+
+    def __init__(self, database_url: str, buffer_size: int = DEFAULT_BUFFER_SIZE):
+        self.database_url = database_url
+        self.buffer_size = buffer_size
+        self.subscriptions = set()
+        self.lock = Lock()
+        self.listener = NotificationListener(database_url, NOTIFY_CHANNEL, self.receive)
+        self.listening = self.listener.listening
+
+    # Starts listening the first time anyone subscribes
+    def subscribe(
+        self, matches: Callable[[AssignmentEvent], bool] = lambda _event: True
+    ) -> Subscription:
+        subscription = Subscription(self.buffer_size, matches)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        self.listener.start()
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription) -> None:
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def deliver(self, event: AssignmentEvent) -> None:
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+        for subscription in subscriptions:
+            if not subscription.matches(event):
+                continue
+            try:
+                subscription.queue.put_nowait(event)
+            except Full:
+                logger.warning(
+                    "Dropping an assignment event subscriber that fell behind"
+                )
+                subscription.dropped = True
+                self.unsubscribe(subscription)
+
+    def receive(self, payload: str) -> None:
+        try:
+            event = AssignmentEvent.from_json(json.loads(payload))
+        except (TypeError, ValueError):
+            logger.exception(f"Bad assignment event {payload!r}")
+            return
+        self.deliver(event)
+
+    def close(self) -> None:
+        self.listener.close()
+
+
+__all__ = [
+    "AssignmentEvent",
+    "AssignmentEventPublisher",
+    "Subscription",
+    "publish",
+]
@@ -0,0 +1,189 @@
+from abc import ABC, abstractmethod
+from bisect import bisect_right
+from typing import Optional, Protocol
+import random
+
+from sqlalchemy.orm import Session
+
+from slacker.model import User, Channel
+
+DEFAULT_ASSIGNMENT_STRATEGY = "random"
+
+
+# Where each channel's rotation is up to: the id of the last user it
+# assigned, or None if it hasn't assigned anyone yet. Advancing only
+# succeeds if the position is still the one that was fetched, so that
+# two assignments in a channel can't both pick whoever is next.
+class RoundRobinPositions(Protocol):
+    def fetch_round_robin_position(
+        self, session: Session, channel: Channel
+    ) -> Optional[int]: ...
+
+    def advance_round_robin_position(
+        self, session: Session, channel: Channel, seen: Optional[int], user_id: int
+    ) -> bool: ...
+
+
+# A strategy only decides the order in which candidates should be
+# offered a review; AssignReview walks that order checking presence
+# until it has enough reviewers.
+class AssignmentStrategy(ABC):
+    name: str
+    # Whether rank() looks at open_reviews, so that callers can skip
+    # fetching the counters for strategies that don't
+    needs_open_reviews: bool = False
+
+    @abstractmethod
+    def rank(
+        self,
+        session: Session,
+        channel: Channel,
+        candidates: list[User],
+        open_reviews: dict[int, int],
+        count: int,
+    ) -> list[User]: ...
+
+    # Called with the reviewers actually assigned, in the order they
+    # were picked from rank()'s, for strategies that keep track. False
+    # if that ranking was already out of date, in which case the caller
+    # ranks again.
+    def assigned(
+        self, session: Session, channel: Channel, reviewers: list[User]
+    ) -> bool:
+        return True
+
+
+# this isn't for cryptography or security purposes, so B311 doesn't
+# apply to any of the random choices in here
+
+
+class RandomStrategy(AssignmentStrategy):
+    name = "random"
+
+    def rank(
+        self,
+        session: Session,
+        channel: Channel,
+        candidates: list[User],
+        open_reviews: dict[int, int],
+        count: int,
+    ) -> list[User]:
+        return random.sample(candidates, len(candidates))  # nosec B311
+
+
+class LeastLoadedStrategy(AssignmentStrategy):
+    name = "least-loaded"
+    needs_open_reviews = True
+
+    def rank(
+        self,
+        session: Session,
+        channel: Channel,
+        candidates: list[User],
+        open_reviews: dict[int, int],
+        count: int,
+    ) -> list[User]:
+        return sorted(
+            candidates,
+            key=lambda user: (
+                open_reviews.get(user.id, 0),
+                random.random(),  # nosec B311
+            ),
+        )
+
+
+# Random, but with each candidate's chance scaled by 1 / (1 + open
+# reviews). Uses Efraimidis-Spirakis keys so that a single sort gives a
+# weighted sample without replacement.
+class WeightedStrategy(AssignmentStrategy):
+    name = "weighted"
+    needs_open_reviews = True
+
+    def rank(
+        self,
+        session: Session,
+        channel: Channel,
+        candidates: list[User],
+        open_reviews: dict[int, int],
+        count: int,
+    ) -> list[User]:
+        return sorted(
+            candidates,
+            key=lambda user: random.random()  # nosec B311
+            ** (1 + open_reviews.get(user.id, 0)),
+            reverse=True,
+        )
+
+
+# Rotates through the candidates in user id order, starting after
+# whoever the channel last assigned. Remembering a user rather than a
+# count keeps it fair when the candidates change between assignments,
+# e.g. when someone is away, is the PR's author or stops reviewing.
+class RoundRobinStrategy(AssignmentStrategy):
+    name = "round-robin"
+    positions: RoundRobinPositions
+    # The position the last rank() started after, by channel id
+    seen: dict[int, Optional[int]]
+
+    def __init__(self, positions: RoundRobinPositions):
+        self.positions = positions
+        self.seen = {}
+
+    def rank(
+        self,
+        session: Session,
+        channel: Channel,
+        candidates: list[User],
+        open_reviews: dict[int, int],
+        count: int,
+    ) -> list[User]:
+        if not candidates:
+            return []
+        ordered = sorted(candidates, key=lambda user: user.id)
+        last_user_id = self.positions.fetch_round_robin_position(session, channel)
+        self.seen[channel.id] = last_user_id
+        if last_user_id is None:
+            return ordered
+        start = bisect_right([user.id for user in ordered], last_user_id)
+        return ordered[start:] + ordered[:start]
+
+    def assigned(
+        self, session: Session, channel: Channel, reviewers: list[User]
+    ) -> bool:
+        if not reviewers:
+            return True
+        return self.positions.advance_round_robin_position(
+            session, channel, self.seen.get(channel.id), reviewers[-1].id
+        )
+
+
+STRATEGY_NAMES = [
+    RandomStrategy.name,
+    LeastLoadedStrategy.name,
+    WeightedStrategy.name,
+    RoundRobinStrategy.name,
+]
+
+
+def strategy_for_name(name: str, positions: RoundRobinPositions) -> AssignmentStrategy:
+    if name == RandomStrategy.name:
+        return RandomStrategy()
+    if name == LeastLoadedStrategy.name:
+        return LeastLoadedStrategy()
+    if name == WeightedStrategy.name:
+        return WeightedStrategy()
+    if name == RoundRobinStrategy.name:
+        return RoundRobinStrategy(positions)
+    raise ValueError(f"Unknown assignment strategy {name!r}")
+
+
+__all__ = [
+    "AssignmentStrategy",
+    "RandomStrategy",
+    "LeastLoadedStrategy",
+    "WeightedStrategy",
+    "RoundRobinStrategy",
+    "STRATEGY_NAMES",
+    "DEFAULT_ASSIGNMENT_STRATEGY",
+    "strategy_for_name",
+]
@@ -0,0 +1,196 @@
+import random
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from threading import Lock
+from contextlib import contextmanager
+from typing import Any, Iterator, Union
+
+from sqlalchemy import event
+from sqlalchemy.engine import Connection, Engine
+
+from slacker.github import Priority, PullRequestRecord, parse_pr_url
+
+# Slack returns at most this many members per conversations.members page
+SLACK_MEMBERS_PAGE_SIZE = 1000
+
+
+# Counts calls by name. Shared by the fakes and the query counter so
+# the simulator can take a snapshot before and after each operation.
+class CallCounter:
+    calls: Counter[str]
+
+    def __init__(self) -> None:
+        self.calls = Counter()
+        self.lock = Lock()
+
+    def count(self, name: str) -> None:
+        with self.lock:
+            self.calls[name] += 1
+
+    def total(self) -> int:
+        with self.lock:
+            return sum(self.calls.values())
+
+
+@dataclass
+class SyntheticWorkspace:
+    # slack id -> real name
+    users: dict[str, str]
+    # slack id -> "active" / "away"
+    presence: dict[str, str]
+    # channel slack id -> member slack ids
+    channels: dict[str, list[str]]
+    github_logins: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def generate(
+        cls,
+        users: int = 2000,
+        channels: int = 200,
+        members_per_channel: int = 40,
+        presence_ratio: float = 0.6,
+        seed: int = 0,
+    ) -> "SyntheticWorkspace":
+        # Not for security, so B311 doesn't apply
+        rng = random.Random(seed)  # nosec B311
+        user_ids = [f"U{n:08d}" for n in range(users)]
+        return cls(
+            users={user_id: f"User {user_id}" for user_id in user_ids},
+            presence={
+                user_id: "active" if rng.random() < presence_ratio else "away"
+                for user_id in user_ids
+            },
+            channels={
+                f"C{n:08d}": rng.sample(user_ids, min(members_per_channel, users))
+                for n in range(channels)
+            },
+            github_logins={user_id: f"gh-{user_id.lower()}" for user_id in user_ids},
+        )
+
+
+# The parts of slack_sdk's WebClient that the bot uses, answered from a
+# SyntheticWorkspace. Every call is counted, and can optionally sleep
+# to stand in for network latency.
+class FakeSlack:
+    workspace: SyntheticWorkspace
+    counter: CallCounter
+    latency: float
+
+    def __init__(self, workspace: SyntheticWorkspace, latency: float = 0.0):
+        self.workspace = workspace
+        self.counter = CallCounter()
+        self.latency = latency
+
+    def _call(self, name: str) -> None:
+        self.counter.count(name)
+        if self.latency:
+            time.sleep(self.latency)
+
+    def users_info(self, user: str) -> dict[str, Any]:
+        self._call("users.info")
+        return {
+            "user": {
+                "real_name": self.workspace.users[user],
+                "profile": {"email": f"{user.lower()}@example.com"},
+            }
+        }
+
+    def users_getPresence(self, user: str) -> dict[str, Any]:
+        self._call("users.getPresence")
+        return {"presence": self.workspace.presence[user]}
+
+    def conversations_info(self, channel: str) -> dict[str, Any]:
+        self._call("conversations.info")
+        return {"channel": {"name": f"channel-{channel.lower()}"}}
+
+    def conversations_members(self, channel: str) -> Iterator[dict[str, Any]]:
+        members = self.workspace.channels[channel]
+        for start in range(0, max(len(members), 1), SLACK_MEMBERS_PAGE_SIZE):
+            self._call("conversations.members")
+            yield {"members": members[start : start + SLACK_MEMBERS_PAGE_SIZE]}
+
+    def chat_postMessage(self, channel: str, text: str) -> None:
+        self._call("chat.postMessage")
+
+    def views_publish(self, user_id: str, view: dict[str, Any]) -> None:
+        self._call("views.publish")
+
+
+# Stands in for slacker.github.GitHub. PRs are made up on demand, with
+# the author taken from authors (so that the author can be someone in
+# the workspace) or a login nobody has.
+class FakeGitHub:
+    authors: dict[str, str]
+    counter: CallCounter
+    latency: float
+
+    def __init__(self, latency: float = 0.0) -> None:
+        self.authors = {}
+        self.counter = CallCounter()
+        self.latency = latency
+
+    def pull_request(
+        self, url: str, priority: Priority = Priority.INTERACTIVE
+    ) -> PullRequestRecord:
+        self.counter.count("pulls.get")
+        if self.latency:
+            time.sleep(self.latency)
+        ref = parse_pr_url(url)
+        return PullRequestRecord(
+            number=ref.number,
+            html_url=ref.url,
+            author_login=self.authors.get(ref.url, "someone-else"),
+            title=f"PR {ref.number}",
+            state="open",
+            head_sha=f"{ref.number:040x}",
+            merged=False,
+        )
+
+
+# Counts statements sent to the database, by statement type
+class QueryCounter:
+    target: Union[Engine, Connection]
+    counter: CallCounter
+    counting: bool
+
+    def __init__(self, target: Union[Engine, Connection]):
+        self.target = target
+        self.counter = CallCounter()
+        self.counting = True
+
+    def _count(
+        self,
+        conn: Connection,
+        cursor: Any,
+        statement: str,
+        parameters: Any,
+        context: Any,
+        executemany: bool,
+    ) -> None:
+        if self.counting:
+            self.counter.count(statement.split(None, 1)[0].upper())
+
+    @contextmanager
+    def paused(self) -> Iterator[None]:
+        self.counting = False
+        try:
+            yield
+        finally:
+            self.counting = True
+
+    def __enter__(self) -> "QueryCounter":
+        event.listen(self.target, "before_cursor_execute", self._count)
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        event.remove(self.target, "before_cursor_execute", self._count)
+
+
+__all__ = [
+    "CallCounter",
+    "SyntheticWorkspace",
+    "FakeSlack",
+    "FakeGitHub",
+    "QueryCounter",
+]
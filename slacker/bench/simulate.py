@@ -0,0 +1,325 @@
+import argparse
+import json
+import math
+import os
+import random
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Optional, cast
+
+from dotenv import load_dotenv
+from slack_sdk.web import WebClient
+from sqlalchemy import Connection, create_engine, inspect, select
+from sqlalchemy.orm import Session
+
+from slacker.actions.assign_review import AssignReview
+from slacker.assignment_strategies import DEFAULT_ASSIGNMENT_STRATEGY
+from slacker.bench.fakes import FakeGitHub, FakeSlack, QueryCounter, SyntheticWorkspace
+from slacker.data_broker import DataBroker
+from slacker.github import GitHub
+from slacker.model import AssignedReview, Base
+
+OPERATIONS = ["review", "reroll", "complete"]
+DEFAULT_MIX = {"review": 0.6, "reroll": 0.1, "complete": 0.3}
+DEFAULT_OPERATIONS = 500
+PERCENTILES = [50, 95, 99]
+
+
+@dataclass
+class OperationSample:
+    seconds: float
+    queries: int
+    slack_calls: int
+    github_calls: int
+
+
+# Replays a random mix of review, reroll and complete operations the way
+# the bot performs them, against fake Slack and GitHub and a real
+# database. Everything runs inside the connection's transaction, which
+# the caller is expected to roll back afterwards.
+class Simulator:
+    connection: Connection
+    workspace: SyntheticWorkspace
+    slack: FakeSlack
+    github: FakeGitHub
+    broker: DataBroker
+    strategy: str
+    samples: dict[str, list[OperationSample]]
+    active_assignment_ids: list[int]
+
+    def __init__(
+        self,
+        connection: Connection,
+        workspace: SyntheticWorkspace,
+        slack_latency: float = 0.0,
+        github_latency: float = 0.0,
+        strategy: str = DEFAULT_ASSIGNMENT_STRATEGY,
+        seed: int = 0,
+    ):
+        self.connection = connection
+        self.workspace = workspace
+        self.slack = FakeSlack(workspace, slack_latency)
+        self.github = FakeGitHub(github_latency)
+        self.broker = DataBroker(cast(WebClient, self.slack), cast(GitHub, self.github))
+        self.queries = QueryCounter(connection)
+        self.strategy = strategy
+        # Not for security, so B311 doesn't apply
+        self.random = random.Random(seed)  # nosec B311
+        self.samples = {operation: [] for operation in OPERATIONS}
+        self.active_assignment_ids = []
+        self.next_pr_number = 1
+
+    def session(self) -> Session:
+        # Each operation gets its own session like the bot's listeners,
+        # with commits turned into savepoints
+        return Session(bind=self.connection, join_transaction_mode="create_savepoint")
+
+    def run(self, operations: int, mix: dict[str, float] = DEFAULT_MIX) -> None:
+        names = list(mix)
+        weights = [mix[name] for name in names]
+        with self.queries:
+            for _ in range(operations):
+                operation = self.random.choices(names, weights)[0]
+                if not self.active_assignment_ids:
+                    operation = "review"
+                self.measure(operation, getattr(self, operation))
+
+    def measure(self, operation: str, perform: Callable[[], None]) -> None:
+        queries = self.queries.counter.total()
+        slack_calls = self.slack.counter.total()
+        github_calls = self.github.counter.total()
+        start = time.perf_counter()
+        perform()
+        self.samples[operation].append(
+            OperationSample(
+                seconds=time.perf_counter() - start,
+                queries=self.queries.counter.total() - queries,
+                slack_calls=self.slack.counter.total() - slack_calls,
+                github_calls=self.github.counter.total() - github_calls,
+            )
+        )
+
+    def review(self) -> None:
+        channel = self.random.choice(list(self.workspace.channels))
+        requestor = self.random.choice(self.workspace.channels[channel])
+        url = f"https://github.com/bench/bench/pull/{self.next_pr_number}"
+        self.next_pr_number += 1
+        self.github.authors[url] = self.workspace.github_logins.get(
+            requestor, "someone-else"
+        )
+
+        with self.session() as session:
+            pr = self.broker.fetch_pull_request_by_url_or_create_from_github(
+                session, url
+            )
+            action = AssignReview(self.broker, self.strategy)
+            result = action.perform(session, requestor, channel, pr)
+            for message in result.messages:
+                self.slack.chat_postMessage(channel=channel, text=message)
+            for reviewer in result.reviewers:
+                self.slack.chat_postMessage(channel=channel, text=reviewer.name)
+            session.commit()
+            self.track_assignments(session, url)
+
+    def reroll(self) -> None:
+        with self.session() as session:
+            assignment = self.pop_active_assignment(session)
+            if assignment is None:
+                return
+            pr = assignment.pull_request
+            if pr is None:
+                return
+            channel = assignment.channel.slack_id
+            action = AssignReview(self.broker, self.strategy)
+            result = action.perform(session, assignment.requestor.slack_id, channel, pr)
+            self.slack.chat_postMessage(channel=channel, text="Rerolling")
+            if result.reviewer is not None:
+                self.slack.chat_postMessage(channel=channel, text=result.reviewer.name)
+                self.broker.reroll_assignment(session, assignment)
+            session.commit()
+            self.track_assignments(session, pr.html_url)
+
+    def complete(self) -> None:
+        with self.session() as session:
+            assignment = self.pop_active_assignment(session)
+            if assignment is None:
+                return
+            self.broker.complete_assignment(session, assignment)
+            session.commit()
+
+    def pop_active_assignment(self, session: Session) -> Optional[AssignedReview]:
+        index = self.random.randrange(len(self.active_assignment_ids))
+        id = self.active_assignment_ids.pop(index)
+        return self.broker.fetch_assignment_for_id(session, id)
+
+    # Bookkeeping for later rerolls and completions, which isn't part
+    # of what the bot does so isn't counted
+    def track_assignments(self, session: Session, url: str) -> None:
+        with self.queries.paused():
+            statement = (
+                select(AssignedReview.id)
+                .where(AssignedReview.pr_url == url)
+                .where(AssignedReview.completed_at == None)
+                .where(AssignedReview.rerolled_at == None)
+            )
+            ids = set(session.scalars(statement))
+        self.active_assignment_ids += sorted(ids - set(self.active_assignment_ids))
+
+    def report(self) -> dict[str, dict[str, float]]:
+        return {
+            operation: summarise(samples)
+            for operation, samples in self.samples.items()
+            if samples
+        }
+
+
+# Nearest-rank percentile, which doesn't need any interpolation between
+# samples and so is exact for the small sample counts we often have
+def percentile(values: list[float], pct: float) -> float:
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarise(samples: list[OperationSample]) -> dict[str, float]:
+    milliseconds = [sample.seconds * 1000 for sample in samples]
+    summary: dict[str, float] = {"count": len(samples)}
+    for pct in PERCENTILES:
+        summary[f"p{pct}_ms"] = percentile(milliseconds, pct)
+    summary["queries"] = sum(s.queries for s in samples) / len(samples)
+    summary["slack_calls"] = sum(s.slack_calls for s in samples) / len(samples)
+    summary["github_calls"] = sum(s.github_calls for s in samples) / len(samples)
+    return summary
+
+
+def run_simulation(
+    connection: Connection,
+    workspace: SyntheticWorkspace,
+    operations: int = DEFAULT_OPERATIONS,
+    mix: dict[str, float] = DEFAULT_MIX,
+    **kwargs: Any,
+) -> dict[str, dict[str, float]]:
+    transaction = connection.begin()
+    try:
+        # Lets the simulator run against an empty database. Rolled back
+        # along with everything else.
+        if not inspect(connection).has_table(AssignedReview.__tablename__):
+            Base.metadata.create_all(connection)
+        simulator = Simulator(connection, workspace, **kwargs)
+        simulator.run(operations, mix)
+        return simulator.report()
+    finally:
+        transaction.rollback()
+
+
+# For each operation and metric in both reports, the baseline value, the
+# current value and current / baseline
+def compare(
+    current: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]]
+) -> dict[str, dict[str, tuple[float, float, float]]]:
+    comparison: dict[str, dict[str, tuple[float, float, float]]] = {}
+    for operation, metrics in current.items():
+        if operation not in baseline:
+            continue
+        comparison[operation] = {}
+        for metric, value in metrics.items():
+            if metric == "count" or metric not in baseline[operation]:
+                continue
+            before = baseline[operation][metric]
+            ratio = value / before if before else (1.0 if value == 0 else math.inf)
+            comparison[operation][metric] = (before, value, ratio)
+    return comparison
+
+
+def main(argv: Optional[list[str]] = None) -> int:
+    load_dotenv()
+    parser = argparse.ArgumentParser(prog="python -mslacker.bench.simulate")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"))
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--channels", type=int, default=200)
+    parser.add_argument("--members-per-channel", type=int, default=40)
+    parser.add_argument("--presence-ratio", type=float, default=0.6)
+    parser.add_argument("--operations", type=int, default=DEFAULT_OPERATIONS)
+    parser.add_argument("--strategy", default=DEFAULT_ASSIGNMENT_STRATEGY)
+    parser.add_argument(
+        "--slack-latency", type=float, default=0.0, help="Seconds per Slack call"
+    )
+    parser.add_argument(
+        "--github-latency", type=float, default=0.0, help="Seconds per GitHub call"
+    )
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save", metavar="FILE", help="Save results as a baseline")
+    parser.add_argument("--compare", metavar="FILE", help="Compare with a baseline")
+    parser.add_argument(
+        "--max-regression",
+        type=float,
+        help="Exit non-zero if any p95 is more than this many times the baseline",
+    )
+    args = parser.parse_args(argv)
+
+    if args.database_url is None:
+        print("DATABASE_URL is not set")
+        return 1
+
+    workspace = SyntheticWorkspace.generate(
+        users=args.users,
+        channels=args.channels,
+        members_per_channel=args.members_per_channel,
+        presence_ratio=args.presence_ratio,
+        seed=args.seed,
+    )
+    engine = create_engine(args.database_url)
+    with engine.connect() as connection:
+        report = run_simulation(
+            connection,
+            workspace,
+            operations=args.operations,
+            slack_latency=args.slack_latency,
+            github_latency=args.github_latency,
+            strategy=args.strategy,
+            seed=args.seed,
+        )
+
+    for operation, metrics in report.items():
+        print(
+            f"{operation:>8}: n={metrics['count']:.0f} "
+            + " ".join(f"p{pct}={metrics[f'p{pct}_ms']:.2f}ms" for pct in PERCENTILES)
+            + f" queries={metrics['queries']:.1f}"
+            + f" slack={metrics['slack_calls']:.1f}"
+            + f" github={metrics['github_calls']:.1f}"
+        )
+
+    if args.save:
+        with open(args.save, "w") as file:
+            # Leave the database URL out, it may well contain a password
+            parameters = {
+                name: value
+                for name, value in vars(args).items()
+                if name not in ("database_url", "save", "compare")
+            }
+            json.dump({"parameters": parameters, "results": report}, file, indent=2)
+
+    status = 0
+    if args.compare:
+        with open(args.compare) as file:
+            baseline: dict[str, dict[str, float]] = json.load(file)["results"]
+        for operation, changes in compare(report, baseline).items():
+            for metric, (before, after, ratio) in changes.items():
+                print(
+                    f"{operation:>8} {metric:>12}: {before:10.2f} -> {after:10.2f}"
+                    f" ({(ratio - 1) * 100:+.1f}%)"
+                )
+                if (
+                    args.max_regression is not None
+                    and metric == "p95_ms"
+                    and ratio > args.max_regression
+                ):
+                    status = 1
+    return status
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
+
+
+__all__ = ["Simulator", "run_simulation", "compare", "summarise", "percentile"]
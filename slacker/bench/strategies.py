@@ -0,0 +1,92 @@
+import argparse
+import json
+import timeit
+from typing import Any, Optional
+
+from sqlalchemy.orm import Session
+
+from slacker.model import User, Channel
+from slacker.assignment_strategies import STRATEGY_NAMES, strategy_for_name
+
+DEFAULT_CANDIDATES = 200
+DEFAULT_NUMBER = 1000
+
+
+# Keeps round robin positions in memory, so that the benchmark measures
+# the strategy rather than the database round trip
+class InMemoryRoundRobinPositions:
+    positions: dict[int, int]
+
+    def __init__(self) -> None:
+        self.positions = {}
+
+    def fetch_round_robin_position(
+        self, session: Session, channel: Channel
+    ) -> Optional[int]:
+        return self.positions.get(channel.id)
+
+    def advance_round_robin_position(
+        self, session: Session, channel: Channel, seen: Optional[int], user_id: int
+    ) -> bool:
+        if self.positions.get(channel.id) != seen:
+            return False
+        self.positions[channel.id] = user_id
+        return True
+
+
+def synthetic_candidates(count: int) -> tuple[list[User], dict[int, int]]:
+    candidates = [
+        User(id=n, slack_id=f"U{n:08d}", name=f"User {n}", email=f"{n}@example.com")
+        for n in range(1, count + 1)
+    ]
+    open_reviews = {user.id: user.id % 7 for user in candidates}
+    return candidates, open_reviews
+
+
+# Times strategy.rank() for each strategy, returning the mean seconds
+# per call keyed by strategy name
+def benchmark_strategies(
+    candidates: int = DEFAULT_CANDIDATES,
+    number: int = DEFAULT_NUMBER,
+    reviewers: int = 1,
+    names: Optional[list[str]] = None,
+) -> dict[str, float]:
+    users, open_reviews = synthetic_candidates(candidates)
+    channel = Channel(id=1, slack_id="C00000001", name="bench")
+    positions = InMemoryRoundRobinPositions()
+    # The session is only ever handed through to the position store
+    session: Any = None
+
+    results = {}
+    for name in names or STRATEGY_NAMES:
+        strategy = strategy_for_name(name, positions)
+        seconds = timeit.timeit(
+            lambda: strategy.rank(session, channel, users, open_reviews, reviewers),
+            number=number,
+        )
+        results[name] = seconds / number
+    return results
+
+
+def main(argv: Optional[list[str]] = None) -> None:
+    parser = argparse.ArgumentParser(prog="python -mslacker.bench.strategies")
+    parser.add_argument("--candidates", type=int, default=DEFAULT_CANDIDATES)
+    parser.add_argument("--number", type=int, default=DEFAULT_NUMBER)
+    parser.add_argument("--reviewers", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="Output JSON")
+    args = parser.parse_args(argv)
+
+    results = benchmark_strategies(args.candidates, args.number, args.reviewers)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for name, seconds in results.items():
+            print(f"{name:>14}: {seconds * 1e6:10.1f} us/call")
+
+
+if __name__ == "__main__":
+    main()
+
+
+__all__ = ["benchmark_strategies", "InMemoryRoundRobinPositions"]
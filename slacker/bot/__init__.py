@@ -2,10 +2,12 @@ import logging
 import re
 import random
 import functools
-from datetime import datetime
-from typing import Any, Optional, Type
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Optional, Type
 
-from threading import Event
+from http.server import ThreadingHTTPServer
+from threading import Event, Thread
+from concurrent.futures import ThreadPoolExecutor
 
 from sqlalchemy import create_engine, Engine
 from sqlalchemy import select
@@ -17,40 +19,99 @@ from slack_sdk.socket_mode.client import BaseSocketModeClient
 from slack_sdk.socket_mode.response import SocketModeResponse
 from slack_sdk.socket_mode.request import SocketModeRequest
 
-from slacker.github import GitHub, PR_RE
+from slacker.github import (
+    GitHub,
+    GitHubAppAuth,
+    NoInstallationError,
+    PR_RE,
+    PullRequestRef,
+    parse_pr_url,
+)
 
+from slacker.bot.http_mode import HttpRequestClient
 from slacker.data_broker import DataBroker
-from slacker.actions.assign_review import AssignReview
-
+from slacker.actions.assign_review import AssignReview, MAX_REVIEWERS_PER_PR
+from slacker.assignment_strategies import DEFAULT_ASSIGNMENT_STRATEGY
+from slacker.jobs.sweep_finished_assignments import (
+    DEFAULT_SWEEP_INTERVAL,
+    SweepFinishedAssignments,
+    SweepResult,
+    sweep_lock,
+)
+
+from slacker.metrics import serve_metrics
 from slacker.model import User, Channel, UserChannelConfig, AssignedReview
+from slacker.notifications import NotificationListener
+from slacker.reviewer_index import NOTIFY_CHANNEL as REVIEWER_INDEX_CHANNEL
+from slacker.stats import fetch_review_stats, format_duration
+
+
+# "!review x2 <url>" asks for two reviewers. Only straight after the
+# command, so that e.g. "fixes the x86 build" doesn't ask for 86.
+REVIEWER_COUNT_RE = re.compile(r"!review\s+x([0-9]+)\b")
+# Threads for the network calls a request can make in the background
+# while its listener works with the database
+MAX_BACKGROUND_WORKERS = 8
+# How far back the review summary in the app home looks
+APP_HOME_STATS_DAYS = 30
 
 
 class Bot:
-    client: SocketModeClient
+    client: BaseSocketModeClient
+    db_url: str
     db_engine: Engine
     broker: DataBroker
     terminate_event: Event
     started_event: Event
     session_factory: Type[Session]
+    executor: ThreadPoolExecutor
+    reviewer_index_listener: Optional[NotificationListener]
+    metrics_server: Optional[ThreadingHTTPServer]
 
     def __init__(
-        self, app_token: str, bot_token: str, github_token: str, db_url: str
+        self,
+        # None when Slack's requests come over HTTP to the web app
+        # instead of over socket mode
+        app_token: Optional[str],
+        bot_token: str,
+        github_token: Optional[str],
+        db_url: str,
+        default_assignment_strategy: str = DEFAULT_ASSIGNMENT_STRATEGY,
+        # None turns the sweeper off
+        sweep_interval: Optional[timedelta] = DEFAULT_SWEEP_INTERVAL,
+        # Used instead of github_token when given
+        github_app_auth: Optional[GitHubAppAuth] = None,
+        # Serves the process's metrics at /metrics on this port if given
+        metrics_port: Optional[int] = None,
     ) -> None:
-        self.github = GitHub(github_token)
+        self.github = GitHub(github_token, app_auth=github_app_auth)
+        self.default_assignment_strategy = default_assignment_strategy
+        self.sweep_interval = sweep_interval
+        self.metrics_port = metrics_port
+        self.metrics_server = None
+        self.db_url = db_url
         self.db_engine = create_engine(db_url)
         # So we can override this in test suite
         self.session_factory = Session
         self.logger = logging.getLogger(__name__)
 
-        client = SocketModeClient(
-            app_token=app_token,
-            web_client=WebClient(token=bot_token),
-        )
+        client: BaseSocketModeClient
+        if app_token is None:
+            client = HttpRequestClient(WebClient(token=bot_token))
+        else:
+            client = SocketModeClient(
+                app_token=app_token,
+                web_client=WebClient(token=bot_token),
+            )
         client.logger = self.logger.getChild("client")
         self.client = client
-        self.broker = DataBroker(client.web_client)
+        self.broker = DataBroker(client.web_client, self.github)
         self.terminate_event = Event()
         self.started_event = Event()
+        self.executor = ThreadPoolExecutor(
+            max_workers=MAX_BACKGROUND_WORKERS, thread_name_prefix="background"
+        )
+        self.reviewer_index_listener = None
 
     # Log every event coming from slack
     def log_listener(
@@ -77,12 +138,27 @@ class Bot:
                 client.send_socket_mode_response(response)
 
                 text = event["text"]
-                match = PR_RE.search(text)
+                if "!review" not in text:
+                    return
 
-                if match is None or "!review" not in text:
+                # Every distinct PR in the message gets reviewed, stacked
+                # PRs are commonly posted together
+                pr_urls: dict[PullRequestRef, str] = {}
+                for match in PR_RE.finditer(text):
+                    pr_urls.setdefault(parse_pr_url(match[0]), match[0])
+
+                if not pr_urls:
                     return
 
-                self.assign_review(event["user"], event["channel"], match[0])
+                count_match = REVIEWER_COUNT_RE.search(text)
+                reviewers = int(count_match[1]) if count_match else 1
+
+                self.assign_reviews(
+                    event["user"],
+                    event["channel"],
+                    list(pr_urls.values()),
+                    reviewers,
+                )
 
     def shortcut_listener(
         self, client: BaseSocketModeClient, request: SocketModeRequest
@@ -136,6 +212,23 @@ class Bot:
                                 "action_id": "channel",
                             },
                         },
+                        {
+                            "type": "input",
+                            "block_id": "reviewers",
+                            "optional": True,
+                            "label": {
+                                "type": "plain_text",
+                                "text": "Number of reviewers",
+                            },
+                            "element": {
+                                "type": "number_input",
+                                "action_id": "reviewers",
+                                "is_decimal_allowed": False,
+                                "initial_value": "1",
+                                "min_value": "1",
+                                "max_value": str(MAX_REVIEWERS_PER_PR),
+                            },
+                        },
                     ],
                 },
             )
@@ -160,6 +253,12 @@ class Bot:
             channel = request.payload["view"]["state"]["values"]["channel"]["channel"][
                 "selected_channel"
             ]
+            reviewers = (
+                request.payload["view"]["state"]["values"]
+                .get("reviewers", {})
+                .get("reviewers", {})
+                .get("value")
+            )
 
             url_is_good = self.github.valid_pr_url(pr_url)
             if not url_is_good:
@@ -168,6 +267,9 @@ class Bot:
             if not channel:
                 errors["channel"] = "Must select a channel"
 
+            if reviewers is not None and not reviewers.isdigit():
+                errors["reviewers"] = "Must be a whole number"
+
             if any(errors):
                 response_payload = {
                     "response_action": "errors",
@@ -185,7 +287,12 @@ class Bot:
                 return
 
             # Assign PR to a reviewer
-            self.assign_review(request.payload["user"]["id"], channel, pr_url)
+            self.assign_reviews(
+                request.payload["user"]["id"],
+                channel,
+                [pr_url],
+                int(reviewers) if reviewers else 1,
+            )
 
         if callback_id == "edit-github-username":
             response_payload = None
@@ -294,6 +401,41 @@ class Bot:
 
         return review_blocks
 
+    # A summary of the user's last 30 days of reviews, from the stats
+    # rollups. Nothing if they haven't had any.
+    def app_home_stats_blocks_for_user(
+        self, slack_user_id: str
+    ) -> list[dict[str, Any]]:
+        until = date.today() + timedelta(days=1)
+        since = until - timedelta(days=APP_HOME_STATS_DAYS)
+        with self.session_factory(self.db_engine) as session:
+            user = self.broker.fetch_user_by_slack_id(session, slack_user_id)
+            if user is None:
+                return []
+            stats = fetch_review_stats(session, since, until, user_id=user.id).get(None)
+        if stats is None or stats.assigned == 0:
+            return []
+
+        lines = [
+            f"In the last {APP_HOME_STATS_DAYS} days you were assigned "
+            f"*{stats.assigned}* reviews and completed *{stats.completed}*"
+        ]
+        acknowledge = stats.acknowledge.percentile(0.5)
+        if acknowledge is not None:
+            lines.append(f"Median time to acknowledge: {format_duration(acknowledge)}")
+        complete = stats.complete.percentile(0.5)
+        if complete is not None:
+            lines.append(f"Median time to complete: {format_duration(complete)}")
+        reroll_rate = stats.reroll_rate()
+        if reroll_rate:
+            lines.append(f"Rerolled: {reroll_rate:.0%}")
+        return [
+            {
+                "type": "section",
+                "text": {"type": "mrkdwn", "text": "\n".join(lines)},
+            }
+        ]
+
     def app_home_channel_blocks_for_user(
         self, slack_user_id: str
     ) -> list[dict[str, Any]]:
@@ -383,6 +525,7 @@ class Bot:
 
     def app_home_view_for_user(self, slack_user_id: str) -> dict[str, Any]:
         review_blocks = self.app_home_review_blocks_for_user(slack_user_id)
+        stats_blocks = self.app_home_stats_blocks_for_user(slack_user_id)
         user_detail_blocks = self.app_home_user_blocks_for_user(slack_user_id)
         channel_blocks = self.app_home_channel_blocks_for_user(slack_user_id)
         divider_blocks = [
@@ -402,6 +545,7 @@ class Bot:
                 }
             ]
             + review_blocks
+            + stats_blocks
             + divider_blocks
             + user_detail_blocks
             + divider_blocks
@@ -431,6 +575,53 @@ class Bot:
             slack_user_id = request.payload["event"]["user"]
             self.send_app_home_to_user(client, slack_user_id)
 
+    # Keeps the broker's reviewer index up to date as people come and
+    # go, so that assigning a review doesn't need the channel's member
+    # list every time
+    def membership_listener(
+        self, client: BaseSocketModeClient, request: SocketModeRequest
+    ) -> None:
+        if request.type != "events_api":
+            return
+        event = request.payload.get("event")
+        if event is None or event["type"] not in (
+            "member_joined_channel",
+            "member_left_channel",
+            "user_change",
+        ):
+            return
+
+        # Acknowledge receipt of event
+        response = SocketModeResponse(envelope_id=request.envelope_id)
+        client.send_socket_mode_response(response)
+
+        with self.session_factory(self.db_engine) as session:
+            if event["type"] == "user_change":
+                if not event["user"].get("deleted"):
+                    return
+                user = self.broker.fetch_user_by_slack_id(session, event["user"]["id"])
+                if user is not None:
+                    self.broker.record_user_deactivated(session, user)
+                    session.commit()
+                return
+
+            # Only channels we already know about are worth tracking
+            channel = self.broker.fetch_channel_by_slack_id(session, event["channel"])
+            if channel is None:
+                return
+
+            if event["type"] == "member_joined_channel":
+                user = self.broker.fetch_user_by_slack_id_or_create_from_slack(
+                    session, event["user"]
+                )
+                self.broker.record_channel_member_joined(session, user, channel)
+                session.commit()
+            else:
+                left_user = self.broker.fetch_user_by_slack_id(session, event["user"])
+                if left_user is not None:
+                    self.broker.record_channel_member_left(session, left_user, channel)
+                    session.commit()
+
     def handle_block_action(
         self,
         client: BaseSocketModeClient,
@@ -454,7 +645,7 @@ class Bot:
                     # error?
                     return
 
-                assignment.acknowledged_at = datetime.now()
+                self.broker.acknowledge_assignment(session, assignment)
                 session.commit()
 
             self.send_app_home_to_user(client, slack_user_id)
@@ -490,7 +681,7 @@ class Bot:
                     # error?
                     return
 
-                assignment.completed_at = datetime.now()
+                self.broker.complete_assignment(session, assignment)
                 session.commit()
 
             self.send_app_home_to_user(client, slack_user_id)
@@ -544,7 +735,7 @@ class Bot:
                         session, user, channel
                     )
                 )
-                channel_config.reviewer = False
+                self.broker.set_channel_reviewer(session, channel_config, False)
                 session.commit()
             self.send_app_home_to_user(client, slack_user_id)
 
@@ -561,7 +752,7 @@ class Bot:
                         session, user, channel
                     )
                 )
-                channel_config.reviewer = True
+                self.broker.set_channel_reviewer(session, channel_config, True)
                 session.commit()
             self.send_app_home_to_user(client, slack_user_id)
 
@@ -582,13 +773,23 @@ class Bot:
                     request.payload["trigger_id"],
                 )
 
+    # Every request goes to each of these in turn, over socket mode or
+    # HTTP
+    def listeners(
+        self,
+    ) -> list[Callable[[BaseSocketModeClient, SocketModeRequest], None]]:
+        return [
+            self.log_listener,
+            self.message_listener,
+            self.shortcut_listener,
+            self.view_submission_listener,
+            self.app_home_listener,
+            self.block_actions_listener,
+            self.membership_listener,
+        ]
+
     def register_listeners(self) -> None:
-        self.client.socket_mode_request_listeners.append(self.log_listener)
-        self.client.socket_mode_request_listeners.append(self.message_listener)
-        self.client.socket_mode_request_listeners.append(self.shortcut_listener)
-        self.client.socket_mode_request_listeners.append(self.view_submission_listener)
-        self.client.socket_mode_request_listeners.append(self.app_home_listener)
-        self.client.socket_mode_request_listeners.append(self.block_actions_listener)
+        self.client.socket_mode_request_listeners.extend(self.listeners())
 
     def send_text_to_channel(self, channel: str, text: str) -> None:
         self.client.web_client.chat_postMessage(channel=channel, text=text)
@@ -598,51 +799,148 @@ class Bot:
         self.send_text_to_channel(
             assignment.channel.slack_id, f"Rerolling {assignment.pr_url}"
         )
-        pr = self.github.pr(assignment.pr_url)
+        # Assignments made before PRs were stored only have the URL, and
+        # get linked to the PR here
+        pr = assignment.pull_request
+        if pr is None:
+            pr = self.broker.fetch_pull_request_by_url_or_create_from_github(
+                session, assignment.pr_url
+            )
+            assignment.pull_request = pr
         channel = assignment.channel.slack_id
         requestor = assignment.requestor.slack_id
 
-        action = AssignReview(self.broker)
+        action = AssignReview(self.broker, self.default_assignment_strategy)
         result = action.perform(session, requestor, channel, pr)
 
-        for message in result.messages:
-            self.send_text_to_channel(channel, message)
-
+        lines = list(result.messages)
         reviewer = result.reviewer
-        if reviewer is None:
-            return
-
-        self.send_text_to_channel(
-            channel,
-            f"{reviewer.name} (<@{reviewer.slack_id}>) to review {pr.html_url}",
-        )
+        if reviewer is not None:
+            lines.append(
+                f"{reviewer.name} (<@{reviewer.slack_id}>) to review {pr.html_url}"
+            )
+            self.broker.reroll_assignment(session, assignment)
+            # Before posting, as in assign_reviews
+            session.commit()
 
-        assignment.rerolled_at = datetime.now()
+        for line in lines:
+            self.send_text_to_channel(channel, line)
 
     def assign_review(self, requestor: str, channel: str, pr_url: str) -> None:
+        self.assign_reviews(requestor, channel, [pr_url])
+
+    def assign_reviews(
+        self, requestor: str, channel: str, pr_urls: list[str], reviewers: int = 1
+    ) -> None:
         self.logger.warning(
-            f"assigning review for {pr_url} (requested by {requestor} in {channel})"
+            f"assigning reviews for {pr_urls} (requested by {requestor} in {channel})"
         )
-        self.send_text_to_channel(channel, f"Review request received for {pr_url}")
-
-        pr = self.github.pr(pr_url)
+        if len(pr_urls) == 1:
+            received = f"Review request received for {pr_urls[0]}"
+        else:
+            received = "Review requests received for\n" + "\n".join(pr_urls)
+
+        # Posting the acknowledgement, fetching the PRs from GitHub and
+        # working out who could review (channel members from slack,
+        # users from the database) don't depend on each other, so the
+        # first two happen in the background while this thread does the
+        # last, which needs the session
+        # PyGithub (and aiohttp, for the async client) are only imported
+        # once the bot talks to GitHub
+        from github import RateLimitExceededException
+        from slacker.github.async_client import GitHubRequestError
 
         with self.session_factory(self.db_engine) as session:
-            action = AssignReview(self.broker)
-            result = action.perform(session, requestor, channel, pr)
-
-            for message in result.messages:
+            acknowledgement = self.executor.submit(
+                self.send_text_to_channel, channel, received
+            )
+            pending = self.broker.start_fetching_pull_requests(
+                session, pr_urls, self.executor
+            )
+            action = AssignReview(self.broker, self.default_assignment_strategy)
+            context = action.prepare(session, requestor, channel)
+            acknowledgement.result()
+
+            try:
+                prs = self.broker.finish_fetching_pull_requests(session, pending)
+            except (RateLimitExceededException, GitHubRequestError) as error:
+                # Several PRs are fetched by the async client, which
+                # doesn't raise PyGithub's exceptions
+                if isinstance(error, GitHubRequestError) and not error.rate_limited:
+                    raise
+                message = "GitHub's API rate limit has run out"
+                owner = parse_pr_url(pr_urls[0]).owner
+                reset_at = self.github.budget_for(owner).reset_at
+                if reset_at is not None:
+                    message += f", please try again after {reset_at:%H:%M}"
                 self.send_text_to_channel(channel, message)
-
-            reviewer = result.reviewer
-            if reviewer is None:
+                return
+            except NoInstallationError as error:
+                self.send_text_to_channel(
+                    channel, f"The GitHub App needs installing on {error.owner} first"
+                )
                 return
 
-            self.send_text_to_channel(
-                channel,
-                f"{reviewer.name} (<@{reviewer.slack_id}>) to review {pr.html_url}",
+            results = action.assign(session, context, prs, reviewers)
+
+            lines = []
+            for pr, result in zip(prs, results):
+                lines += result.messages
+                for reviewer in result.reviewers:
+                    lines.append(
+                        f"{reviewer.name} (<@{reviewer.slack_id}>) to review {pr.html_url}"
+                    )
+
+            # Before posting, so the channel's row (updated for round
+            # robin) isn't locked while waiting on Slack
+            if any(result.reviewers for result in results):
+                session.commit()
+
+            # A single request keeps to one message per line, a batch
+            # gets one combined message
+            if len(pr_urls) == 1:
+                for line in lines:
+                    self.send_text_to_channel(channel, line)
+            else:
+                self.send_text_to_channel(channel, "\n".join(lines))
+
+    # Completes assignments for merged and closed PRs, and refreshes the
+    # app home of anyone who had one completed. Skipped if another
+    # process is already sweeping.
+    def sweep_finished_assignments(self) -> SweepResult:
+        with sweep_lock(self.db_engine) as locked:
+            if not locked:
+                self.logger.info("Another process is sweeping, skipping this sweep")
+                return SweepResult()
+            with self.session_factory(self.db_engine) as session:
+                result = SweepFinishedAssignments(self.broker).perform(session)
+        if result.completed:
+            self.logger.info(f"Sweeper completed {result.completed} assignments")
+        for slack_user_id in result.affected_slack_ids:
+            self.send_app_home_to_user(self.client, slack_user_id)
+        return result
+
+    def sweeper(self, interval: timedelta) -> None:
+        while not self.terminate_event.wait(timeout=interval.total_seconds()):
+            try:
+                self.sweep_finished_assignments()
+            except Exception:
+                self.logger.exception("Sweeping finished assignments failed")
+
+    # Every process answering Slack keeps its own reviewer index, so each
+    # one applies the changes the others announce
+    def start_reviewer_index_listener(self) -> None:
+        if self.reviewer_index_listener is None:
+            index = self.broker.reviewer_index
+            self.reviewer_index_listener = NotificationListener(
+                self.db_url, REVIEWER_INDEX_CHANNEL, index.receive, index.clear
             )
-            session.commit()
+        self.reviewer_index_listener.start()
+
+    def stop_reviewer_index_listener(self) -> None:
+        if self.reviewer_index_listener is not None:
+            self.reviewer_index_listener.close()
+            self.reviewer_index_listener = None
 
     def run(self) -> None:
         # Clear any pending termination requests
@@ -655,6 +953,18 @@ class Bot:
 
         # Start the client (starts a thread)
         self.client.connect()
+        self.start_reviewer_index_listener()
+
+        if self.sweep_interval is not None:
+            Thread(
+                target=self.sweeper,
+                args=(self.sweep_interval,),
+                name="sweeper",
+                daemon=True,
+            ).start()
+
+        if self.metrics_port is not None:
+            self.metrics_server = serve_metrics(self.metrics_port)
 
         # Signal to any threads waiting for us to start that we have
         # started
@@ -665,6 +975,11 @@ class Bot:
         # when we're running under the control of a test we want it to
         # be able to terminate us.
         self.terminate_event.wait(timeout=None)
+        self.stop_reviewer_index_listener()
+        if self.metrics_server is not None:
+            self.metrics_server.shutdown()
+            self.metrics_server.server_close()
+            self.metrics_server = None
 
     def terminate(self) -> None:
         self.terminate_event.set()
@@ -1,8 +1,11 @@
 import os
 import logging
+from datetime import timedelta
 from dotenv import load_dotenv
 
 from . import Bot
+from slacker.github import GitHubAppAuth
+from slacker.assignment_strategies import DEFAULT_ASSIGNMENT_STRATEGY
 
 load_dotenv()
 logging.basicConfig()
@@ -10,17 +13,37 @@ logging.basicConfig()
 app_token = os.environ.get("SLACK_APP_TOKEN")
 bot_token = os.environ.get("SLACK_BOT_TOKEN")
 github_token = os.environ.get("GITHUB_TOKEN")
+# Authenticating as a GitHub App takes GITHUB_APP_ID and
+# GITHUB_APP_PRIVATE_KEY (or GITHUB_APP_PRIVATE_KEY_PATH) instead
+github_app_auth = GitHubAppAuth.from_env()
 db_url = os.environ.get("DATABASE_URL")
+# Used for channels that don't have their own assignment_strategy
+assignment_strategy = os.environ.get("ASSIGNMENT_STRATEGY", DEFAULT_ASSIGNMENT_STRATEGY)
+# How often to complete assignments for merged and closed PRs, 0 to
+# turn it off
+sweep_minutes = float(os.environ.get("SWEEP_INTERVAL_MINUTES", "15"))
+sweep_interval = timedelta(minutes=sweep_minutes) if sweep_minutes > 0 else None
+# Where Prometheus can scrape the bot's metrics, if anywhere
+metrics_port = os.environ.get("METRICS_PORT")
 
 if app_token == None:
     print("SLACK_APP_TOKEN is not set")
 if bot_token == None:
     print("SLACK_BOT_TOKEN is not set")
-if github_token == None:
-    print("GITHUB_TOKEN is not set")
+if github_token == None and github_app_auth == None:
+    print("GITHUB_TOKEN (or GITHUB_APP_ID and GITHUB_APP_PRIVATE_KEY) is not set")
 if db_url == None:
     print("DATABASE_URL is not set")
 
-if app_token and bot_token and db_url and github_token:
-    bot = Bot(app_token, bot_token, github_token, db_url)
+if app_token and bot_token and db_url and (github_token or github_app_auth):
+    bot = Bot(
+        app_token,
+        bot_token,
+        github_token,
+        db_url,
+        assignment_strategy,
+        sweep_interval,
+        github_app_auth,
+        int(metrics_port) if metrics_port else None,
+    )
     bot.run()
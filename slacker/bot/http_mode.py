@@ -0,0 +1,46 @@
+import logging
+from concurrent.futures import Future
+from typing import Any, Optional, Union
+
+from slack_sdk.socket_mode.client import BaseSocketModeClient
+from slack_sdk.socket_mode.response import SocketModeResponse
+from slack_sdk.web import WebClient
+
+
+# Stands in for the socket mode client when Slack's requests arrive over
+# HTTP instead, so that the Bot's listeners work unchanged. There's no
+# socket: whatever a listener acknowledges with becomes the body of the
+# HTTP response.
+class HttpRequestClient(BaseSocketModeClient):
+    # The payload of the first acknowledgement (None for a bare one)
+    acknowledged: Future[Optional[dict[str, Any]]]
+
+    def __init__(self, web_client: WebClient, logger: Optional[logging.Logger] = None):
+        self.web_client = web_client
+        self.logger = logger or logging.getLogger(__name__)
+        self.message_listeners = []
+        self.socket_mode_request_listeners = []
+        self.closed = False
+        self.acknowledged = Future()
+
+    def is_connected(self) -> bool:
+        return True
+
+    def connect(self) -> None:
+        pass
+
+    def disconnect(self) -> None:
+        pass
+
+    def send_socket_mode_response(
+        self, response: Union[dict[str, Any], SocketModeResponse]
+    ) -> None:
+        if isinstance(response, SocketModeResponse):
+            payload = response.payload
+        else:
+            payload = response.get("payload")
+        if not self.acknowledged.done():
+            self.acknowledged.set_result(payload)
+
+
+__all__ = ["HttpRequestClient"]
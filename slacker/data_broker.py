@@ -1,21 +1,56 @@
-from typing import Sequence, Optional
+from typing import Any, Sequence, Optional
+from collections import Counter
+from datetime import datetime, timedelta
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass
 from slack_sdk.web import WebClient
-from sqlalchemy import select
+from sqlalchemy import Integer, String, column, delete, func, select, tuple_, union
+from sqlalchemy import update
+from sqlalchemy import values
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import Session
 
+from slacker.github import GitHub, PullRequestRef, parse_pr_url
+from slacker.github import PullRequestRecord
 from slacker.user_presence_cache import UserPresenceCache
+from slacker.reviewer_index import ReviewerIndex, ReviewerIndexChange
+from slacker.reviewer_index import announce_change
 from slacker.user_presence_provider import SlackClientUserPresenceProvider
 from slacker.model import User, Channel, UserChannelConfig, AssignedReview
+from slacker.model import AssignedReviewHistory
+from slacker.model import PullRequest, SlackEventDelivery
+from slacker import assignment_events, stats
+from slacker.assignment_events import AssignmentEvent
+
+
+# Upper bound on concurrent presence lookups
+MAX_PRESENCE_LOOKUPS = 5
+# Slack gives up retrying an event well within this
+SLACK_EVENT_RETENTION = timedelta(hours=1)
+
+
+# PRs that start_fetching_pull_requests() found in the database, and
+# the ones it is still fetching from GitHub
+@dataclass
+class PendingPullRequests:
+    refs: list[PullRequestRef]
+    pull_requests: dict[PullRequestRef, PullRequest]
+    missing: list[PullRequestRef]
+    records: Future[list[PullRequestRecord]]
 
 
 class DataBroker:
     slack: WebClient
+    github: GitHub
+    reviewer_index: ReviewerIndex
 
-    def __init__(self, slack: WebClient):
+    def __init__(self, slack: WebClient, github: GitHub):
         self.slack = slack
+        self.github = github
         self.user_presence_cache = UserPresenceCache(
             SlackClientUserPresenceProvider(slack)
         )
+        self.reviewer_index = ReviewerIndex()
 
     def fetch_user_by_slack_id_or_create_from_slack(
         self, session: Session, slack_id: str
@@ -41,6 +76,25 @@ class DataBroker:
 
         return user
 
+    # One query for all of the ids, returned in the order they were
+    # asked for
+    def fetch_users_by_ids(self, session: Session, ids: Sequence[int]) -> list[User]:
+        if not ids:
+            return []
+        statement = select(User).where(User.id.in_(ids))
+        users = {user.id: user for user in session.scalars(statement)}
+        return [users[id] for id in ids if id in users]
+
+    def fetch_user_by_slack_id(self, session: Session, slack_id: str) -> Optional[User]:
+        statement = select(User).where(User.slack_id == slack_id)
+        return session.scalars(statement).one_or_none()
+
+    def fetch_channel_by_slack_id(
+        self, session: Session, slack_id: str
+    ) -> Optional[Channel]:
+        statement = select(Channel).where(Channel.slack_id == slack_id)
+        return session.scalars(statement).one_or_none()
+
     def fetch_channel_by_slack_id_or_create_from_slack(
         self, session: Session, slack_id: str
     ) -> Channel:
@@ -84,12 +138,229 @@ class DataBroker:
 
         return config
 
+    # Reviewer toggles and membership changes go through the broker so
+    # that the reviewer index stays in step with user_channel_configs,
+    # here straight away and in other processes once the session commits
+    def change_reviewer_index(
+        self, session: Session, change: ReviewerIndexChange
+    ) -> None:
+        self.reviewer_index.apply(change)
+        announce_change(session, change)
+
+    def set_channel_reviewer(
+        self, session: Session, config: UserChannelConfig, reviewer: bool
+    ) -> None:
+        config.reviewer = reviewer
+        session.flush()
+        change = ReviewerIndexChange(
+            "reviewer", config.user_id, config.channel_id, reviewer
+        )
+        self.change_reviewer_index(session, change)
+
+    def record_channel_member_joined(
+        self, session: Session, user: User, channel: Channel
+    ) -> None:
+        config = self.fetch_or_create_channel_config_for_user_in_channel(
+            session, user, channel
+        )
+        session.flush()
+        change = ReviewerIndexChange("joined", user.id, channel.id, config.reviewer)
+        self.change_reviewer_index(session, change)
+
+    def record_channel_member_left(
+        self, session: Session, user: User, channel: Channel
+    ) -> None:
+        change = ReviewerIndexChange("left", user.id, channel.id)
+        self.change_reviewer_index(session, change)
+
+    def record_user_deactivated(self, session: Session, user: User) -> None:
+        self.change_reviewer_index(session, ReviewerIndexChange("deactivated", user.id))
+
+    def fetch_pull_request_by_url_or_create_from_github(
+        self, session: Session, url: str
+    ) -> PullRequest:
+        return self.fetch_pull_requests_by_url_or_create_from_github(session, [url])[0]
+
+    # Returns one PullRequest per URL, in the same order. Known PRs are
+    # loaded in a single query and unknown ones are fetched from GitHub
+    # concurrently.
+    def fetch_pull_requests_by_url_or_create_from_github(
+        self, session: Session, urls: Sequence[str]
+    ) -> list[PullRequest]:
+        pending = self.start_fetching_pull_requests(session, urls)
+        return self.finish_fetching_pull_requests(session, pending)
+
+    # The first half of fetch_pull_requests_by_url_or_create_from_github:
+    # loads the known PRs and starts fetching the rest from GitHub on the
+    # executor (if given, otherwise straight away). The session can be
+    # used for other things until finish_fetching_pull_requests().
+    def start_fetching_pull_requests(
+        self,
+        session: Session,
+        urls: Sequence[str],
+        executor: Optional[Executor] = None,
+    ) -> PendingPullRequests:
+        refs = [parse_pr_url(url) for url in urls]
+        statement = select(PullRequest).where(
+            tuple_(PullRequest.owner, PullRequest.repo, PullRequest.number).in_(
+                [(ref.owner, ref.repo, ref.number) for ref in refs]
+            )
+        )
+        pull_requests = {
+            PullRequestRef(pr.owner, pr.repo, pr.number): pr
+            for pr in session.scalars(statement)
+        }
+
+        missing = list(dict.fromkeys(ref for ref in refs if ref not in pull_requests))
+        records: Future[list[PullRequestRecord]]
+        if missing and executor is not None:
+            records = executor.submit(self.fetch_pull_request_records, missing)
+        else:
+            records = Future()
+            try:
+                records.set_result(self.fetch_pull_request_records(missing))
+            except Exception as error:
+                records.set_exception(error)
+
+        return PendingPullRequests(refs, pull_requests, missing, records)
+
+    # Waits for the GitHub fetch and adds the PRs it found. Raises
+    # whatever the fetch raised.
+    def finish_fetching_pull_requests(
+        self, session: Session, pending: PendingPullRequests
+    ) -> list[PullRequest]:
+        pull_requests = dict(pending.pull_requests)
+        records = pending.records.result()
+        if pending.missing:
+            # An upsert, since another request (or a webhook) can add the
+            # same PR in the meantime. In key order, so that concurrent
+            # upserts can't deadlock.
+            rows = sorted(
+                (
+                    {
+                        "owner": ref.owner,
+                        "repo": ref.repo,
+                        "number": ref.number,
+                        **self.pull_request_values(record),
+                    }
+                    for ref, record in zip(pending.missing, records)
+                ),
+                key=lambda row: (row["owner"], row["repo"], row["number"]),
+            )
+            inserted = insert(PullRequest).values(rows)
+            upsert = inserted.on_conflict_do_update(
+                index_elements=["owner", "repo", "number"],
+                set_={
+                    name: inserted.excluded[name]
+                    for name in rows[0]
+                    if name not in ("owner", "repo", "number")
+                },
+            ).returning(PullRequest)
+            upserted = session.scalars(
+                upsert, execution_options={"populate_existing": True}
+            ).all()
+            for pull_request in upserted:
+                ref = PullRequestRef(
+                    pull_request.owner, pull_request.repo, pull_request.number
+                )
+                pull_requests[ref] = pull_request
+            self.link_assignments_to_pull_requests(session, upserted)
+
+        return [pull_requests[ref] for ref in pending.refs]
+
+    # Only talks to GitHub, so is safe to call from any thread. Several
+    # PRs are fetched concurrently by the async client rather than with
+    # a thread each.
+    def fetch_pull_request_records(
+        self, refs: Sequence[PullRequestRef]
+    ) -> list[PullRequestRecord]:
+        if len(refs) <= 1:
+            return [self.github.pull_request(ref.url) for ref in refs]
+        records = self.github.pull_requests([ref.url for ref in refs])
+        return [records[ref.url] for ref in refs]
+
+    def pull_request_values(self, pr: PullRequestRecord) -> dict[str, Any]:
+        return {
+            "html_url": pr.html_url,
+            "author_login": pr.author_login,
+            "title": pr.title,
+            "state": pr.state,
+            "head_sha": pr.head_sha,
+            "fetched_at": datetime.now(),
+        }
+
+    def update_pull_request_from_github(
+        self, pull_request: PullRequest, pr: PullRequestRecord
+    ) -> None:
+        for name, value in self.pull_request_values(pr).items():
+            setattr(pull_request, name, value)
+
+    def fetch_pull_request_by_url(
+        self, session: Session, url: str
+    ) -> Optional[PullRequest]:
+        ref = parse_pr_url(url)
+        statement = (
+            select(PullRequest)
+            .where(PullRequest.owner == ref.owner)
+            .where(PullRequest.repo == ref.repo)
+            .where(PullRequest.number == ref.number)
+        )
+        return session.scalars(statement).one_or_none()
+
+    def fetch_active_assignments_for_pr_url(
+        self, session: Session, pr_url: str
+    ) -> Sequence[AssignedReview]:
+        statement = (
+            select(AssignedReview)
+            .where(AssignedReview.pr_url == pr_url)
+            .where(AssignedReview.completed_at == None)
+            .order_by(AssignedReview.id)
+        )
+        return session.scalars(statement).all()
+
     def fetch_assignments_for_pr_url(
         self, session: Session, pr_url: str
     ) -> Sequence[AssignedReview]:
         statement = select(AssignedReview).where(AssignedReview.pr_url == pr_url)
         return session.scalars(statement).all()
 
+    # Everyone ever assigned the PR, including assignments that have
+    # since been archived, so that nobody is assigned the same PR twice
+    def fetch_assignee_ids_for_pull_request(
+        self, session: Session, pull_request: PullRequest
+    ) -> set[int]:
+        # Not stored yet, so nobody can have been assigned it
+        if pull_request.id is None:
+            return set()
+        statement = union(
+            select(AssignedReview.assignee_id).where(
+                AssignedReview.pull_request_id == pull_request.id
+            ),
+            select(AssignedReviewHistory.assignee_id).where(
+                AssignedReviewHistory.pull_request_id == pull_request.id
+            ),
+        )
+        return set(session.scalars(statement))
+
+    # Assignments made before PRs were stored only have the URL. They
+    # are linked when their PR is first stored, so that looking up who
+    # has had a PR only needs its id.
+    def link_assignments_to_pull_requests(
+        self, session: Session, pull_requests: Sequence[PullRequest]
+    ) -> None:
+        ids = [pull_request.id for pull_request in pull_requests]
+        for model in (AssignedReview, AssignedReviewHistory):
+            session.execute(
+                update(model)
+                .where(
+                    model.pull_request_id == None,
+                    model.pr_url == PullRequest.html_url,
+                    PullRequest.id.in_(ids),
+                )
+                .values(pull_request_id=PullRequest.id)
+                .execution_options(synchronize_session="fetch")
+            )
+
     def fetch_active_assignments_for_slack_user_id(
         self, session: Session, slack_user_id: str
     ) -> Sequence[AssignedReview]:
@@ -108,6 +379,276 @@ class DataBroker:
         statement = select(AssignedReview).where(AssignedReview.id == id)
         return session.scalars(statement).one_or_none()
 
+    def fetch_open_review_counts(
+        self, session: Session, channel: Channel, users: Sequence[User]
+    ) -> dict[int, int]:
+        user_ids = [user.id for user in users if user.id is not None]
+        statement = (
+            select(UserChannelConfig.user_id, UserChannelConfig.open_reviews)
+            .where(UserChannelConfig.channel_id == channel.id)
+            .where(UserChannelConfig.user_id.in_(user_ids))
+        )
+        return {user_id: count for user_id, count in session.execute(statement)}
+
+    def fetch_round_robin_position(
+        self, session: Session, channel: Channel
+    ) -> Optional[int]:
+        session.flush()
+        statement = select(Channel.round_robin_last_user_id).where(
+            Channel.id == channel.id
+        )
+        last_user_id: Optional[int] = session.execute(statement).scalar_one()
+        return last_user_id
+
+    # A single compare-and-set UPDATE, so nothing is locked while the
+    # reviewers are being chosen. If another assignment has advanced
+    # the position since it was fetched this waits for that one to
+    # commit, then updates nothing and returns False.
+    def advance_round_robin_position(
+        self, session: Session, channel: Channel, seen: Optional[int], user_id: int
+    ) -> bool:
+        statement = (
+            update(Channel)
+            .where(Channel.id == channel.id)
+            .where(Channel.round_robin_last_user_id.is_not_distinct_from(seen))
+            .values(round_robin_last_user_id=user_id)
+            .returning(Channel.id)
+        )
+        return session.execute(statement).first() is not None
+
+    def adjust_open_review_counts(
+        self,
+        session: Session,
+        users: Sequence[User],
+        channel: Optional[Channel],
+        delta: int,
+    ) -> None:
+        if channel is None or not users:
+            return
+        # Make sure both have ids (and that a config created earlier in
+        # this session exists in the database)
+        session.flush()
+        statement = (
+            update(UserChannelConfig)
+            .where(UserChannelConfig.user_id.in_([user.id for user in users]))
+            .where(UserChannelConfig.channel_id == channel.id)
+            .values(
+                open_reviews=func.greatest(UserChannelConfig.open_reviews + delta, 0)
+            )
+        )
+        session.execute(statement)
+
+    # All assignment state changes go through the broker so that the
+    # open review counts stay in step with assigned_reviews
+    def create_assignments(
+        self,
+        session: Session,
+        assignees: Sequence[User],
+        requestor: User,
+        channel: Channel,
+        pull_request: PullRequest,
+    ) -> list[AssignedReview]:
+        now = datetime.now()
+        assignments = [
+            AssignedReview(
+                assignee=assignee,
+                requestor=requestor,
+                channel=channel,
+                pull_request=pull_request,
+                pr_url=pull_request.html_url,
+                assigned_at=now,
+            )
+            for assignee in assignees
+        ]
+        session.add_all(assignments)
+        # Flushes, so the assignments have their ids for the stats
+        self.adjust_open_review_counts(session, assignees, channel, 1)
+        stats.record_changes(
+            session, [stats.assignment_made(assignment) for assignment in assignments]
+        )
+        assignment_events.publish(
+            session,
+            [
+                AssignmentEvent.for_assignment("new", assignment, now)
+                for assignment in assignments
+            ],
+        )
+        return assignments
+
+    def acknowledge_assignment(
+        self, session: Session, assignment: AssignedReview
+    ) -> None:
+        first = assignment.acknowledged_at is None
+        assignment.acknowledged_at = datetime.now()
+        if first:
+            stats.record_changes(session, [stats.assignment_acknowledged(assignment)])
+            assignment_events.publish(
+                session,
+                [
+                    AssignmentEvent.for_assignment(
+                        "acknowledged", assignment, assignment.acknowledged_at
+                    )
+                ],
+            )
+
+    def reroll_assignment(self, session: Session, assignment: AssignedReview) -> None:
+        active = assignment.rerolled_at is None and assignment.completed_at is None
+        if active:
+            self.adjust_open_review_counts(
+                session, [assignment.assignee], assignment.channel, -1
+            )
+        assignment.rerolled_at = datetime.now()
+        if active:
+            stats.record_changes(session, [stats.assignment_rerolled(assignment)])
+            assignment_events.publish(
+                session,
+                [
+                    AssignmentEvent.for_assignment(
+                        "rerolled", assignment, assignment.rerolled_at
+                    )
+                ],
+            )
+
+    def complete_assignment(self, session: Session, assignment: AssignedReview) -> None:
+        active = assignment.rerolled_at is None and assignment.completed_at is None
+        if active:
+            self.adjust_open_review_counts(
+                session, [assignment.assignee], assignment.channel, -1
+            )
+        assignment.completed_at = datetime.now()
+        if active:
+            stats.record_changes(
+                session,
+                [
+                    stats.assignment_completed(
+                        assignment.assigned_at,
+                        assignment.completed_at,
+                        assignment.channel_id,
+                        assignment.assignee_id,
+                    )
+                ],
+            )
+            assignment_events.publish(
+                session,
+                [
+                    AssignmentEvent.for_assignment(
+                        "completed", assignment, assignment.completed_at
+                    )
+                ],
+            )
+
+    # Completes many assignments with one UPDATE, and releases their open
+    # reviews with one more. Assignments that are already complete are
+    # left alone. Returns how many assignments were completed, by the id
+    # of the user they were assigned to.
+    def complete_assignments(
+        self, session: Session, ids: Sequence[int], now: Optional[datetime] = None
+    ) -> Counter[int]:
+        if not ids:
+            return Counter()
+        session.flush()
+        statement = (
+            update(AssignedReview)
+            .where(AssignedReview.id.in_(ids))
+            .where(AssignedReview.completed_at == None)
+            .values(completed_at=now or datetime.now())
+            .returning(
+                AssignedReview.id,
+                AssignedReview.pr_url,
+                AssignedReview.assignee_id,
+                AssignedReview.channel_id,
+                AssignedReview.rerolled_at,
+                AssignedReview.assigned_at,
+                AssignedReview.completed_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        rows = session.execute(statement).all()
+
+        released = Counter(
+            (row.assignee_id, row.channel_id)
+            for row in rows
+            if row.rerolled_at is None and row.channel_id is not None
+        )
+        if released:
+            counts = values(
+                column("user_id", Integer),
+                column("channel_id", Integer),
+                column("released", Integer),
+                name="released",
+            ).data(
+                [
+                    (user_id, channel_id, n)
+                    for (user_id, channel_id), n in released.items()
+                ]
+            )
+            session.execute(
+                update(UserChannelConfig)
+                .where(UserChannelConfig.user_id == counts.c.user_id)
+                .where(UserChannelConfig.channel_id == counts.c.channel_id)
+                .values(
+                    open_reviews=func.greatest(
+                        UserChannelConfig.open_reviews - counts.c.released, 0
+                    )
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+        completed = [row for row in rows if row.rerolled_at is None]
+        stats.record_changes(
+            session,
+            [
+                stats.assignment_completed(
+                    row.assigned_at, row.completed_at, row.channel_id, row.assignee_id
+                )
+                for row in completed
+            ],
+        )
+        assignment_events.publish(
+            session,
+            [
+                AssignmentEvent(
+                    "completed",
+                    row.id,
+                    row.assignee_id,
+                    row.channel_id,
+                    row.pr_url,
+                    row.completed_at,
+                )
+                for row in completed
+            ],
+        )
+
+        return Counter(row.assignee_id for row in rows)
+
+    # Brings the stored state of many PRs up to date with one UPDATE
+    def refresh_pull_request_states(
+        self, session: Session, records: Sequence[PullRequestRecord]
+    ) -> None:
+        if not records:
+            return
+        refs = [parse_pr_url(record.html_url) for record in records]
+        states = values(
+            column("owner", String),
+            column("repo", String),
+            column("number", Integer),
+            column("state", String),
+            name="states",
+        ).data(
+            [
+                (ref.owner, ref.repo, ref.number, record.state)
+                for ref, record in zip(refs, records)
+            ]
+        )
+        session.execute(
+            update(PullRequest)
+            .where(PullRequest.owner == states.c.owner)
+            .where(PullRequest.repo == states.c.repo)
+            .where(PullRequest.number == states.c.number)
+            .values(state=states.c.state, fetched_at=datetime.now())
+            .execution_options(synchronize_session=False)
+        )
+
     def fetch_slack_user_ids_from_channel(self, channel: Channel) -> list[str]:
         channel_members = []
         for page in self.slack.conversations_members(channel=channel.slack_id):
@@ -117,6 +658,40 @@ class DataBroker:
     def get_user_presence_for_slack_id(self, slack_user_id: str) -> bool:
         return self.user_presence_cache.get_user_presence(slack_user_id)
 
+    # Looks up several users' presence at once, in the same order
+    def get_user_presences_for_slack_ids(
+        self, slack_user_ids: Sequence[str]
+    ) -> list[bool]:
+        if len(slack_user_ids) <= 1:
+            return [self.get_user_presence_for_slack_id(id) for id in slack_user_ids]
+        workers = min(len(slack_user_ids), MAX_PRESENCE_LOOKUPS)
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(
+                executor.map(self.get_user_presence_for_slack_id, slack_user_ids)
+            )
+
+    # True the first time an Events API event is seen, False for any
+    # redelivery of it. The insert is the check, so two replicas given
+    # the same event can't both handle it.
+    def record_slack_event_delivery(
+        self, session: Session, event_id: str, now: Optional[datetime] = None
+    ) -> bool:
+        statement = (
+            insert(SlackEventDelivery)
+            .values(event_id=event_id, received_at=now or datetime.now())
+            .on_conflict_do_nothing()
+            .returning(SlackEventDelivery.event_id)
+        )
+        return session.execute(statement).first() is not None
+
+    def prune_slack_event_deliveries(
+        self, session: Session, now: Optional[datetime] = None
+    ) -> None:
+        cutoff = (now or datetime.now()) - SLACK_EVENT_RETENTION
+        session.execute(
+            delete(SlackEventDelivery).where(SlackEventDelivery.received_at < cutoff)
+        )
+
     def fetch_user_channel_configs_for_slack_user_id(
         self, session: Session, slack_user_id: str
     ) -> Sequence[UserChannelConfig]:
@@ -126,4 +701,4 @@ class DataBroker:
         return session.scalars(statement).all()
 
 
-__all__ = ["DataBroker"]
+__all__ = ["DataBroker", "PendingPullRequests"]
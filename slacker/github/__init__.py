@@ -1,21 +1,201 @@
 import os
 import re
-from github import Github
-from github.PullRequest import PullRequest
+import json
+import logging
+import time
+from contextlib import contextmanager
+from threading import Lock
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Any, Iterator, Optional
+
+from slacker.github.refs import PR_RE, InvalidURLError, PullRequestRef, parse_pr_url
+from slacker.github.cache import CachedResponse, ResponseCache
+from slacker.github.rate_limit import BudgetExhausted, Priority, RateLimitBudget
+from slacker.github.transport import SLOW_REQUEST_SECONDS, TransportConfig
+from slacker.github.app_auth import GitHubAppAuth, NoInstallationError
+from slacker.metrics import Metrics, metrics as default_metrics
+from slacker.github.graphql import (
+    MAX_PULL_REQUESTS_PER_QUERY,
+    build_pull_request_state_query,
+    parse_pull_request_state_response,
+)
+
+# PyGithub takes longer to import than the rest of the bot put together,
+# so it is only imported once the first request needs it
+if TYPE_CHECKING:
+    from github import Github
+    from github.PullRequest import PullRequest
+    from github.Repository import Repository
+
+    from slacker.github.async_client import AsyncGitHub
 
-PR_RE = re.compile("https://github.com/([^/]*)/([^/]*)/pull/([0-9]+)")
 USERNAME_RE = re.compile("^[a-z0-9](?:[a-z0-9]|-(?=[a-z0-9])){0,38}$")
 
 
-class InvalidURLError(ValueError):
-    pass
+# The parts of a pull request that the bot uses, taken from the API
+# response without building a PyGithub object. full() builds one (from
+# the same response) for anything else.
+@dataclass
+class PullRequestRecord:
+    number: int
+    html_url: str
+    author_login: str
+    title: str
+    state: str
+    head_sha: str
+    merged: bool
+    client: Optional["Github"] = field(default=None, repr=False, compare=False)
+    raw_data: dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
+    raw_headers: dict[str, Any] = field(default_factory=dict, repr=False, compare=False)
+    _full: Optional["PullRequest"] = field(default=None, repr=False, compare=False)
+
+    @classmethod
+    def from_json(
+        cls,
+        data: dict[str, Any],
+        headers: Optional[dict[str, Any]] = None,
+        client: Optional["Github"] = None,
+    ) -> "PullRequestRecord":
+        return cls(
+            number=data["number"],
+            html_url=data["html_url"],
+            author_login=data["user"]["login"],
+            title=data["title"],
+            state=data["state"],
+            head_sha=data["head"]["sha"],
+            merged=bool(data.get("merged")),
+            client=client,
+            raw_data=data,
+            raw_headers=headers or {},
+        )
+
+    @classmethod
+    def from_graphql(cls, data: dict[str, Any]) -> "PullRequestRecord":
+        author = data.get("author") or {}
+        return cls(
+            number=data["number"],
+            html_url=data["url"],
+            # Deleted accounts come back without an author
+            author_login=author.get("login", "ghost"),
+            title=data["title"],
+            # GraphQL has a separate MERGED state, REST calls them closed
+            state="open" if data["state"] == "OPEN" else "closed",
+            head_sha=data["headRefOid"],
+            merged=bool(data["merged"]),
+        )
+
+    def full(self) -> "PullRequest":
+        from github.PullRequest import PullRequest
+
+        if self._full is None:
+            if self.client is None:
+                raise ValueError("No GitHub client to build the pull request with")
+            self._full = self.client.create_from_raw_data(
+                PullRequest, self.raw_data, self.raw_headers
+            )
+        return self._full
 
 
 class GitHub:
-    client: Github
+    token: Optional[str]
+    _client: Optional["Github"]
+    cache: ResponseCache
+    budget: RateLimitBudget
+    graphql_budget: RateLimitBudget
+    transport: TransportConfig
+    metrics: Metrics
+    app_auth: Optional[GitHubAppAuth]
+    # Installation id -> (REST budget, GraphQL budget) when
+    # authenticating as an app, since each installation has its own
+    # rate limits
+    installation_budgets: dict[int, tuple[RateLimitBudget, RateLimitBudget]]
+    _async_client: Optional["AsyncGitHub"]
+
+    # Authenticates with the personal access token, unless app_auth is
+    # given, in which case each request uses a token for the
+    # installation on the owner of the repo it is for
+    def __init__(
+        self,
+        token: Optional[str],
+        cache: Optional[ResponseCache] = None,
+        budget: Optional[RateLimitBudget] = None,
+        graphql_budget: Optional[RateLimitBudget] = None,
+        transport: Optional[TransportConfig] = None,
+        metrics: Metrics = default_metrics,
+        app_auth: Optional[GitHubAppAuth] = None,
+    ) -> None:
+        self.transport = transport or TransportConfig.from_env()
+        self.app_auth = app_auth
+        self.installation_budgets = {}
+        self.lock = Lock()
+        self.token = token
+        self._client = None
+        self._async_client = None
+        self.metrics = metrics
+        self.logger = logging.getLogger(__name__)
+        self.cache = cache or ResponseCache()
+        self.budget = budget or RateLimitBudget()
+        # GraphQL has its own (points based) rate limit
+        self.graphql_budget = graphql_budget or RateLimitBudget(resource="graphql")
 
-    def __init__(self, token: str) -> None:
-        self.client = Github(token)
+    # Built on first use, see above
+    @property
+    def client(self) -> "Github":
+        from github import Auth, Github
+
+        with self.lock:
+            if self._client is None:
+                token = self.token if self.app_auth is None else None
+                self._client = Github(
+                    auth=Auth.Token(token) if token else None,
+                    timeout=self.transport.timeout,
+                    retry=self.transport.retry(),
+                    pool_size=self.transport.pool_size,
+                )
+            return self._client
+
+    # For fetching many things at once over one connection pool, sharing
+    # this client's authentication, cache and budgets. Built on first
+    # use too, so that aiohttp isn't imported at startup.
+    @property
+    def async_client(self) -> "AsyncGitHub":
+        from slacker.github.async_client import AsyncGitHub
+
+        with self.lock:
+            if self._async_client is None:
+                self._async_client = AsyncGitHub(
+                    self.token,
+                    transport=self.transport,
+                    cache=self.cache,
+                    budget=self.budget,
+                    metrics=self.metrics,
+                    app_auth=self.app_auth,
+                    budget_for=self.budget_for,
+                )
+            return self._async_client
+
+    def budgets_for(self, owner: str) -> tuple[RateLimitBudget, RateLimitBudget]:
+        if self.app_auth is None:
+            return self.budget, self.graphql_budget
+        installation_id = self.app_auth.installation_id(owner)
+        with self.lock:
+            if installation_id not in self.installation_budgets:
+                self.installation_budgets[installation_id] = (
+                    RateLimitBudget(metrics=self.metrics),
+                    RateLimitBudget(resource="graphql", metrics=self.metrics),
+                )
+            return self.installation_budgets[installation_id]
+
+    def budget_for(self, owner: str) -> RateLimitBudget:
+        return self.budgets_for(owner)[0]
+
+    def authorization_headers(self, owner: Optional[str]) -> dict[str, str]:
+        if self.app_auth is None:
+            return {}
+        if owner is None:
+            raise ValueError("GitHub App requests need the owner of the repo")
+        return {"Authorization": self.app_auth.authorization(owner)}
 
     def valid_pr_url(self, url: str) -> bool:
         match = PR_RE.match(url)
@@ -25,15 +205,174 @@ class GitHub:
         match = USERNAME_RE.match(username)
         return match is not None
 
-    def pr(self, url: str) -> PullRequest:
-        match = PR_RE.match(url)
-        if match is None:
-            raise InvalidURLError("Not a valid GitHub PR URL")
-        repo_name = match[1] + "/" + match[2]
-        pr_num = int(match[3])
-        repo = self.client.get_repo(repo_name)
-        pr = repo.get_pull(pr_num)
-        return pr
+    # Records how long a request took, retries and all
+    @contextmanager
+    def timed(self, kind: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.metrics.observe("github_request_seconds", elapsed)
+            self.metrics.observe(f"github_{kind}_request_seconds", elapsed)
+            if elapsed > SLOW_REQUEST_SECONDS:
+                self.logger.warning(f"GitHub {kind} request took {elapsed:.1f}s")
+
+    # GETs an API path through the response cache. Fresh entries are
+    # returned as they are, stale ones are revalidated with their ETag.
+    # Anything that does need a request is subject to the rate limit
+    # budget for its priority.
+    def get_json(
+        self,
+        path: str,
+        priority: Priority = Priority.INTERACTIVE,
+        owner: Optional[str] = None,
+    ) -> tuple[dict[str, Any], Any]:
+        entry = self.cache.get(path)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.record_hit()
+            return entry.headers, entry.data
+
+        request_headers = {}
+        if entry is not None and entry.etag is not None:
+            request_headers["If-None-Match"] = entry.etag
+
+        budget = self.budget if owner is None else self.budget_for(owner)
+        budget.acquire(priority)
+        request_headers.update(self.authorization_headers(owner))
+        requester = self.client.requester
+        with self.timed("rest"):
+            status, headers, output = requester.requestJson(
+                "GET", path, headers=request_headers
+            )
+        budget.update(headers)
+        if status == 304 and entry is not None:
+            self.cache.record_not_modified(entry)
+            return entry.headers, entry.data
+
+        data = json.loads(output) if output else None
+        if status >= 400:
+            raise requester.createException(status, headers, data or {})
+
+        self.cache.record_miss()
+        etag = {key.lower(): value for key, value in headers.items()}.get("etag")
+        self.cache.put(
+            path,
+            CachedResponse(
+                etag=etag, headers=headers, data=data, fetched_at=datetime.now()
+            ),
+        )
+        return headers, data
+
+    def repo(
+        self, owner: str, repo: str, priority: Priority = Priority.INTERACTIVE
+    ) -> "Repository":
+        from github.Repository import Repository
+
+        headers, data = self.get_json(f"/repos/{owner}/{repo}", priority, owner)
+        return self.client.create_from_raw_data(Repository, data, headers)
+
+    # A single request (or none, if cached), and no PyGithub object
+    # unless the caller asks the record for one
+    def pull_request(
+        self, url: str, priority: Priority = Priority.INTERACTIVE
+    ) -> PullRequestRecord:
+        ref = parse_pr_url(url)
+        # The pull request includes its base repository, so there's no
+        # need to fetch the repository first
+        headers, data = self.get_json(
+            f"/repos/{ref.owner}/{ref.repo}/pulls/{ref.number}", priority, ref.owner
+        )
+        return PullRequestRecord.from_json(data, headers, self.client)
+
+    # Many PRs at once, fetched concurrently by the async client. Keyed
+    # by the URLs as given. The records have no full() object behind
+    # them.
+    def pull_requests(
+        self, urls: list[str], priority: Priority = Priority.INTERACTIVE
+    ) -> dict[str, PullRequestRecord]:
+        client = self.async_client
+        return client.run(client.pull_requests(urls, priority))
+
+    def pr(self, url: str) -> "PullRequest":
+        return self.pull_request(url).full()
+
+    # The current state of many PRs, at one GraphQL query per
+    # MAX_PULL_REQUESTS_PER_QUERY PRs. Keyed by the URLs as given; PRs
+    # that don't exist (or that we can't see) are left out. The records
+    # have no full() object behind them.
+    def pull_request_states(
+        self, urls: list[str], priority: Priority = Priority.INTERACTIVE
+    ) -> dict[str, PullRequestRecord]:
+        refs_by_url = {url: parse_pr_url(url) for url in urls}
+        # With app auth, each owner's PRs are queried with the token for
+        # its installation
+        groups: dict[Optional[str], list[PullRequestRef]] = {}
+        for ref in dict.fromkeys(refs_by_url.values()):
+            owner = ref.owner.lower() if self.app_auth is not None else None
+            groups.setdefault(owner, []).append(ref)
+
+        records: dict[PullRequestRef, PullRequestRecord] = {}
+        for owner, refs in groups.items():
+            for start in range(0, len(refs), MAX_PULL_REQUESTS_PER_QUERY):
+                chunk = refs[start : start + MAX_PULL_REQUESTS_PER_QUERY]
+                results = self.query_pull_request_states(chunk, priority, owner)
+                for ref, data in results.items():
+                    records[ref] = PullRequestRecord.from_graphql(data)
+
+        return {url: records[ref] for url, ref in refs_by_url.items() if ref in records}
+
+    def query_pull_request_states(
+        self,
+        refs: list[PullRequestRef],
+        priority: Priority,
+        owner: Optional[str] = None,
+    ) -> dict[PullRequestRef, dict[str, Any]]:
+        query, variables, aliases = build_pull_request_state_query(refs)
+        budget = self.graphql_budget if owner is None else self.budgets_for(owner)[1]
+        budget.acquire(priority)
+        requester = self.client.requester
+        # Not requester.graphql_query(), which gives up on the whole
+        # response if any one PR is missing
+        with self.timed("graphql"):
+            headers, response = requester.requestJsonAndCheck(
+                "POST",
+                requester.graphql_url,
+                headers=self.authorization_headers(owner),
+                input={"query": query, "variables": variables},
+            )
+        budget.update(headers)
+        errors = [
+            error
+            for error in response.get("errors", [])
+            if error.get("type") != "NOT_FOUND"
+        ]
+        if errors:
+            raise requester.createException(400, headers, response)
+        return parse_pull_request_state_response(response.get("data"), aliases)
+
+
+# PullRequest is re-exported for the callers of GitHub.pr(), without
+# importing PyGithub until one of them asks for it
+def __getattr__(name: str) -> Any:
+    if name == "PullRequest":
+        from github.PullRequest import PullRequest
+
+        return PullRequest
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-__all__ = ["GitHub", "InvalidURLError", "PullRequest"]
+__all__ = [
+    "BudgetExhausted",
+    "GitHub",
+    "GitHubAppAuth",
+    "InvalidURLError",
+    "NoInstallationError",
+    "PR_RE",
+    "Priority",
+    "PullRequest",
+    "PullRequestRecord",
+    "PullRequestRef",
+    "TransportConfig",
+    "parse_pr_url",
+]
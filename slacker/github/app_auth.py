@@ -0,0 +1,230 @@
+import os
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from threading import Event, Lock
+from typing import TYPE_CHECKING, Any, Callable, Mapping, Optional
+
+from slacker.github.transport import TransportConfig
+
+if TYPE_CHECKING:
+    import requests
+
+DEFAULT_BASE_URL = "https://api.github.com"
+# GitHub refuses app JWTs that are valid for more than 10 minutes
+JWT_LIFETIME = timedelta(minutes=9)
+# Allowance for our clock being ahead of GitHub's
+JWT_CLOCK_SKEW = timedelta(seconds=60)
+# Installation tokens last an hour. They're replaced once they are
+# this close to expiring, while requests carry on with the old one.
+DEFAULT_REFRESH_MARGIN = timedelta(minutes=5)
+# How long a request with no usable token waits for another thread
+# that is already fetching one
+TOKEN_WAIT_TIMEOUT = 30.0
+
+
+class NoInstallationError(Exception):
+    owner: str
+
+    def __init__(self, owner: str):
+        super().__init__(f"The GitHub App isn't installed for {owner}")
+        self.owner = owner
+
+
+@dataclass
+class InstallationToken:
+    token: str
+    expires_at: datetime
+
+
+def utcnow() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+# Authenticates as a GitHub App instead of with a personal access token.
+# The app's JWT is signed locally from its private key and exchanged for
+# a token for the installation on each owner (org or user), so every
+# installation gets its own rate limit. Tokens are cached until they
+# are close to expiring. Only one thread fetches a new one, and other
+# threads keep using the old token meanwhile unless it has expired.
+class GitHubAppAuth:
+    app_id: str
+    private_key: str
+    base_url: str
+    refresh_margin: timedelta
+    # Owner login (lower case) -> installation id
+    installations: dict[str, int]
+    tokens: dict[int, InstallationToken]
+    # Set when the fetch of an installation's token finishes
+    refreshing: dict[int, Event]
+
+    def __init__(
+        self,
+        app_id: str,
+        private_key: str,
+        base_url: str = DEFAULT_BASE_URL,
+        transport: Optional[TransportConfig] = None,
+        refresh_margin: timedelta = DEFAULT_REFRESH_MARGIN,
+        clock: Callable[[], datetime] = utcnow,
+    ):
+        self.app_id = app_id
+        self.private_key = private_key
+        self.base_url = base_url.rstrip("/")
+        self.transport = transport or TransportConfig.from_env()
+        self.refresh_margin = refresh_margin
+        self.clock = clock
+        self.installations = {}
+        self.tokens = {}
+        self.refreshing = {}
+        self._jwt: Optional[InstallationToken] = None
+        self._session: Optional["requests.Session"] = None
+        self.lock = Lock()
+
+    # None unless GITHUB_APP_ID and a private key (as
+    # GITHUB_APP_PRIVATE_KEY or a file at GITHUB_APP_PRIVATE_KEY_PATH)
+    # are set
+    @classmethod
+    def from_env(
+        cls, environ: Mapping[str, str] = os.environ
+    ) -> Optional["GitHubAppAuth"]:
+        app_id = environ.get("GITHUB_APP_ID")
+        private_key = environ.get("GITHUB_APP_PRIVATE_KEY")
+        private_key_path = environ.get("GITHUB_APP_PRIVATE_KEY_PATH")
+        if private_key is None and private_key_path is not None:
+            with open(private_key_path) as file:
+                private_key = file.read()
+        if not app_id or not private_key:
+            return None
+        return cls(app_id, private_key)
+
+    # Made on the first request, so that requests (and jwt, below) aren't
+    # imported at startup
+    @property
+    def session(self) -> "requests.Session":
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        with self.lock:
+            if self._session is None:
+                self._session = requests.Session()
+                adapter = HTTPAdapter(
+                    pool_connections=self.transport.pool_size,
+                    pool_maxsize=self.transport.pool_size,
+                    max_retries=self.transport.retry(),
+                )
+                self._session.mount("https://", adapter)
+            return self._session
+
+    # The app's own JWT, reused until shortly before it expires
+    def jwt(self) -> str:
+        import jwt
+
+        now = self.clock()
+        with self.lock:
+            if self._jwt is not None and now < self._jwt.expires_at - JWT_CLOCK_SKEW:
+                return self._jwt.token
+            expires_at = now + JWT_LIFETIME
+            token = jwt.encode(
+                {
+                    "iat": int((now - JWT_CLOCK_SKEW).timestamp()),
+                    "exp": int(expires_at.timestamp()),
+                    "iss": self.app_id,
+                },
+                self.private_key,
+                algorithm="RS256",
+            )
+            self._jwt = InstallationToken(token, expires_at)
+            return token
+
+    def app_request(self, method: str, path: str) -> Any:
+        response = self.session.request(
+            method,
+            self.base_url + path,
+            headers={
+                "Authorization": f"Bearer {self.jwt()}",
+                "Accept": "application/vnd.github+json",
+            },
+            timeout=self.transport.timeout,
+        )
+        response.raise_for_status()
+        return response.json()
+
+    def fetch_installations(self) -> dict[str, int]:
+        installations = {}
+        page = 1
+        while True:
+            data = self.app_request(
+                "GET", f"/app/installations?per_page=100&page={page}"
+            )
+            for installation in data:
+                login = installation["account"]["login"].lower()
+                installations[login] = installation["id"]
+            if len(data) < 100:
+                return installations
+            page += 1
+
+    def installation_id(self, owner: str) -> int:
+        key = owner.lower()
+        with self.lock:
+            installation_id = self.installations.get(key)
+        if installation_id is not None:
+            return installation_id
+
+        # Maybe it was installed since we last looked
+        installations = self.fetch_installations()
+        with self.lock:
+            self.installations = installations
+        if key not in installations:
+            raise NoInstallationError(owner)
+        return installations[key]
+
+    def fetch_installation_token(self, installation_id: int) -> InstallationToken:
+        data = self.app_request(
+            "POST", f"/app/installations/{installation_id}/access_tokens"
+        )
+        expires_at = datetime.fromisoformat(data["expires_at"].replace("Z", "+00:00"))
+        return InstallationToken(data["token"], expires_at)
+
+    # A token for the owner's installation
+    def token(self, owner: str) -> str:
+        installation_id = self.installation_id(owner)
+        now = self.clock()
+        with self.lock:
+            current = self.tokens.get(installation_id)
+            if current is not None and now < current.expires_at - self.refresh_margin:
+                return current.token
+
+            refresh = self.refreshing.get(installation_id)
+            if refresh is not None and current is not None and now < current.expires_at:
+                # Another thread is already getting the next one
+                return current.token
+            if refresh is None:
+                done = self.refreshing[installation_id] = Event()
+
+        if refresh is not None:
+            refresh.wait(TOKEN_WAIT_TIMEOUT)
+            with self.lock:
+                current = self.tokens.get(installation_id)
+            if current is None or self.clock() >= current.expires_at:
+                raise RuntimeError(f"No token for GitHub App installation on {owner}")
+            return current.token
+
+        try:
+            new = self.fetch_installation_token(installation_id)
+            with self.lock:
+                self.tokens[installation_id] = new
+            return new.token
+        finally:
+            with self.lock:
+                del self.refreshing[installation_id]
+            done.set()
+
+    def authorization(self, owner: str) -> str:
+        return f"token {self.token(owner)}"
+
+
+__all__ = [
+    "GitHubAppAuth",
+    "InstallationToken",
+    "NoInstallationError",
+    "DEFAULT_REFRESH_MARGIN",
+]
@@ -0,0 +1,420 @@
+import asyncio
+import json
+import logging
+import time
+from dataclasses import dataclass
+from datetime import datetime
+from threading import Lock, Thread
+from types import TracebackType
+from typing import Any, Callable, Coroutine, Optional, TypeVar
+
+import aiohttp
+
+from slacker.github import PullRequestRecord, parse_pr_url
+from slacker.github.app_auth import GitHubAppAuth
+from slacker.github.cache import CachedResponse, ResponseCache
+from slacker.github.rate_limit import Priority, RateLimitBudget
+from slacker.github.transport import (
+    RETRY_STATUSES,
+    SLOW_REQUEST_SECONDS,
+    TransportConfig,
+)
+from slacker.metrics import Metrics, metrics as default_metrics
+
+DEFAULT_BASE_URL = "https://api.github.com"
+
+T = TypeVar("T")
+
+
+def header(headers: dict[str, Any], name: str) -> Optional[str]:
+    name = name.lower()
+    for key, value in headers.items():
+        if key.lower() == name:
+            return str(value)
+    return None
+
+
+class GitHubRequestError(Exception):
+    status: int
+    data: Any
+    message: Optional[str]
+
+    def __init__(self, status: int, data: Any):
+        message = data.get("message") if isinstance(data, dict) else None
+        super().__init__(f"GitHub responded {status}: {message or data}")
+        self.status = status
+        self.data = data
+        self.message = message
+
+    # Like PyGithub's RateLimitExceededException
+    @property
+    def rate_limited(self) -> bool:
+        return self.status == 429 or (
+            self.status == 403
+            and self.message is not None
+            and "rate limit" in self.message.lower()
+        )
+
+
+@dataclass
+class RepositoryRecord:
+    full_name: str
+    owner_login: str
+    name: str
+    html_url: str
+    default_branch: str
+    private: bool
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "RepositoryRecord":
+        return cls(
+            full_name=data["full_name"],
+            owner_login=data["owner"]["login"],
+            name=data["name"],
+            html_url=data["html_url"],
+            default_branch=data["default_branch"],
+            private=bool(data["private"]),
+        )
+
+
+# Who a pull request is currently waiting on a review from
+@dataclass
+class ReviewRequests:
+    user_logins: list[str]
+    team_slugs: list[str]
+
+    @classmethod
+    def from_json(cls, data: dict[str, Any]) -> "ReviewRequests":
+        return cls(
+            user_logins=[user["login"] for user in data.get("users", [])],
+            team_slugs=[team["slug"] for team in data.get("teams", [])],
+        )
+
+
+# A small asyncio client for the few REST endpoints the bot needs:
+# pulls, repos and review requests. Responses become the same slim
+# records as GitHub.pull_request() gives, without any PyGithub objects.
+# One aiohttp session (and so one keep-alive connection pool) is shared
+# by every request, and it shares the response cache, rate limit budget
+# and retry policy of the sync client. Use it as an async context
+# manager, or call close() when done. Threads without a loop of their
+# own can call run(), which uses one the client keeps for them.
+class AsyncGitHub:
+    token: Optional[str]
+    base_url: str
+    transport: TransportConfig
+    cache: ResponseCache
+    budget: RateLimitBudget
+    metrics: Metrics
+    app_auth: Optional[GitHubAppAuth]
+    # Owner -> the budget to take its requests out of
+    budget_for: Callable[[str], RateLimitBudget]
+    loop: Optional[asyncio.AbstractEventLoop]
+
+    # Authenticates with the token, unless app_auth is given, in which
+    # case each request uses a token for the installation on the owner
+    # of the repo it is for, as GitHub does
+    def __init__(
+        self,
+        token: Optional[str],
+        base_url: str = DEFAULT_BASE_URL,
+        transport: Optional[TransportConfig] = None,
+        cache: Optional[ResponseCache] = None,
+        budget: Optional[RateLimitBudget] = None,
+        metrics: Metrics = default_metrics,
+        app_auth: Optional[GitHubAppAuth] = None,
+        budget_for: Optional[Callable[[str], RateLimitBudget]] = None,
+    ) -> None:
+        self.token = token
+        self.base_url = base_url.rstrip("/")
+        self.transport = transport or TransportConfig.from_env()
+        self.cache = cache or ResponseCache()
+        self.budget = budget or RateLimitBudget()
+        self.metrics = metrics
+        self.app_auth = app_auth
+        self.budget_for = budget_for or (lambda _owner: self.budget)
+        self.loop = None
+        self.loop_lock = Lock()
+        self.logger = logging.getLogger(__name__)
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    # Created on first use, so that it belongs to the running loop
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.transport.pool_size),
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=self.transport.timeout,
+                    sock_read=self.transport.timeout,
+                ),
+                headers=self.default_headers(),
+            )
+        return self._session
+
+    def default_headers(self) -> dict[str, str]:
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "User-Agent": "slacker",
+        }
+        if self.token is not None and self.app_auth is None:
+            headers["Authorization"] = f"Bearer {self.token}"
+        return headers
+
+    # Runs the coroutine to completion from a thread that isn't running
+    # an event loop, on one that the client starts the first time. The
+    # session belongs to that loop, so keep to run() or to awaiting the
+    # client directly, not both.
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        with self.loop_lock:
+            if self.loop is None:
+                self.loop = asyncio.new_event_loop()
+                Thread(target=self.loop.run_forever, name="github", daemon=True).start()
+            loop = self.loop
+        return asyncio.run_coroutine_threadsafe(coroutine, loop).result()
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+            self._session = None
+
+    async def __aenter__(self) -> "AsyncGitHub":
+        return self
+
+    async def __aexit__(
+        self,
+        exc_type: Optional[type[BaseException]],
+        exc: Optional[BaseException],
+        traceback: Optional[TracebackType],
+    ) -> None:
+        await self.close()
+
+    # The budget for the owner's requests, and the headers to
+    # authenticate them with. Getting an installation token can mean
+    # requests of its own, which mustn't hold up the loop.
+    async def authenticate(
+        self, owner: Optional[str]
+    ) -> tuple[RateLimitBudget, dict[str, str]]:
+        if self.app_auth is None:
+            return self.budget, {}
+        if owner is None:
+            raise ValueError("GitHub App requests need the owner of the repo")
+        budget = await asyncio.to_thread(self.budget_for, owner)
+        authorization = await asyncio.to_thread(self.app_auth.authorization, owner)
+        return budget, {"Authorization": authorization}
+
+    async def acquire(self, budget: RateLimitBudget, priority: Priority) -> None:
+        if priority is Priority.BACKGROUND:
+            # Background requests can be paced with a sleep, which
+            # mustn't hold up the loop
+            await asyncio.to_thread(budget.acquire, priority)
+        else:
+            budget.acquire(priority)
+
+    # One request, retried on connection errors and the statuses the
+    # sync client retries, with the same backoff. Returns the status,
+    # headers and decoded body of the last response. owner is the owner
+    # of the repo it is for, which app auth needs.
+    async def request(
+        self,
+        method: str,
+        path: str,
+        priority: Priority = Priority.INTERACTIVE,
+        headers: Optional[dict[str, str]] = None,
+        body: Optional[dict[str, Any]] = None,
+        owner: Optional[str] = None,
+    ) -> tuple[int, dict[str, Any], Any]:
+        budget, authorization = await self.authenticate(owner)
+        headers = {**(headers or {}), **authorization}
+        await self.acquire(budget, priority)
+        attempt = 0
+        start = time.perf_counter()
+        try:
+            while True:
+                attempt += 1
+                delay = self.transport.backoff(attempt)
+                try:
+                    async with self.session.request(
+                        method, self.base_url + path, headers=headers, json=body
+                    ) as response:
+                        status = response.status
+                        response_headers = dict(response.headers)
+                        output = await response.text()
+                except (aiohttp.ClientConnectionError, asyncio.TimeoutError):
+                    if attempt > self.transport.retries:
+                        raise
+                else:
+                    budget.update(response_headers)
+                    if (
+                        not self.should_retry(status, response_headers)
+                        or attempt > self.transport.retries
+                    ):
+                        return status, response_headers, self.decode(output)
+                    retry_after = header(response_headers, "Retry-After")
+                    if retry_after is not None and retry_after.isdigit():
+                        delay = min(
+                            float(retry_after), self.transport.secondary_rate_wait
+                        )
+
+                self.metrics.increment("github_request_retries")
+                await asyncio.sleep(delay)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.metrics.observe("github_request_seconds", elapsed)
+            self.metrics.observe("github_async_request_seconds", elapsed)
+            if elapsed > SLOW_REQUEST_SECONDS:
+                self.logger.warning(f"GitHub {method} {path} took {elapsed:.1f}s")
+
+    def should_retry(self, status: int, headers: dict[str, Any]) -> bool:
+        if status in RETRY_STATUSES:
+            return True
+        # Secondary rate limits are 403s that say when to try again
+        return status == 403 and header(headers, "Retry-After") is not None
+
+    def decode(self, output: str) -> Any:
+        if not output:
+            return None
+        try:
+            return json.loads(output)
+        except ValueError:
+            return output
+
+    # GETs an API path through the response cache, like GitHub.get_json()
+    async def get_json(
+        self,
+        path: str,
+        priority: Priority = Priority.INTERACTIVE,
+        owner: Optional[str] = None,
+    ) -> tuple[dict[str, Any], Any]:
+        entry = self.cache.get(path)
+        if entry is not None and self.cache.is_fresh(entry):
+            self.cache.record_hit()
+            return entry.headers, entry.data
+
+        request_headers = {}
+        if entry is not None and entry.etag is not None:
+            request_headers["If-None-Match"] = entry.etag
+
+        status, headers, data = await self.request(
+            "GET", path, priority, headers=request_headers, owner=owner
+        )
+        if status == 304 and entry is not None:
+            self.cache.record_not_modified(entry)
+            return entry.headers, entry.data
+        if status >= 400:
+            raise GitHubRequestError(status, data)
+
+        self.cache.record_miss()
+        self.cache.put(
+            path,
+            CachedResponse(
+                etag=header(headers, "ETag"),
+                headers=headers,
+                data=data,
+                fetched_at=datetime.now(),
+            ),
+        )
+        return headers, data
+
+    async def send_json(
+        self,
+        method: str,
+        path: str,
+        body: dict[str, Any],
+        priority: Priority = Priority.INTERACTIVE,
+        owner: Optional[str] = None,
+    ) -> Any:
+        status, _headers, data = await self.request(
+            method, path, priority, body=body, owner=owner
+        )
+        if status >= 400:
+            raise GitHubRequestError(status, data)
+        return data
+
+    async def pull_request(
+        self, url: str, priority: Priority = Priority.INTERACTIVE
+    ) -> PullRequestRecord:
+        ref = parse_pr_url(url)
+        headers, data = await self.get_json(
+            f"/repos/{ref.owner}/{ref.repo}/pulls/{ref.number}", priority, ref.owner
+        )
+        return PullRequestRecord.from_json(data, headers)
+
+    # Fetches the PRs concurrently, at most pool_size at a time. Keyed
+    # by the URLs as given.
+    async def pull_requests(
+        self, urls: list[str], priority: Priority = Priority.INTERACTIVE
+    ) -> dict[str, PullRequestRecord]:
+        semaphore = asyncio.Semaphore(self.transport.pool_size)
+
+        async def fetch(url: str) -> PullRequestRecord:
+            async with semaphore:
+                return await self.pull_request(url, priority)
+
+        unique_urls = list(dict.fromkeys(urls))
+        records = await asyncio.gather(*(fetch(url) for url in unique_urls))
+        return dict(zip(unique_urls, records))
+
+    async def repo(
+        self, owner: str, repo: str, priority: Priority = Priority.INTERACTIVE
+    ) -> RepositoryRecord:
+        _headers, data = await self.get_json(f"/repos/{owner}/{repo}", priority, owner)
+        return RepositoryRecord.from_json(data)
+
+    async def requested_reviewers(
+        self, url: str, priority: Priority = Priority.INTERACTIVE
+    ) -> ReviewRequests:
+        ref = parse_pr_url(url)
+        # Not cached, it changes as soon as anyone submits a review
+        status, _headers, data = await self.request(
+            "GET",
+            f"/repos/{ref.owner}/{ref.repo}/pulls/{ref.number}/requested_reviewers",
+            priority,
+            owner=ref.owner,
+        )
+        if status >= 400:
+            raise GitHubRequestError(status, data)
+        return ReviewRequests.from_json(data)
+
+    async def request_reviewers(
+        self,
+        url: str,
+        user_logins: list[str],
+        team_slugs: Optional[list[str]] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> PullRequestRecord:
+        ref = parse_pr_url(url)
+        data = await self.send_json(
+            "POST",
+            f"/repos/{ref.owner}/{ref.repo}/pulls/{ref.number}/requested_reviewers",
+            {"reviewers": user_logins, "team_reviewers": team_slugs or []},
+            priority,
+            ref.owner,
+        )
+        return PullRequestRecord.from_json(data)
+
+    async def remove_requested_reviewers(
+        self,
+        url: str,
+        user_logins: list[str],
+        team_slugs: Optional[list[str]] = None,
+        priority: Priority = Priority.INTERACTIVE,
+    ) -> PullRequestRecord:
+        ref = parse_pr_url(url)
+        data = await self.send_json(
+            "DELETE",
+            f"/repos/{ref.owner}/{ref.repo}/pulls/{ref.number}/requested_reviewers",
+            {"reviewers": user_logins, "team_reviewers": team_slugs or []},
+            priority,
+            ref.owner,
+        )
+        return PullRequestRecord.from_json(data)
+
+
+__all__ = [
+    "AsyncGitHub",
+    "GitHubRequestError",
+    "RepositoryRecord",
+    "ReviewRequests",
+]
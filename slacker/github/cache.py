@@ -0,0 +1,91 @@
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Any, Optional
+
+DEFAULT_CACHE_SIZE = 1024
+# How long a response is used without asking GitHub again. After this
+# it is revalidated with If-None-Match, which costs no rate limit when
+# nothing has changed.
+DEFAULT_CACHE_TTL = timedelta(minutes=1)
+
+
+@dataclass
+class CachedResponse:
+    etag: Optional[str]
+    headers: dict[str, Any]
+    data: Any
+    fetched_at: datetime
+
+
+@dataclass
+class CacheStats:
+    # Served from the cache without a request
+    hits: int = 0
+    # Fetched in full, either not cached or the ETag didn't match
+    misses: int = 0
+    # Revalidated with a 304
+    not_modified: int = 0
+
+
+# An LRU of GitHub API responses keyed by path, kept along with their
+# ETags so that stale entries can be revalidated with a conditional
+# request. Safe to share between threads.
+class ResponseCache:
+    entries: OrderedDict[str, CachedResponse]
+    max_entries: int
+    ttl: timedelta
+    stats: CacheStats
+
+    def __init__(
+        self, max_entries: int = DEFAULT_CACHE_SIZE, ttl: timedelta = DEFAULT_CACHE_TTL
+    ):
+        self.entries = OrderedDict()
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.stats = CacheStats()
+        self.lock = Lock()
+
+    def get(self, path: str) -> Optional[CachedResponse]:
+        with self.lock:
+            entry = self.entries.get(path)
+            if entry is not None:
+                self.entries.move_to_end(path)
+            return entry
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return datetime.now() - entry.fetched_at <= self.ttl
+
+    def put(self, path: str, response: CachedResponse) -> None:
+        with self.lock:
+            self.entries[path] = response
+            self.entries.move_to_end(path)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def record_hit(self) -> None:
+        with self.lock:
+            self.stats.hits += 1
+
+    def record_miss(self) -> None:
+        with self.lock:
+            self.stats.misses += 1
+
+    def record_not_modified(self, entry: CachedResponse) -> None:
+        with self.lock:
+            self.stats.not_modified += 1
+            entry.fetched_at = datetime.now()
+
+    def clear(self) -> None:
+        with self.lock:
+            self.entries.clear()
+
+
+__all__ = [
+    "ResponseCache",
+    "CachedResponse",
+    "CacheStats",
+    "DEFAULT_CACHE_SIZE",
+    "DEFAULT_CACHE_TTL",
+]
@@ -0,0 +1,93 @@
+from itertools import groupby
+from typing import Any, Optional
+
+from slacker.github.refs import PullRequestRef
+
+# GraphQL queries are limited by node count and cost rather than by
+# request, and 100 pull requests per query keeps well inside both
+MAX_PULL_REQUESTS_PER_QUERY = 100
+
+PULL_REQUEST_STATE_FRAGMENT = """
+fragment PullRequestState on PullRequest {
+  number
+  url
+  title
+  state
+  merged
+  headRefOid
+  author { login }
+}
+"""
+
+
+# Builds one query for all of the refs, with a repository alias per
+# repository and a pullRequest alias per PR within it. Values go in as
+# variables rather than being pasted into the query. Returns the query,
+# its variables and the ref each "rN.pM" alias path refers to.
+def build_pull_request_state_query(
+    refs: list[PullRequestRef],
+) -> tuple[str, dict[str, Any], dict[tuple[str, str], PullRequestRef]]:
+    declarations = []
+    selections = []
+    variables: dict[str, Any] = {}
+    aliases: dict[tuple[str, str], PullRequestRef] = {}
+
+    ordered = sorted(refs, key=lambda ref: (ref.owner, ref.repo))
+    pr_index = 0
+    for repo_index, (repository, group) in enumerate(
+        groupby(ordered, key=lambda ref: (ref.owner, ref.repo))
+    ):
+        owner, name = repository
+        repo_alias = f"r{repo_index}"
+        declarations += [f"$owner{repo_index}: String!", f"$name{repo_index}: String!"]
+        variables[f"owner{repo_index}"] = owner
+        variables[f"name{repo_index}"] = name
+
+        pull_requests = []
+        for ref in group:
+            pr_alias = f"p{pr_index}"
+            declarations.append(f"$number{pr_index}: Int!")
+            variables[f"number{pr_index}"] = ref.number
+            pull_requests.append(
+                f"{pr_alias}: pullRequest(number: $number{pr_index}) "
+                "{ ...PullRequestState }"
+            )
+            aliases[(repo_alias, pr_alias)] = ref
+            pr_index += 1
+
+        selections.append(
+            f"{repo_alias}: repository(owner: $owner{repo_index}, name: $name{repo_index}) "
+            "{ " + " ".join(pull_requests) + " }"
+        )
+
+    query = (
+        f"query({', '.join(declarations)}) {{\n  "
+        + "\n  ".join(selections)
+        + "\n}\n"
+        + PULL_REQUEST_STATE_FRAGMENT
+    )
+    return query, variables, aliases
+
+
+# Pulls each ref's pullRequest out of a response. Refs whose repository
+# or pull request couldn't be found are left out.
+def parse_pull_request_state_response(
+    data: Optional[dict[str, Any]], aliases: dict[tuple[str, str], PullRequestRef]
+) -> dict[PullRequestRef, dict[str, Any]]:
+    results = {}
+    for (repo_alias, pr_alias), ref in aliases.items():
+        repository = (data or {}).get(repo_alias)
+        if repository is None:
+            continue
+        pull_request = repository.get(pr_alias)
+        if pull_request is None:
+            continue
+        results[ref] = pull_request
+    return results
+
+
+__all__ = [
+    "MAX_PULL_REQUESTS_PER_QUERY",
+    "build_pull_request_state_query",
+    "parse_pull_request_state_response",
+]
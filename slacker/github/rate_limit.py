@@ -0,0 +1,131 @@
+import math
+import time
+from datetime import datetime, timedelta
+from enum import Enum
+from threading import Lock
+from typing import Any, Callable, Optional
+
+from slacker.metrics import Metrics, metrics as default_metrics
+
+# Share of the hourly limit that only interactive requests may use
+DEFAULT_INTERACTIVE_RESERVE = 0.2
+# Longest a background request is held back when pacing
+DEFAULT_MAX_BACKGROUND_DELAY = timedelta(seconds=30)
+
+
+class Priority(Enum):
+    # Someone is waiting on the result, e.g. a review request
+    INTERACTIVE = "interactive"
+    # Sweeps, refreshes and anything else that can wait
+    BACKGROUND = "background"
+
+
+class BudgetExhausted(Exception):
+    retry_at: Optional[datetime]
+
+    def __init__(self, retry_at: Optional[datetime]):
+        super().__init__(
+            f"GitHub rate limit reserved for interactive use until {retry_at}"
+        )
+        self.retry_at = retry_at
+
+
+# Tracks the rate limit GitHub reports on every response. Interactive
+# requests are always let through. Background requests are paced once
+# the unreserved budget runs low, and refused with BudgetExhausted once
+# only the interactive reserve is left, so that a job can never spend
+# the quota that review requests need.
+class RateLimitBudget:
+    limit: Optional[int]
+    remaining: Optional[int]
+    reset_at: Optional[datetime]
+    reserve: float
+    max_delay: timedelta
+    # Which of GitHub's rate limits this is tracking, as given in the
+    # X-RateLimit-Resource header
+    resource: str
+
+    def __init__(
+        self,
+        resource: str = "core",
+        reserve: float = DEFAULT_INTERACTIVE_RESERVE,
+        max_delay: timedelta = DEFAULT_MAX_BACKGROUND_DELAY,
+        sleep: Callable[[float], None] = time.sleep,
+        metrics: Metrics = default_metrics,
+    ):
+        self.resource = resource
+        self.limit = None
+        self.remaining = None
+        self.reset_at = None
+        self.reserve = reserve
+        self.max_delay = max_delay
+        self.sleep = sleep
+        self.metrics = metrics
+        self.lock = Lock()
+
+    def update(self, headers: dict[str, Any]) -> None:
+        values = {key.lower(): value for key, value in headers.items()}
+        if "x-ratelimit-remaining" not in values:
+            return
+        if values.get("x-ratelimit-resource", self.resource) != self.resource:
+            return
+        with self.lock:
+            self.remaining = int(values["x-ratelimit-remaining"])
+            if "x-ratelimit-limit" in values:
+                self.limit = int(values["x-ratelimit-limit"])
+            if "x-ratelimit-reset" in values:
+                self.reset_at = datetime.fromtimestamp(int(values["x-ratelimit-reset"]))
+            self.metrics.set_gauge(self.metric_name("remaining"), self.remaining)
+            if self.limit is not None:
+                self.metrics.set_gauge(self.metric_name("limit"), self.limit)
+
+    def metric_name(self, name: str) -> str:
+        if self.resource == "core":
+            return f"github_rate_limit_{name}"
+        return f"github_{self.resource}_rate_limit_{name}"
+
+    def reserved(self) -> int:
+        if self.limit is None:
+            return 0
+        return math.ceil(self.limit * self.reserve)
+
+    # Called before each request to GitHub
+    def acquire(self, priority: Priority) -> None:
+        delay = 0.0
+        with self.lock:
+            now = datetime.now()
+            if self.reset_at is not None and now >= self.reset_at:
+                # The window has reset, we'll find out the new numbers
+                # from the next response
+                self.remaining = None
+                self.reset_at = None
+
+            if priority is Priority.BACKGROUND and self.remaining is not None:
+                reserved = self.reserved()
+                spare = self.remaining - reserved
+                if spare <= 0:
+                    self.metrics.increment("github_background_requests_deferred")
+                    raise BudgetExhausted(self.reset_at)
+                # Below twice the reserve, spread what's left over the
+                # rest of the window
+                if spare < reserved and self.reset_at is not None:
+                    delay = min(
+                        (self.reset_at - now).total_seconds() / spare,
+                        self.max_delay.total_seconds(),
+                    )
+
+            if self.remaining is not None:
+                self.remaining -= 1
+            self.metrics.increment(f"github_{priority.value}_requests")
+
+        if delay > 0:
+            self.metrics.increment("github_background_requests_delayed")
+            self.sleep(delay)
+
+
+__all__ = [
+    "RateLimitBudget",
+    "Priority",
+    "BudgetExhausted",
+    "DEFAULT_INTERACTIVE_RESERVE",
+]
@@ -0,0 +1,34 @@
+import re
+from dataclasses import dataclass
+
+PR_RE = re.compile("https://github.com/([^/]*)/([^/]*)/pull/([0-9]+)")
+
+
+class InvalidURLError(ValueError):
+    pass
+
+
+@dataclass(frozen=True)
+class PullRequestRef:
+    owner: str
+    repo: str
+    number: int
+
+    @property
+    def url(self) -> str:
+        return f"https://github.com/{self.owner}/{self.repo}/pull/{self.number}"
+
+
+# Owner and repo names are case-insensitive on GitHub, and anything
+# after the PR number (/files, query strings, trailing slashes, ...)
+# still refers to the same PR
+def parse_pr_url(url: str) -> PullRequestRef:
+    match = PR_RE.match(url)
+    if match is None:
+        raise InvalidURLError("Not a valid GitHub PR URL")
+    return PullRequestRef(
+        owner=match[1].lower(), repo=match[2].lower(), number=int(match[3])
+    )
+
+
+__all__ = ["PR_RE", "InvalidURLError", "PullRequestRef", "parse_pr_url"]
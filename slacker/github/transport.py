@@ -0,0 +1,73 @@
+import os
+import random
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Mapping
+
+if TYPE_CHECKING:
+    from github.GithubRetry import GithubRetry
+
+# Enough for a batch of concurrent PR fetches plus the sweeper and
+# webhook worker without anyone waiting for a connection
+DEFAULT_POOL_SIZE = 16
+# Seconds. requests applies it to connecting and to each read
+# separately, so it isn't a limit on the whole request.
+DEFAULT_TIMEOUT = 10
+DEFAULT_RETRIES = 3
+# Retries wait backoff_factor * 2^(n-1) seconds, plus up to
+# backoff_jitter seconds at random so that concurrent requests that
+# failed together don't all retry together
+DEFAULT_BACKOFF_FACTOR = 0.5
+DEFAULT_BACKOFF_JITTER = 0.5
+DEFAULT_BACKOFF_MAX = 10.0
+# How long to wait after hitting a secondary rate limit that doesn't
+# say how long to wait
+DEFAULT_SECONDARY_RATE_WAIT = 30.0
+RETRY_STATUSES = [429, 500, 502, 503, 504]
+# Requests slower than this (including any retries) are logged
+SLOW_REQUEST_SECONDS = 5.0
+
+
+# How the PyGithub client talks to GitHub: the size of its keep-alive
+# connection pool, its timeouts and how it retries
+@dataclass(frozen=True)
+class TransportConfig:
+    pool_size: int = DEFAULT_POOL_SIZE
+    timeout: int = DEFAULT_TIMEOUT
+    retries: int = DEFAULT_RETRIES
+    backoff_factor: float = DEFAULT_BACKOFF_FACTOR
+    backoff_jitter: float = DEFAULT_BACKOFF_JITTER
+    backoff_max: float = DEFAULT_BACKOFF_MAX
+    secondary_rate_wait: float = DEFAULT_SECONDARY_RATE_WAIT
+
+    @classmethod
+    def from_env(cls, environ: Mapping[str, str] = os.environ) -> "TransportConfig":
+        defaults = cls()
+        return cls(
+            pool_size=int(environ.get("GITHUB_POOL_SIZE", defaults.pool_size)),
+            timeout=int(environ.get("GITHUB_TIMEOUT", defaults.timeout)),
+            retries=int(environ.get("GITHUB_RETRIES", defaults.retries)),
+        )
+
+    def retry(self) -> "GithubRetry":
+        from github.GithubRetry import GithubRetry
+
+        return GithubRetry(
+            secondary_rate_wait=self.secondary_rate_wait,
+            total=self.retries,
+            backoff_factor=self.backoff_factor,
+            backoff_jitter=self.backoff_jitter,
+            backoff_max=self.backoff_max,
+            status_forcelist=RETRY_STATUSES,
+            respect_retry_after_header=True,
+            raise_on_status=False,
+        )
+
+    # The same backoff as retry() gives urllib3, for clients that retry
+    # by themselves. retry_number starts at 1.
+    def backoff(self, retry_number: int) -> float:
+        delay = min(self.backoff_factor * 2.0 ** (retry_number - 1), self.backoff_max)
+        # Not for security, so B311 doesn't apply
+        return delay + random.uniform(0, self.backoff_jitter)  # nosec B311
+
+
+__all__ = ["TransportConfig", "SLOW_REQUEST_SECONDS"]
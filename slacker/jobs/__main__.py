@@ -0,0 +1,110 @@
+import os
+import argparse
+import logging
+from datetime import date, timedelta
+from dotenv import load_dotenv
+
+from slack_sdk.web import WebClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from slacker.data_broker import DataBroker
+from slacker.github import GitHub, GitHubAppAuth
+from slacker.jobs.archive_assigned_reviews import (
+    ArchiveAssignedReviews,
+    DEFAULT_ARCHIVE_AGE,
+    DEFAULT_BATCH_SIZE,
+)
+from slacker.jobs.backfill_review_stats import BackfillReviewStats
+from slacker.jobs.reconcile_open_review_counts import ReconcileOpenReviewCounts
+from slacker.jobs.sweep_finished_assignments import (
+    SweepFinishedAssignments,
+    DEFAULT_SWEEP_BATCH_SIZE,
+    sweep_lock,
+)
+
+load_dotenv()
+logging.basicConfig()
+
+parser = argparse.ArgumentParser(prog="python -mslacker.jobs")
+jobs = parser.add_subparsers(dest="job", required=True)
+
+archive = jobs.add_parser(
+    "archive-assigned-reviews",
+    help="Move old completed and rerolled reviews into assigned_reviews_history",
+)
+archive.add_argument("--older-than-days", type=float, default=DEFAULT_ARCHIVE_AGE.days)
+archive.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+archive.add_argument(
+    "--pause", type=float, default=0.0, help="Seconds to sleep between batches"
+)
+
+jobs.add_parser(
+    "reconcile-open-review-counts",
+    help="Recalculate per-channel open review counters from assigned_reviews",
+)
+
+backfill = jobs.add_parser(
+    "backfill-review-stats",
+    help="Rebuild the review stats rollups from assigned_reviews",
+)
+backfill.add_argument(
+    "--since", type=date.fromisoformat, help="First day to rebuild (YYYY-MM-DD)"
+)
+backfill.add_argument(
+    "--until", type=date.fromisoformat, help="Day to stop before (YYYY-MM-DD)"
+)
+
+sweep = jobs.add_parser(
+    "sweep-finished-assignments",
+    help="Complete assignments whose PRs have been merged or closed",
+)
+sweep.add_argument("--batch-size", type=int, default=DEFAULT_SWEEP_BATCH_SIZE)
+
+args = parser.parse_args()
+
+db_url = os.environ.get("DATABASE_URL")
+if db_url == None:
+    print("DATABASE_URL is not set")
+    raise SystemExit(1)
+
+engine = create_engine(db_url)
+
+with Session(engine) as session:
+    if args.job == "archive-assigned-reviews":
+        job = ArchiveAssignedReviews(
+            age=timedelta(days=args.older_than_days),
+            batch_size=args.batch_size,
+            pause=args.pause,
+        )
+        print(f"Archived {job.perform(session)} assigned reviews")
+    if args.job == "reconcile-open-review-counts":
+        fixed = ReconcileOpenReviewCounts().perform(session)
+        print(f"Corrected {fixed} open review counters")
+    if args.job == "backfill-review-stats":
+        rows = BackfillReviewStats(args.since, args.until).perform(session)
+        print(f"Wrote {rows} rows of daily review stats")
+    if args.job == "sweep-finished-assignments":
+        github_token = os.environ.get("GITHUB_TOKEN")
+        github_app_auth = GitHubAppAuth.from_env()
+        slack_token = os.environ.get("SLACK_BOT_TOKEN")
+        if github_token is None and github_app_auth is None:
+            print(
+                "GITHUB_TOKEN (or GITHUB_APP_ID and GITHUB_APP_PRIVATE_KEY) is not set"
+            )
+            raise SystemExit(1)
+        # App homes aren't refreshed from here, they catch up the next
+        # time they're opened
+        broker = DataBroker(
+            WebClient(token=slack_token),
+            GitHub(github_token, app_auth=github_app_auth),
+        )
+        with sweep_lock(engine) as locked:
+            if not locked:
+                print("Another process is sweeping")
+                raise SystemExit(1)
+            sweep_job = SweepFinishedAssignments(broker, args.batch_size)
+            swept = sweep_job.perform(session)
+        print(f"Completed {swept.completed} assignments for finished PRs")
+        if swept.deferred:
+            print("Stopped early to leave GitHub's rate limit for interactive use")
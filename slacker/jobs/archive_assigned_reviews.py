@@ -0,0 +1,75 @@
+import time
+from datetime import datetime, timedelta
+from typing import Optional, cast
+
+from sqlalchemy import Table, delete, insert, or_, select
+from sqlalchemy.orm import Session
+
+from slacker.model import AssignedReview, AssignedReviewHistory
+
+DEFAULT_ARCHIVE_AGE = timedelta(days=30)
+DEFAULT_BATCH_SIZE = 500
+
+
+class ArchiveAssignedReviews:
+    age: timedelta
+    batch_size: int
+    pause: float
+
+    def __init__(
+        self,
+        age: timedelta = DEFAULT_ARCHIVE_AGE,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        pause: float = 0.0,
+    ):
+        self.age = age
+        self.batch_size = batch_size
+        self.pause = pause
+
+    def perform(self, session: Session, now: Optional[datetime] = None) -> int:
+        cutoff = (now or datetime.now()) - self.age
+        archived = 0
+
+        while True:
+            moved = self.archive_batch(session, cutoff)
+            # Commit every batch so that no batch holds its row locks
+            # for longer than it takes to move batch_size rows
+            session.commit()
+            archived += moved
+
+            if moved < self.batch_size:
+                return archived
+
+            if self.pause:
+                time.sleep(self.pause)
+
+    def archive_batch(self, session: Session, cutoff: datetime) -> int:
+        hot = cast(Table, AssignedReview.__table__)
+        history = cast(Table, AssignedReviewHistory.__table__)
+        columns = [column.name for column in history.columns]
+
+        # Rerolled assignments are finished with too, whether or not
+        # anyone completed them. SKIP LOCKED so that we step around rows
+        # that the bot is busy with rather than waiting on them.
+        batch = (
+            select(hot.c.id)
+            .where(or_(hot.c.completed_at < cutoff, hot.c.rerolled_at < cutoff))
+            .order_by(hot.c.id)
+            .limit(self.batch_size)
+            .with_for_update(skip_locked=True)
+        )
+        moved = (
+            delete(hot)
+            .where(hot.c.id.in_(batch.scalar_subquery()))
+            .returning(*[hot.c[name] for name in columns])
+            .cte("moved")
+        )
+        statement = insert(history).from_select(
+            columns, select(*[moved.c[name] for name in columns])
+        )
+        result = session.execute(statement)
+        rowcount: int = result.rowcount  # type: ignore[attr-defined]
+        return rowcount
+
+
+__all__ = ["ArchiveAssignedReviews", "DEFAULT_ARCHIVE_AGE", "DEFAULT_BATCH_SIZE"]
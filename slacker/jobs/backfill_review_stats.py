@@ -0,0 +1,149 @@
+from datetime import date, datetime, timedelta
+from typing import Iterator, Optional
+
+from sqlalchemy import (
+    Date,
+    DateTime,
+    Integer,
+    cast,
+    column,
+    delete,
+    func,
+    select,
+    table,
+    text,
+)
+from sqlalchemy.orm import Session
+
+from slacker import stats
+from slacker.model import AssignedReview, ReviewStatsDaily, ReviewStatsHistogram
+
+# Both the hot and the archived assignments
+assigned_reviews_all = table(
+    "assigned_reviews_all",
+    column("assignee_id", Integer),
+    column("channel_id", Integer),
+    column("assigned_at", DateTime),
+    column("acknowledged_at", DateTime),
+    column("rerolled_at", DateTime),
+    column("completed_at", DateTime),
+)
+
+
+class BackfillReviewStats:
+    # Days of assignment, since inclusive and until not. None for no
+    # limit.
+    since: Optional[date]
+    until: Optional[date]
+
+    def __init__(self, since: Optional[date] = None, until: Optional[date] = None):
+        self.since = since
+        self.until = until
+
+    # Rebuilds the rollups for the days from every assignment made on
+    # them, archived or not, a day per transaction. Returns how many
+    # daily rows were written.
+    def perform(self, session: Session) -> int:
+        written = 0
+        for day in self.days(session):
+            written += self.backfill_day(session, day)
+            session.commit()
+        return written
+
+    # Every day in range that has assignments or rollups
+    def days(self, session: Session) -> Iterator[date]:
+        reviews = assigned_reviews_all.c
+        first_assigned, last_assigned = session.execute(
+            select(
+                cast(func.min(reviews.assigned_at), Date),
+                cast(func.max(reviews.assigned_at), Date),
+            ).where(reviews.channel_id != None)
+        ).one()
+        first_rollup, last_rollup = session.execute(
+            select(func.min(ReviewStatsDaily.day), func.max(ReviewStatsDaily.day))
+        ).one()
+        firsts = [day for day in (first_assigned, first_rollup) if day is not None]
+        lasts = [day for day in (last_assigned, last_rollup) if day is not None]
+        if not firsts:
+            return
+
+        day = max(min(firsts), self.since) if self.since else min(firsts)
+        until = min(max(lasts) + timedelta(days=1), self.until or date.max)
+        while day < until:
+            yield day
+            day += timedelta(days=1)
+
+    def backfill_day(self, session: Session, day: date) -> int:
+        # Only for as long as it takes to rebuild one day. The bot's
+        # incremental updates wait until this commits and are then
+        # added on top, so none are lost or counted twice.
+        session.execute(
+            text(
+                "LOCK TABLE review_stats_daily, review_stats_histograms "
+                "IN EXCLUSIVE MODE"
+            )
+        )
+        for model in (ReviewStatsDaily, ReviewStatsHistogram):
+            session.execute(delete(model).where(model.day == day))
+
+        start = datetime.combine(day, datetime.min.time())
+        reviews = assigned_reviews_all.c
+        rows = session.execute(
+            select(
+                reviews.assignee_id,
+                reviews.channel_id,
+                reviews.assigned_at,
+                reviews.acknowledged_at,
+                reviews.rerolled_at,
+                reviews.completed_at,
+            ).where(
+                reviews.channel_id != None,
+                reviews.assigned_at >= start,
+                reviews.assigned_at < start + timedelta(days=1),
+            )
+        )
+        changes: list[Optional[stats.StatsChange]] = []
+        for row in rows:
+            # Never added to the session, only for working out the
+            # changes the same way as the broker does
+            assignment = AssignedReview(**row._asdict())
+            changes.append(stats.assignment_made(assignment))
+            if assignment.acknowledged_at is not None:
+                changes.append(stats.assignment_acknowledged(assignment))
+            if self.rerolled(assignment):
+                changes.append(stats.assignment_rerolled(assignment))
+            if assignment.completed_at is not None and self.completed(assignment):
+                changes.append(
+                    stats.assignment_completed(
+                        assignment.assigned_at,
+                        assignment.completed_at,
+                        assignment.channel_id,
+                        assignment.assignee_id,
+                    )
+                )
+        stats.record_changes(session, changes)
+        return len(
+            {
+                (change.day, change.channel_id, change.user_id)
+                for change in changes
+                if change is not None
+            }
+        )
+
+    # The same rules as the broker uses: a reroll counts unless the
+    # assignment was already complete, and a completion unless it had
+    # already been rerolled
+    def rerolled(self, assignment: AssignedReview) -> bool:
+        return assignment.rerolled_at is not None and (
+            assignment.completed_at is None
+            or assignment.rerolled_at <= assignment.completed_at
+        )
+
+    def completed(self, assignment: AssignedReview) -> bool:
+        return assignment.completed_at is not None and (
+            assignment.rerolled_at is None
+            or assignment.completed_at < assignment.rerolled_at
+        )
+
+
+__all__ = ["BackfillReviewStats"]
@@ -0,0 +1,51 @@
+from sqlalchemy import and_, func, select, update
+from sqlalchemy.orm import Session
+
+from slacker.model import AssignedReview, UserChannelConfig
+
+
+class ReconcileOpenReviewCounts:
+    # Recalculates UserChannelConfig.open_reviews from assigned_reviews
+    # and fixes up any counters that have drifted. Returns how many
+    # counters were wrong.
+    def perform(self, session: Session) -> int:
+        # Every counter is locked before counting. An assignment change
+        # that has already adjusted a counter is waited for and then
+        # counted; one that hasn't yet adjusts it after this commits, on
+        # top of the corrected value.
+        session.execute(
+            select(UserChannelConfig.id)
+            .order_by(UserChannelConfig.id)
+            .with_for_update()
+        )
+        actual = (
+            select(
+                UserChannelConfig.id,
+                func.count(AssignedReview.id).label("open_reviews"),
+            )
+            .outerjoin(
+                AssignedReview,
+                and_(
+                    AssignedReview.assignee_id == UserChannelConfig.user_id,
+                    AssignedReview.channel_id == UserChannelConfig.channel_id,
+                    AssignedReview.completed_at == None,
+                    AssignedReview.rerolled_at == None,
+                ),
+            )
+            .group_by(UserChannelConfig.id)
+            .cte("actual")
+        )
+        statement = (
+            update(UserChannelConfig)
+            .where(UserChannelConfig.id == actual.c.id)
+            .where(UserChannelConfig.open_reviews != actual.c.open_reviews)
+            .values(open_reviews=actual.c.open_reviews)
+            .execution_options(synchronize_session=False)
+        )
+        result = session.execute(statement)
+        session.commit()
+        rowcount: int = result.rowcount  # type: ignore[attr-defined]
+        return rowcount
+
+
+__all__ = ["ReconcileOpenReviewCounts"]
@@ -0,0 +1,125 @@
+import logging
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
+from typing import Iterator, Optional
+
+from sqlalchemy import Engine, func, select
+from sqlalchemy.orm import Session
+
+from slacker.data_broker import DataBroker
+from slacker.github import BudgetExhausted, Priority
+from slacker.model import AssignedReview, User
+
+DEFAULT_SWEEP_BATCH_SIZE = 500
+DEFAULT_SWEEP_INTERVAL = timedelta(minutes=15)
+# The advisory lock held by whichever process is sweeping
+SWEEP_LOCK_ID = 0x736C61636B657201
+
+
+@dataclass
+class SweepResult:
+    completed: int = 0
+    # Slack ids of the users who had assignments completed, i.e. whose
+    # app homes are now out of date
+    affected_slack_ids: set[str] = field(default_factory=set)
+    # Whether the sweep stopped early to leave GitHub's rate limit for
+    # interactive use
+    deferred: bool = False
+
+
+# Yields whether this process gets to sweep, i.e. no other bot process
+# or cron job is already sweeping. The lock is held on a connection of
+# its own, since a session gives its connection back on every commit,
+# and is released when the sweep ends or that connection is lost.
+@contextmanager
+def sweep_lock(engine: Engine) -> Iterator[bool]:
+    with engine.connect() as connection:
+        locked = bool(
+            connection.scalar(select(func.pg_try_advisory_lock(SWEEP_LOCK_ID)))
+        )
+        connection.commit()
+        try:
+            yield locked
+        finally:
+            if locked:
+                connection.scalar(select(func.pg_advisory_unlock(SWEEP_LOCK_ID)))
+                connection.commit()
+
+
+# Completes active assignments whose PRs have been merged or closed.
+# Walks the active assignments in id order a batch at a time, checks
+# each batch's PRs with one GraphQL query (at background priority), and
+# completes the finished ones with a single UPDATE per batch.
+class SweepFinishedAssignments:
+    broker: DataBroker
+    batch_size: int
+
+    def __init__(self, broker: DataBroker, batch_size: int = DEFAULT_SWEEP_BATCH_SIZE):
+        self.broker = broker
+        self.batch_size = batch_size
+        self.logger = logging.getLogger(__name__)
+
+    def perform(self, session: Session, now: Optional[datetime] = None) -> SweepResult:
+        result = SweepResult()
+        affected_user_ids: set[int] = set()
+        last_id = 0
+
+        while True:
+            statement = (
+                select(AssignedReview.id, AssignedReview.pr_url)
+                .where(AssignedReview.completed_at == None)
+                .where(AssignedReview.id > last_id)
+                .order_by(AssignedReview.id)
+                .limit(self.batch_size)
+            )
+            rows = session.execute(statement).all()
+            if not rows:
+                break
+            last_id = rows[-1].id
+
+            # Assignments from before URLs were validated may have
+            # anything in them
+            urls = [
+                url
+                for url in {row.pr_url for row in rows}
+                if self.broker.github.valid_pr_url(url)
+            ]
+            try:
+                states = self.broker.github.pull_request_states(
+                    urls, Priority.BACKGROUND
+                )
+            except BudgetExhausted as e:
+                self.logger.warning(
+                    f"Deferring the rest of the sweep until {e.retry_at}"
+                )
+                result.deferred = True
+                break
+
+            finished = [record for record in states.values() if record.state != "open"]
+            finished_urls = {
+                url for url, record in states.items() if record.state != "open"
+            }
+            ids = [row.id for row in rows if row.pr_url in finished_urls]
+
+            self.broker.refresh_pull_request_states(session, finished)
+            # Some may have been completed since they were selected
+            completed = self.broker.complete_assignments(session, ids, now)
+            affected_user_ids |= completed.keys()
+            result.completed += completed.total()
+            session.commit()
+
+        if affected_user_ids:
+            slack_ids = select(User.slack_id).where(User.id.in_(affected_user_ids))
+            result.affected_slack_ids = set(session.scalars(slack_ids))
+        return result
+
+
+__all__ = [
+    "SweepFinishedAssignments",
+    "SweepResult",
+    "DEFAULT_SWEEP_BATCH_SIZE",
+    "DEFAULT_SWEEP_INTERVAL",
+    "SWEEP_LOCK_ID",
+    "sweep_lock",
+]
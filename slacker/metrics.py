@@ -0,0 +1,134 @@
+from bisect import bisect_left
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+# The Prometheus text format
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+# Upper bounds, in seconds, of the buckets latencies are counted in
+DEFAULT_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+@dataclass
+class Histogram:
+    buckets: tuple[float, ...]
+    # One more count than buckets, for anything above the last bound
+    counts: list[int] = field(default_factory=list)
+    count: int = 0
+    sum: float = 0.0
+
+    def __post_init__(self) -> None:
+        self.counts = [0] * (len(self.buckets) + 1)
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+
+# A minimal in-process metrics registry. Counters only go up, gauges
+# hold the last value set and histograms count observations (e.g.
+# latencies) into buckets. render() gives the Prometheus text format.
+class Metrics:
+    counters: dict[str, float]
+    gauges: dict[str, float]
+    histograms: dict[str, Histogram]
+
+    def __init__(self) -> None:
+        self.counters = {}
+        self.gauges = {}
+        self.histograms = {}
+        self.lock = Lock()
+
+    def increment(self, name: str, value: float = 1) -> None:
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+
+    def set_gauge(self, name: str, value: float) -> None:
+        with self.lock:
+            self.gauges[name] = value
+
+    def observe(
+        self,
+        name: str,
+        value: float,
+        buckets: tuple[float, ...] = DEFAULT_LATENCY_BUCKETS,
+    ) -> None:
+        with self.lock:
+            if name not in self.histograms:
+                self.histograms[name] = Histogram(buckets)
+            self.histograms[name].observe(value)
+
+    def snapshot(self) -> dict[str, float]:
+        with self.lock:
+            values = {**self.counters, **self.gauges}
+            for name, histogram in self.histograms.items():
+                values[f"{name}_count"] = histogram.count
+                values[f"{name}_sum"] = histogram.sum
+            return values
+
+    def render(self) -> str:
+        lines = []
+        with self.lock:
+            for name, value in sorted(self.counters.items()):
+                lines += [f"# TYPE {name} counter", f"{name} {value:g}"]
+            for name, value in sorted(self.gauges.items()):
+                lines += [f"# TYPE {name} gauge", f"{name} {value:g}"]
+            for name, histogram in sorted(self.histograms.items()):
+                lines.append(f"# TYPE {name} histogram")
+                cumulative = 0
+                for bound, count in zip(histogram.buckets, histogram.counts):
+                    cumulative += count
+                    lines.append(f'{name}_bucket{{le="{bound:g}"}} {cumulative}')
+                lines.append(f'{name}_bucket{{le="+Inf"}} {histogram.count}')
+                lines.append(f"{name}_sum {histogram.sum:g}")
+                lines.append(f"{name}_count {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self.lock:
+            self.counters.clear()
+            self.gauges.clear()
+            self.histograms.clear()
+
+
+# The process-wide registry
+metrics = Metrics()
+
+
+# Serves registry.render() at /metrics on a thread of its own, for
+# processes that don't run the web app (which has its own /metrics).
+# Port 0 picks a free one; shutdown() the server to stop it.
+def serve_metrics(
+    port: int, host: str = "", registry: Metrics = metrics
+) -> ThreadingHTTPServer:
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = registry.render().encode()
+            self.send_response(200)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        # Scrapes every few seconds would drown out everything else
+        def log_message(self, format: str, *args: object) -> None:
+            pass
+
+    server = ThreadingHTTPServer((host, port), MetricsHandler)
+    server.daemon_threads = True
+    Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    return server
+
+
+__all__ = [
+    "CONTENT_TYPE",
+    "DEFAULT_LATENCY_BUCKETS",
+    "Histogram",
+    "Metrics",
+    "metrics",
+    "serve_metrics",
+]
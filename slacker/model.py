@@ -1,15 +1,25 @@
 from sqlalchemy.orm import DeclarativeBase
-from typing import Optional
+from typing import Any, Optional, cast
 from sqlalchemy import String
 from sqlalchemy import Integer
 from sqlalchemy import Boolean
+from sqlalchemy import Date
 from sqlalchemy import DateTime
+from sqlalchemy import Float
 from sqlalchemy import ForeignKey
+from sqlalchemy import Index
+from sqlalchemy import UniqueConstraint
+from sqlalchemy import Connection
+from sqlalchemy import MetaData
+from sqlalchemy import Table
+from sqlalchemy import event
+from sqlalchemy import false, select, true, union_all
+from sqlalchemy import text
 from sqlalchemy.orm import Mapped
 from sqlalchemy.orm import mapped_column
 from sqlalchemy.orm import relationship
 
-from datetime import datetime
+from datetime import date, datetime
 
 
 class Base(DeclarativeBase):
@@ -53,6 +63,15 @@ class Channel(Base):
     slack_id: Mapped[str] = mapped_column(String(255))
     name: Mapped[str] = mapped_column(String(255))
     new_devs_are_reviewers: Mapped[bool] = mapped_column(Boolean)
+    # One of slacker.assignment_strategies.STRATEGY_NAMES, or None to
+    # use the bot's default
+    assignment_strategy: Mapped[Optional[str]] = mapped_column(
+        String(32), nullable=True
+    )
+    # The last user round robin assigned here, whose turn it isn't
+    round_robin_last_user_id: Mapped[Optional[int]] = mapped_column(
+        Integer, ForeignKey("users.id", ondelete="SET NULL"), nullable=True
+    )
 
     user_configs: Mapped[list["UserChannelConfig"]] = relationship(
         back_populates="channel", cascade="all, delete-orphan"
@@ -69,6 +88,13 @@ class Channel(Base):
 
 class UserChannelConfig(Base):
     __tablename__ = "user_channel_configs"
+    __table_args__ = (
+        UniqueConstraint(
+            "channel_id",
+            "user_id",
+            name="uq_user_channel_configs_channel_id_user_id",
+        ),
+    )
 
     id: Mapped[int] = mapped_column(Integer, primary_key=True)
     user_id: Mapped[int] = mapped_column(
@@ -79,6 +105,13 @@ class UserChannelConfig(Base):
     )
     reviewer: Mapped[bool] = mapped_column(Boolean, nullable=False)
     notify_on_assignment: Mapped[bool] = mapped_column(Boolean, nullable=False)
+    # Number of this user's assignments in this channel that are neither
+    # completed nor rerolled. Maintained by DataBroker as assignments
+    # change state, and reconciled by
+    # slacker.jobs.reconcile_open_review_counts
+    open_reviews: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
 
     user: Mapped[User] = relationship(back_populates="channel_configs")
     channel: Mapped[Channel] = relationship(back_populates="user_configs")
@@ -87,6 +120,34 @@ class UserChannelConfig(Base):
         return f"UserChannelConfig(id={self.id!r}, user_id={self.user_id!r}, channel_id={self.channel_id!r}, reviewer={self.reviewer!r}, notify_on_assignement={self.notify_on_assignment!r})"
 
 
+class PullRequest(Base):
+    __tablename__ = "pull_requests"
+    __table_args__ = (
+        UniqueConstraint(
+            "owner", "repo", "number", name="uq_pull_requests_owner_repo_number"
+        ),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    # owner and repo are stored lowercased, see slacker.github.parse_pr_url
+    owner: Mapped[str] = mapped_column(String(255), nullable=False)
+    repo: Mapped[str] = mapped_column(String(255), nullable=False)
+    number: Mapped[int] = mapped_column(Integer, nullable=False)
+    html_url: Mapped[str] = mapped_column(String(1024), nullable=False)
+    author_login: Mapped[str] = mapped_column(String(255), nullable=False)
+    title: Mapped[str] = mapped_column(String(1024), nullable=True)
+    state: Mapped[str] = mapped_column(String(32), nullable=False)
+    head_sha: Mapped[str] = mapped_column(String(40), nullable=True)
+    fetched_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    assigned_reviews: Mapped[list["AssignedReview"]] = relationship(
+        back_populates="pull_request",
+    )
+
+    def __repr__(self) -> str:
+        return f"PullRequest(id={self.id!r}, owner={self.owner!r}, repo={self.repo!r}, number={self.number!r}, author={self.author_login!r})"
+
+
 class AssignedReview(Base):
     __tablename__ = "assigned_reviews"
 
@@ -100,6 +161,11 @@ class AssignedReview(Base):
     channel_id: Mapped[int] = mapped_column(
         Integer, ForeignKey("channels.id"), nullable=True
     )
+    # Nullable because assignments made before pull_requests existed
+    # only have a URL
+    pull_request_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("pull_requests.id"), nullable=True
+    )
     pr_url: Mapped[str] = mapped_column(String(1024), nullable=False)
     assigned_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
     acknowledged_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
@@ -113,14 +179,241 @@ class AssignedReview(Base):
         foreign_keys="[AssignedReview.requestor_id]", back_populates="requested_reviews"
     )
     channel: Mapped[Channel] = relationship(back_populates="assigned_reviews")
+    pull_request: Mapped[PullRequest] = relationship(back_populates="assigned_reviews")
+
+    __table_args__ = (
+        Index("ix_assigned_reviews_pr_url", "pr_url"),
+        Index("ix_assigned_reviews_pull_request_id", "pull_request_id"),
+        Index(
+            "ix_assigned_reviews_assignee_id_completed_at",
+            "assignee_id",
+            "completed_at",
+        ),
+        # Active reviews are a small fraction of all reviews ever done
+        Index(
+            "ix_assigned_reviews_active_assignee_id",
+            "assignee_id",
+            "assigned_at",
+            postgresql_where=completed_at.is_(None),
+        ),
+        # Keyset pagination for the dashboard, unfiltered and filtered
+        # by channel or assignee
+        Index("ix_assigned_reviews_assigned_at_id", "assigned_at", "id"),
+        Index(
+            "ix_assigned_reviews_channel_id_assigned_at_id",
+            "channel_id",
+            "assigned_at",
+            "id",
+        ),
+        Index(
+            "ix_assigned_reviews_assignee_id_assigned_at_id",
+            "assignee_id",
+            "assigned_at",
+            "id",
+        ),
+    )
 
     def __repr__(self) -> str:
         return f"AssignedReview(id={self.id!r}, assignee={self.assignee_id!r}, requestor={self.requestor_id!r}, pr={self.pr_url!r})"
 
 
+# Completed and rerolled reviews are moved here by
+# slacker.jobs.archive_assigned_reviews so that assigned_reviews only
+# holds the current workload. Rows keep the id they had in
+# assigned_reviews.
+class AssignedReviewHistory(Base):
+    __tablename__ = "assigned_reviews_history"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True, autoincrement=False)
+    assignee_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False
+    )
+    requestor_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False
+    )
+    channel_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("channels.id"), nullable=True
+    )
+    pull_request_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("pull_requests.id"), nullable=True
+    )
+    pr_url: Mapped[str] = mapped_column(String(1024), nullable=False)
+    assigned_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    acknowledged_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    rerolled_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+    completed_at: Mapped[datetime] = mapped_column(DateTime, nullable=True)
+
+    assignee: Mapped[User] = relationship(
+        foreign_keys="[AssignedReviewHistory.assignee_id]", viewonly=True
+    )
+    requestor: Mapped[User] = relationship(
+        foreign_keys="[AssignedReviewHistory.requestor_id]", viewonly=True
+    )
+    channel: Mapped[Channel] = relationship(viewonly=True)
+
+    # The keyset pagination indexes match assigned_reviews', so that
+    # paging over assigned_reviews_all merges two index scans
+    __table_args__ = (
+        # For leaving out everyone who has already had the PR, and for
+        # linking old assignments to it when it is first stored
+        Index("ix_assigned_reviews_history_pull_request_id", "pull_request_id"),
+        Index("ix_assigned_reviews_history_pr_url", "pr_url"),
+        Index("ix_assigned_reviews_history_assigned_at_id", "assigned_at", "id"),
+        Index(
+            "ix_assigned_reviews_history_channel_id_assigned_at_id",
+            "channel_id",
+            "assigned_at",
+            "id",
+        ),
+        Index(
+            "ix_assigned_reviews_history_assignee_id_assigned_at_id",
+            "assignee_id",
+            "assigned_at",
+            "id",
+        ),
+    )
+
+    def __repr__(self) -> str:
+        return f"AssignedReviewHistory(id={self.id!r}, assignee={self.assignee_id!r}, requestor={self.requestor_id!r}, pr={self.pr_url!r})"
+
+
+# Daily rollups of review activity per channel and assignee, by the day
+# the assignments were made. Kept up to date by slacker.stats as
+# assignments change state, so that reporting never has to aggregate
+# assigned_reviews. Assignments without a channel aren't counted.
+class ReviewStatsDaily(Base):
+    __tablename__ = "review_stats_daily"
+    __table_args__ = (
+        UniqueConstraint(
+            "day",
+            "channel_id",
+            "user_id",
+            name="uq_review_stats_daily_day_channel_id_user_id",
+        ),
+        Index("ix_review_stats_daily_user_id_day", "user_id", "day"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    channel_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("channels.id"), nullable=False
+    )
+    # The assignee
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False
+    )
+    assigned: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    acknowledged: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    rerolled: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    # Completed without being rerolled first
+    completed: Mapped[int] = mapped_column(
+        Integer, nullable=False, default=0, server_default="0"
+    )
+    # Totals of the time from assignment to acknowledgement and to
+    # completion, for means
+    acknowledge_seconds: Mapped[float] = mapped_column(
+        Float, nullable=False, default=0, server_default="0"
+    )
+    complete_seconds: Mapped[float] = mapped_column(
+        Float, nullable=False, default=0, server_default="0"
+    )
+
+    def __repr__(self) -> str:
+        return f"ReviewStatsDaily(day={self.day!r}, channel_id={self.channel_id!r}, user_id={self.user_id!r}, assigned={self.assigned!r})"
+
+
+# Counts of turnaround times in the buckets of
+# slacker.stats.TURNAROUND_BUCKETS, alongside ReviewStatsDaily, for
+# percentiles
+class ReviewStatsHistogram(Base):
+    __tablename__ = "review_stats_histograms"
+    __table_args__ = (
+        UniqueConstraint(
+            "day",
+            "channel_id",
+            "user_id",
+            "metric",
+            "bucket",
+            name="uq_review_stats_histograms_day_channel_id_user_id_metric_bucket",
+        ),
+        Index("ix_review_stats_histograms_user_id_day", "user_id", "day"),
+    )
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    day: Mapped[date] = mapped_column(Date, nullable=False)
+    channel_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("channels.id"), nullable=False
+    )
+    user_id: Mapped[int] = mapped_column(
+        Integer, ForeignKey("users.id"), nullable=False
+    )
+    # "acknowledge" or "complete"
+    metric: Mapped[str] = mapped_column(String(16), nullable=False)
+    bucket: Mapped[int] = mapped_column(Integer, nullable=False)
+    count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"ReviewStatsHistogram(day={self.day!r}, channel_id={self.channel_id!r}, user_id={self.user_id!r}, metric={self.metric!r}, bucket={self.bucket!r}, count={self.count!r})"
+
+
+# Events API deliveries that have been handled, so that Slack's retries
+# are only handled once however many web app replicas receive them.
+# Rows are only needed for as long as Slack might retry.
+class SlackEventDelivery(Base):
+    __tablename__ = "slack_event_deliveries"
+
+    event_id: Mapped[str] = mapped_column(String(64), primary_key=True)
+    received_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+
+    __table_args__ = (Index("ix_slack_event_deliveries_received_at", "received_at"),)
+
+    def __repr__(self) -> str:
+        return f"SlackEventDelivery(event_id={self.event_id!r}, received_at={self.received_at!r})"
+
+
+# For reporting across both the hot and the archived assignments. The
+# migrations create this too; this is so that create_all() (i.e. the
+# test suite) ends up with the same schema.
+@event.listens_for(Base.metadata, "after_create")
+def create_assigned_reviews_all_view(
+    target: MetaData, connection: Connection, **kw: Any
+) -> None:
+    hot = cast(Table, AssignedReview.__table__)
+    history = cast(Table, AssignedReviewHistory.__table__)
+    view = union_all(
+        select(*hot.columns, false().label("archived")),
+        select(
+            *[history.c[column.name] for column in hot.columns],
+            true().label("archived"),
+        ),
+    )
+    connection.execute(
+        text("CREATE VIEW assigned_reviews_all AS " + str(view.compile(connection)))
+    )
+
+
+@event.listens_for(Base.metadata, "before_drop")
+def drop_assigned_reviews_all_view(
+    target: MetaData, connection: Connection, **kw: Any
+) -> None:
+    connection.execute(text("DROP VIEW IF EXISTS assigned_reviews_all"))
+
+
 __all__ = [
     "Base",
     "User",
     "Channel",
     "UserChannelConfig",
+    "PullRequest",
+    "AssignedReview",
+    "AssignedReviewHistory",
+    "ReviewStatsDaily",
+    "ReviewStatsHistogram",
+    "SlackEventDelivery",
 ]
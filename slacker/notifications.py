@@ -0,0 +1,91 @@
+import logging
+import select as selectors
+from threading import Event, Lock, Thread
+from typing import Any, Callable, Optional
+
+from sqlalchemy import create_engine
+from sqlalchemy.pool import NullPool
+
+# How long the listener waits for a notification before checking
+# whether it has been asked to stop
+POLL_INTERVAL = 1.0
+RECONNECT_DELAY = 5.0
+
+logger = logging.getLogger(__name__)
+
+
+# Listens on a Postgres notification channel with a connection of its
+# own, and hands each payload to a callback on a background thread.
+# Notifications sent while (re)connecting are missed, so anything
+# depending on seeing all of them can catch up in on_connect.
+class NotificationListener:
+    database_url: str
+    channel: str
+    handle: Callable[[str], None]
+    on_connect: Optional[Callable[[], None]]
+    lock: Lock
+    stopping: Event
+    listening: Event
+    thread: Optional[Thread]
+
+    def __init__(
+        self,
+        database_url: str,
+        channel: str,
+        handle: Callable[[str], None],
+        on_connect: Optional[Callable[[], None]] = None,
+    ):
+        self.database_url = database_url
+        self.channel = channel
+        self.handle = handle
+        self.on_connect = on_connect
+        self.lock = Lock()
+        self.stopping = Event()
+        self.listening = Event()
+        self.thread = None
+
+    # Does nothing if already started
+    def start(self) -> None:
+        with self.lock:
+            if self.thread is None:
+                self.thread = Thread(target=self.listen, name=self.channel, daemon=True)
+                self.thread.start()
+
+    def listen(self) -> None:
+        engine = create_engine(self.database_url, poolclass=NullPool)
+        while not self.stopping.is_set():
+            try:
+                connection = engine.raw_connection()
+                try:
+                    self.listen_on(connection.dbapi_connection)
+                finally:
+                    connection.close()
+            except Exception:
+                logger.exception(f"Lost the {self.channel} connection, reconnecting")
+                self.listening.clear()
+                self.stopping.wait(RECONNECT_DELAY)
+        engine.dispose()
+
+    def listen_on(self, connection: Any) -> None:
+        connection.autocommit = True
+        connection.cursor().execute(f"LISTEN {self.channel}")
+        if self.on_connect is not None:
+            self.on_connect()
+        self.listening.set()
+        while not self.stopping.is_set():
+            if selectors.select([connection], [], [], POLL_INTERVAL)[0]:
+                connection.poll()
+            while connection.notifies:
+                payload = connection.notifies.pop(0).payload
+                try:
+                    self.handle(payload)
+                except Exception:
+                    logger.exception(f"Failed to handle {self.channel} {payload!r}")
+
+    def close(self) -> None:
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+
+
+__all__ = ["NotificationListener"]
@@ -0,0 +1,168 @@
+import json
+from array import array
+from bisect import bisect_left, insort
+from dataclasses import asdict, dataclass
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import Iterable, Optional
+
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Entries are rebuilt from slack and the database after this long, in
+# case we missed any membership or config change events
+DEFAULT_INDEX_EXPIRY = timedelta(hours=1)
+# The Postgres channel reviewer index changes are announced on
+NOTIFY_CHANNEL = "reviewer_index"
+
+
+def _sorted_ids(ids: Iterable[int]) -> array:  # type: ignore[type-arg]
+    return array("q", sorted(set(ids)))
+
+
+def _contains(ids: array, user_id: int) -> bool:  # type: ignore[type-arg]
+    position = bisect_left(ids, user_id)
+    return position < len(ids) and ids[position] == user_id
+
+
+def _insert(ids: array, user_id: int) -> None:  # type: ignore[type-arg]
+    if not _contains(ids, user_id):
+        insort(ids, user_id)
+
+
+def _remove(ids: array, user_id: int) -> None:  # type: ignore[type-arg]
+    position = bisect_left(ids, user_id)
+    if position < len(ids) and ids[position] == user_id:
+        del ids[position]
+
+
+@dataclass
+class ChannelReviewerIndexEntry:
+    # Sorted user ids (database ids, not slack ids)
+    members: array  # type: ignore[type-arg]
+    reviewers: array  # type: ignore[type-arg]
+    built: datetime
+
+
+# Which users are reviewers in each channel, i.e. channel members whose
+# UserChannelConfig has reviewer set. Built once per channel and then
+# kept up to date from reviewer toggles and membership events, so that
+# working out the candidates for a review doesn't need the channel's
+# member list, users and configs every time.
+class ReviewerIndex:
+    channels: dict[int, ChannelReviewerIndexEntry]
+    expiry: timedelta
+
+    def __init__(self, expiry: timedelta = DEFAULT_INDEX_EXPIRY):
+        self.channels = {}
+        self.expiry = expiry
+        self.lock = Lock()
+
+    def reviewers_in_channel(self, channel_id: Optional[int]) -> Optional[list[int]]:
+        if channel_id is None:
+            return None
+        with self.lock:
+            entry = self.channels.get(channel_id)
+            if entry is None or (datetime.now() - entry.built) > self.expiry:
+                return None
+            return entry.reviewers.tolist()
+
+    def build(
+        self, channel_id: int, member_ids: Iterable[int], reviewer_ids: Iterable[int]
+    ) -> None:
+        with self.lock:
+            self.channels[channel_id] = ChannelReviewerIndexEntry(
+                members=_sorted_ids(member_ids),
+                reviewers=_sorted_ids(reviewer_ids),
+                built=datetime.now(),
+            )
+
+    def set_reviewer(self, channel_id: int, user_id: int, reviewer: bool) -> None:
+        with self.lock:
+            entry = self.channels.get(channel_id)
+            if entry is None or not _contains(entry.members, user_id):
+                return
+            if reviewer:
+                _insert(entry.reviewers, user_id)
+            else:
+                _remove(entry.reviewers, user_id)
+
+    def add_member(self, channel_id: int, user_id: int, reviewer: bool) -> None:
+        with self.lock:
+            entry = self.channels.get(channel_id)
+            if entry is None:
+                return
+            _insert(entry.members, user_id)
+            if reviewer:
+                _insert(entry.reviewers, user_id)
+
+    def remove_member(self, channel_id: int, user_id: int) -> None:
+        with self.lock:
+            entry = self.channels.get(channel_id)
+            if entry is None:
+                return
+            _remove(entry.members, user_id)
+            _remove(entry.reviewers, user_id)
+
+    def remove_user(self, user_id: int) -> None:
+        with self.lock:
+            for entry in self.channels.values():
+                _remove(entry.members, user_id)
+                _remove(entry.reviewers, user_id)
+
+    def invalidate(self, channel_id: int) -> None:
+        with self.lock:
+            self.channels.pop(channel_id, None)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.channels.clear()
+
+    def apply(self, change: "ReviewerIndexChange") -> None:
+        if change.change == "deactivated":
+            self.remove_user(change.user_id)
+        elif change.channel_id is None:
+            return
+        elif change.change == "reviewer":
+            self.set_reviewer(change.channel_id, change.user_id, change.reviewer)
+        elif change.change == "joined":
+            self.add_member(change.channel_id, change.user_id, change.reviewer)
+        elif change.change == "left":
+            self.remove_member(change.channel_id, change.user_id)
+
+    def receive(self, payload: str) -> None:
+        self.apply(ReviewerIndexChange.from_json(json.loads(payload)))
+
+
+# A change one process made to a channel's members or reviewers. Every
+# process (the web app's replicas and the bot) keeps an index of its
+# own, so each change is announced to all of them and applied again
+# wherever it is heard. Applying one twice does no harm.
+@dataclass(frozen=True)
+class ReviewerIndexChange:
+    # "reviewer", "joined", "left" or "deactivated"
+    change: str
+    user_id: int
+    channel_id: Optional[int] = None
+    reviewer: bool = False
+
+    @classmethod
+    def from_json(cls, data: dict[str, object]) -> "ReviewerIndexChange":
+        return cls(**data)  # type: ignore[arg-type]
+
+
+# Postgres only delivers the notification when the transaction commits,
+# so other processes never apply a change that was rolled back
+def announce_change(session: Session, change: ReviewerIndexChange) -> None:
+    session.execute(
+        text("SELECT pg_notify(:channel, :payload)"),
+        {"channel": NOTIFY_CHANNEL, "payload": json.dumps(asdict(change))},
+    )
+
+
+__all__ = [
+    "DEFAULT_INDEX_EXPIRY",
+    "ReviewerIndex",
+    "ReviewerIndexChange",
+    "announce_change",
+]
@@ -0,0 +1,347 @@
+from bisect import bisect_right
+from collections import defaultdict
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from typing import Any, Optional, Sequence
+
+from sqlalchemy import ColumnElement, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import InstrumentedAttribute, Session
+
+from slacker.model import AssignedReview, ReviewStatsDaily, ReviewStatsHistogram
+
+# Upper bounds, in seconds, of the turnaround histogram buckets: 5m,
+# 15m, 30m, 1h, 2h, 4h, 8h, 1d, 2d and a week. A last bucket holds
+# everything slower. Bucket n counts the times t with
+# TURNAROUND_BUCKETS[n - 1] <= t < TURNAROUND_BUCKETS[n], the same as
+# Postgres' width_bucket(t, thresholds).
+TURNAROUND_BUCKETS = (
+    300,
+    900,
+    1800,
+    3600,
+    7200,
+    14400,
+    28800,
+    86400,
+    172800,
+    604800,
+)
+METRICS = ("acknowledge", "complete")
+COUNTERS = ("assigned", "acknowledged", "rerolled", "completed")
+
+
+def turnaround_bucket(seconds: float) -> int:
+    return bisect_right(TURNAROUND_BUCKETS, seconds)
+
+
+# How an assignment changing state changes the rollups of the day it
+# was assigned
+@dataclass
+class StatsChange:
+    day: date
+    channel_id: int
+    user_id: int
+    assigned: int = 0
+    acknowledged: int = 0
+    rerolled: int = 0
+    completed: int = 0
+    acknowledge_seconds: Optional[float] = None
+    complete_seconds: Optional[float] = None
+
+    @classmethod
+    def for_assignment(
+        cls, assigned_at: datetime, channel_id: int, user_id: int
+    ) -> "StatsChange":
+        return cls(assigned_at.date(), channel_id, user_id)
+
+
+def assignment_made(assignment: AssignedReview) -> Optional[StatsChange]:
+    if assignment.channel_id is None:
+        return None
+    change = StatsChange.for_assignment(
+        assignment.assigned_at, assignment.channel_id, assignment.assignee_id
+    )
+    change.assigned = 1
+    return change
+
+
+def assignment_acknowledged(assignment: AssignedReview) -> Optional[StatsChange]:
+    if assignment.channel_id is None:
+        return None
+    change = StatsChange.for_assignment(
+        assignment.assigned_at, assignment.channel_id, assignment.assignee_id
+    )
+    change.acknowledged = 1
+    change.acknowledge_seconds = max(
+        (assignment.acknowledged_at - assignment.assigned_at).total_seconds(), 0.0
+    )
+    return change
+
+
+def assignment_rerolled(assignment: AssignedReview) -> Optional[StatsChange]:
+    if assignment.channel_id is None:
+        return None
+    change = StatsChange.for_assignment(
+        assignment.assigned_at, assignment.channel_id, assignment.assignee_id
+    )
+    change.rerolled = 1
+    return change
+
+
+def assignment_completed(
+    assigned_at: datetime,
+    completed_at: datetime,
+    channel_id: Optional[int],
+    user_id: int,
+) -> Optional[StatsChange]:
+    if channel_id is None:
+        return None
+    change = StatsChange.for_assignment(assigned_at, channel_id, user_id)
+    change.completed = 1
+    change.complete_seconds = max((completed_at - assigned_at).total_seconds(), 0.0)
+    return change
+
+
+Key = tuple[date, int, int]
+
+
+# Adds the changes to the rollups with one upsert per table. Run it in
+# the same transaction as the state change so that the two commit (or
+# roll back) together.
+def record_changes(session: Session, changes: Sequence[Optional[StatsChange]]) -> None:
+    counters: dict[Key, dict[str, float]] = defaultdict(
+        lambda: dict.fromkeys(COUNTERS + ("acknowledge_seconds", "complete_seconds"), 0)
+    )
+    buckets: dict[tuple[date, int, int, str, int], int] = defaultdict(int)
+    for change in changes:
+        if change is None:
+            continue
+        key = (change.day, change.channel_id, change.user_id)
+        row = counters[key]
+        for name in COUNTERS:
+            row[name] += getattr(change, name)
+        for metric, seconds in (
+            ("acknowledge", change.acknowledge_seconds),
+            ("complete", change.complete_seconds),
+        ):
+            if seconds is not None:
+                row[f"{metric}_seconds"] += seconds
+                buckets[(*key, metric, turnaround_bucket(seconds))] += 1
+    if not counters:
+        return
+
+    # In key order, so that concurrent upserts lock rows in the same
+    # order and can't deadlock
+    daily = insert(ReviewStatsDaily).values(
+        [
+            {"day": day, "channel_id": channel_id, "user_id": user_id, **row}
+            for (day, channel_id, user_id), row in sorted(counters.items())
+        ]
+    )
+    session.execute(
+        daily.on_conflict_do_update(
+            constraint="uq_review_stats_daily_day_channel_id_user_id",
+            set_={
+                name: getattr(ReviewStatsDaily, name) + getattr(daily.excluded, name)
+                for name in COUNTERS + ("acknowledge_seconds", "complete_seconds")
+            },
+        )
+    )
+
+    if buckets:
+        histogram = insert(ReviewStatsHistogram).values(
+            [
+                {
+                    "day": day,
+                    "channel_id": channel_id,
+                    "user_id": user_id,
+                    "metric": metric,
+                    "bucket": bucket,
+                    "count": count,
+                }
+                for (day, channel_id, user_id, metric, bucket), count in sorted(
+                    buckets.items()
+                )
+            ]
+        )
+        session.execute(
+            histogram.on_conflict_do_update(
+                constraint="uq_review_stats_histograms_day_channel_id_user_id_metric_bucket",
+                set_={"count": ReviewStatsHistogram.count + histogram.excluded.count},
+            )
+        )
+
+
+@dataclass
+class Turnaround:
+    total_seconds: float = 0.0
+    histogram: list[int] = field(
+        default_factory=lambda: [0] * (len(TURNAROUND_BUCKETS) + 1)
+    )
+
+    @property
+    def count(self) -> int:
+        return sum(self.histogram)
+
+    def mean(self) -> Optional[float]:
+        return self.total_seconds / self.count if self.count else None
+
+    # Interpolates within the bucket the percentile falls in. Anything
+    # in the last bucket is reported as its lower bound.
+    def percentile(self, fraction: float) -> Optional[float]:
+        count = self.count
+        if count == 0:
+            return None
+        rank = fraction * count
+        seen = 0
+        for bucket, n in enumerate(self.histogram):
+            if n and seen + n >= rank:
+                lower = TURNAROUND_BUCKETS[bucket - 1] if bucket else 0
+                if bucket == len(TURNAROUND_BUCKETS):
+                    return float(lower)
+                upper = TURNAROUND_BUCKETS[bucket]
+                return lower + (upper - lower) * max(rank - seen, 0) / n
+            seen += n
+        return float(TURNAROUND_BUCKETS[-1])
+
+    def as_json(self) -> dict[str, Any]:
+        return {
+            "count": self.count,
+            "mean_seconds": self.mean(),
+            "p50_seconds": self.percentile(0.5),
+            "p90_seconds": self.percentile(0.9),
+            "histogram": {
+                "upper_bounds_seconds": list(TURNAROUND_BUCKETS),
+                "counts": self.histogram,
+            },
+        }
+
+
+@dataclass
+class ReviewStats:
+    assigned: int = 0
+    acknowledged: int = 0
+    rerolled: int = 0
+    completed: int = 0
+    acknowledge: Turnaround = field(default_factory=Turnaround)
+    complete: Turnaround = field(default_factory=Turnaround)
+
+    def reroll_rate(self) -> Optional[float]:
+        return self.rerolled / self.assigned if self.assigned else None
+
+    def as_json(self) -> dict[str, Any]:
+        return {
+            "assigned": self.assigned,
+            "acknowledged": self.acknowledged,
+            "rerolled": self.rerolled,
+            "completed": self.completed,
+            "reroll_rate": self.reroll_rate(),
+            "time_to_acknowledge": self.acknowledge.as_json(),
+            "time_to_complete": self.complete.as_json(),
+        }
+
+
+# Totals of the rollups for assignments made from since up to (but not
+# including) until, optionally for one channel or assignee, and grouped
+# by channel_id or user_id if group_by names one. Without group_by the
+# totals are under None.
+def fetch_review_stats(
+    session: Session,
+    since: date,
+    until: date,
+    channel_id: Optional[int] = None,
+    user_id: Optional[int] = None,
+    group_by: Optional[str] = None,
+) -> dict[Optional[int], ReviewStats]:
+    def conditions(
+        table: type[ReviewStatsDaily] | type[ReviewStatsHistogram],
+    ) -> list[ColumnElement[bool]]:
+        where = [table.day >= since, table.day < until]
+        if channel_id is not None:
+            where.append(table.channel_id == channel_id)
+        if user_id is not None:
+            where.append(table.user_id == user_id)
+        return where
+
+    def group(
+        table: type[ReviewStatsDaily] | type[ReviewStatsHistogram],
+    ) -> list[InstrumentedAttribute[int]]:
+        if group_by is None:
+            return []
+        if group_by not in ("channel_id", "user_id"):
+            raise ValueError("group_by must be channel_id or user_id")
+        column: InstrumentedAttribute[int] = getattr(table, group_by)
+        return [column]
+
+    stats: dict[Optional[int], ReviewStats] = defaultdict(ReviewStats)
+
+    daily = (
+        select(
+            *group(ReviewStatsDaily),
+            *(func.sum(getattr(ReviewStatsDaily, name)) for name in COUNTERS),
+            func.sum(ReviewStatsDaily.acknowledge_seconds),
+            func.sum(ReviewStatsDaily.complete_seconds),
+        )
+        .where(*conditions(ReviewStatsDaily))
+        .group_by(*group(ReviewStatsDaily))
+        .having(func.count() > 0)
+    )
+    for row in session.execute(daily):
+        summary = stats[row[0] if group_by else None]
+        summary.assigned = int(row[-6])
+        summary.acknowledged = int(row[-5])
+        summary.rerolled = int(row[-4])
+        summary.completed = int(row[-3])
+        summary.acknowledge.total_seconds = float(row[-2])
+        summary.complete.total_seconds = float(row[-1])
+
+    histogram = (
+        select(
+            *group(ReviewStatsHistogram),
+            ReviewStatsHistogram.metric,
+            ReviewStatsHistogram.bucket,
+            func.sum(ReviewStatsHistogram.count),
+        )
+        .where(*conditions(ReviewStatsHistogram))
+        .group_by(
+            *group(ReviewStatsHistogram),
+            ReviewStatsHistogram.metric,
+            ReviewStatsHistogram.bucket,
+        )
+    )
+    for row in session.execute(histogram):
+        summary = stats[row[0] if group_by else None]
+        metric, bucket, count = row[-3], row[-2], row[-1]
+        turnaround = (
+            summary.acknowledge if metric == "acknowledge" else summary.complete
+        )
+        turnaround.histogram[bucket] += int(count)
+
+    return dict(stats)
+
+
+# "45m", "3.5h", "2.0d"
+def format_duration(seconds: float) -> str:
+    if seconds < 3600:
+        return f"{max(round(seconds / 60), 1)}m"
+    if seconds < 86400:
+        return f"{seconds / 3600:.1f}h"
+    return f"{seconds / 86400:.1f}d"
+
+
+__all__ = [
+    "METRICS",
+    "ReviewStats",
+    "StatsChange",
+    "TURNAROUND_BUCKETS",
+    "Turnaround",
+    "assignment_acknowledged",
+    "assignment_completed",
+    "assignment_made",
+    "assignment_rerolled",
+    "fetch_review_stats",
+    "format_duration",
+    "record_changes",
+    "turnaround_bucket",
+]
@@ -4,3 +4,9 @@ app = Flask(__name__)
 
 
 from . import routes
+from . import github_webhook
+from . import assignments
+from . import stats
+from . import slack_events
+from . import assignment_stream
+from . import metrics
@@ -0,0 +1,98 @@
+import json
+import os
+from queue import Empty
+from threading import Lock
+from typing import Iterator, Optional
+
+from flask import Response, current_app, request
+
+from slacker.assignment_events import (
+    AssignmentEvent,
+    AssignmentEventPublisher,
+    Subscription,
+)
+from slacker.model import Channel, User
+from slacker.webapp.database import db_session
+from slacker.webapp.stats import fetch_id
+
+from . import app
+
+# A comment is sent after this long without an event, so that proxies
+# don't close an idle stream and dead clients are noticed
+KEEPALIVE_INTERVAL = 15.0
+# How long browsers wait before reconnecting, in milliseconds
+RETRY_MILLISECONDS = 5000
+
+publisher_lock = Lock()
+
+
+# One per process, shared by every stream. Tests put their own in
+# ASSIGNMENT_EVENT_PUBLISHER.
+def assignment_event_publisher() -> AssignmentEventPublisher:
+    with publisher_lock:
+        publisher: Optional[AssignmentEventPublisher] = current_app.config.get(
+            "ASSIGNMENT_EVENT_PUBLISHER"
+        )
+        if publisher is None:
+            publisher = AssignmentEventPublisher(os.environ.get("DATABASE_URL", ""))
+            current_app.config["ASSIGNMENT_EVENT_PUBLISHER"] = publisher
+        return publisher
+
+
+def server_sent_event(event: AssignmentEvent) -> str:
+    return f"event: {event.event}\ndata: {json.dumps(event.as_json())}\n\n"
+
+
+def stream_events(subscription: Subscription, keepalive: float) -> Iterator[str]:
+    yield f"retry: {RETRY_MILLISECONDS}\n\n"
+    while not subscription.dropped:
+        try:
+            event = subscription.queue.get(timeout=keepalive)
+        except Empty:
+            yield ": keepalive\n\n"
+            continue
+        yield server_sent_event(event)
+    # Too far behind to catch up. The client can reload what it's
+    # showing and reconnect.
+    yield "event: dropped\ndata: {}\n\n"
+
+
+# Server-sent events for assignments being made, acknowledged, rerolled
+# and completed, optionally only those in a channel or for an assignee
+# (Slack ids). Each event's data is the assignment's id, assignee_id,
+# channel_id, pr_url and the time of the change.
+@app.route("/assignments/stream")
+def assignment_stream() -> Response:
+    channel_id: Optional[int] = None
+    assignee_id: Optional[int] = None
+    if (channel := request.args.get("channel")) or request.args.get("assignee"):
+        with db_session() as session:
+            if channel:
+                channel_id = fetch_id(session, Channel, channel)
+            if assignee := request.args.get("assignee"):
+                assignee_id = fetch_id(session, User, assignee)
+
+    def matches(event: AssignmentEvent) -> bool:
+        return (channel_id is None or event.channel_id == channel_id) and (
+            assignee_id is None or event.assignee_id == assignee_id
+        )
+
+    publisher = assignment_event_publisher()
+    # Subscribed before the response starts so nothing is missed in
+    # between, and unsubscribed when the client goes away
+    subscription = publisher.subscribe(matches)
+    response = Response(
+        stream_events(
+            subscription,
+            current_app.config.get("ASSIGNMENT_STREAM_KEEPALIVE", KEEPALIVE_INTERVAL),
+        ),
+        mimetype="text/event-stream",
+    )
+    response.call_on_close(lambda: publisher.unsubscribe(subscription))
+    response.cache_control.no_cache = True
+    # Otherwise nginx holds on to events until it has a buffer's worth
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
+
+
+__all__ = ["assignment_event_publisher", "assignment_stream"]
@@ -0,0 +1,293 @@
+import hashlib
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Mapping, Optional
+from urllib.parse import urlencode
+
+from flask import Response, abort, make_response, render_template, request, url_for
+from sqlalchemy import Select, func, select, tuple_, union_all
+from sqlalchemy.orm import Session, aliased, joinedload
+from werkzeug.http import is_resource_modified
+
+from slacker.model import AssignedReview, AssignedReviewHistory, Channel, User
+from slacker.webapp.database import db_session
+
+from . import app
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+STATES = ("all", "active", "completed", "rerolled")
+
+# The dashboard covers archived assignments too, like the
+# assigned_reviews_all view (which the ORM can't map relationships
+# through). They're only ever read here, so loading them as
+# AssignedReviews is harmless.
+AnyAssignedReview = aliased(
+    AssignedReview,
+    union_all(
+        select(*AssignedReview.__table__.columns),
+        select(*AssignedReviewHistory.__table__.columns),
+    ).subquery("assigned_reviews_all"),
+)
+
+
+@dataclass(frozen=True)
+class AssignmentFilters:
+    # Slack ids
+    channel: Optional[str] = None
+    assignee: Optional[str] = None
+    state: str = "all"
+    # On assigned_at, since is inclusive and until isn't
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+
+    # Raises ValueError for anything that doesn't parse
+    @classmethod
+    def from_args(cls, args: Mapping[str, str]) -> "AssignmentFilters":
+        state = args.get("state") or "all"
+        if state not in STATES:
+            raise ValueError(f"state must be one of {', '.join(STATES)}")
+        since = args.get("since")
+        until = args.get("until")
+        return cls(
+            channel=args.get("channel") or None,
+            assignee=args.get("assignee") or None,
+            state=state,
+            since=datetime.fromisoformat(since) if since else None,
+            until=datetime.fromisoformat(until) if until else None,
+        )
+
+    def args(self) -> dict[str, str]:
+        values = {
+            "channel": self.channel,
+            "assignee": self.assignee,
+            "state": self.state if self.state != "all" else None,
+            "since": self.since.isoformat() if self.since else None,
+            "until": self.until.isoformat() if self.until else None,
+        }
+        return {name: value for name, value in values.items() if value is not None}
+
+    def apply(self, statement: Select[AssignedReview]) -> Select[AssignedReview]:
+        if self.channel is not None:
+            channel_id = (
+                select(Channel.id)
+                .where(Channel.slack_id == self.channel)
+                .order_by(Channel.id)
+                .limit(1)
+                .scalar_subquery()
+            )
+            statement = statement.where(AnyAssignedReview.channel_id == channel_id)
+        if self.assignee is not None:
+            assignee_id = (
+                select(User.id).where(User.slack_id == self.assignee).scalar_subquery()
+            )
+            statement = statement.where(AnyAssignedReview.assignee_id == assignee_id)
+        if self.state == "active":
+            statement = statement.where(AnyAssignedReview.completed_at == None).where(
+                AnyAssignedReview.rerolled_at == None
+            )
+        elif self.state == "completed":
+            statement = statement.where(AnyAssignedReview.completed_at != None).where(
+                AnyAssignedReview.rerolled_at == None
+            )
+        elif self.state == "rerolled":
+            statement = statement.where(AnyAssignedReview.rerolled_at != None)
+        if self.since is not None:
+            statement = statement.where(AnyAssignedReview.assigned_at >= self.since)
+        if self.until is not None:
+            statement = statement.where(AnyAssignedReview.assigned_at < self.until)
+        return statement
+
+
+# Where a page ends: the (assigned_at, id) of its last row. The next
+# page starts with the rows just before it, which an index on
+# (assigned_at, id) finds without counting its way past everything
+# before, unlike OFFSET.
+@dataclass(frozen=True)
+class Cursor:
+    assigned_at: datetime
+    id: int
+
+    def encode(self) -> str:
+        value = f"{self.assigned_at.isoformat()}_{self.id}"
+        return urlsafe_b64encode(value.encode()).decode().rstrip("=")
+
+    # Raises ValueError if it isn't one of ours
+    @classmethod
+    def decode(cls, value: str) -> "Cursor":
+        padded = value + "=" * (-len(value) % 4)
+        assigned_at, id = urlsafe_b64decode(padded).decode().rsplit("_", 1)
+        return cls(datetime.fromisoformat(assigned_at), int(id))
+
+
+@dataclass
+class AssignmentsPage:
+    assignments: list[AssignedReview]
+    # None on the last page
+    next_cursor: Optional[Cursor]
+
+
+# What the ETag and Last-Modified of a page are made from
+@dataclass(frozen=True)
+class PageVersion:
+    # Including the extra row that says whether there's another page
+    rows: int
+    id_sum: int
+    # The last time anything on the page changed
+    last_modified: Optional[datetime]
+
+    # Changes whenever a row joins or leaves the page or changes state
+    def etag(self, filters: AssignmentFilters) -> str:
+        digest = hashlib.sha256(repr(sorted(filters.args().items())).encode())
+        digest.update(repr((self.rows, self.id_sum, self.last_modified)).encode())
+        return digest.hexdigest()[:32]
+
+
+# Newest first, archived or not, one more than the limit to find out
+# whether there's another page
+def page_statement(
+    filters: AssignmentFilters, after: Optional[Cursor], limit: int
+) -> Select[AssignedReview]:
+    statement = filters.apply(
+        select(AnyAssignedReview)
+        .order_by(AnyAssignedReview.assigned_at.desc(), AnyAssignedReview.id.desc())
+        .limit(limit + 1)
+    )
+    if after is not None:
+        statement = statement.where(
+            tuple_(AnyAssignedReview.assigned_at, AnyAssignedReview.id)
+            < tuple_(after.assigned_at, after.id)
+        )
+    return statement
+
+
+# The same rows as fetch_assignments_page, but only their ids and
+# timestamps and summed up in the database, so that a conditional
+# request can be answered without loading the page
+def fetch_page_version(
+    session: Session,
+    filters: AssignmentFilters,
+    after: Optional[Cursor] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> PageVersion:
+    page = (
+        page_statement(filters, after, limit)
+        .with_only_columns(
+            AnyAssignedReview.id,
+            AnyAssignedReview.assigned_at,
+            AnyAssignedReview.acknowledged_at,
+            AnyAssignedReview.rerolled_at,
+            AnyAssignedReview.completed_at,
+        )
+        .subquery("page")
+    )
+    rows, id_sum, last_modified = session.execute(
+        select(
+            func.count(),
+            func.coalesce(func.sum(page.c.id), 0),
+            # greatest() ignores nulls
+            func.max(
+                func.greatest(
+                    page.c.assigned_at,
+                    page.c.acknowledged_at,
+                    page.c.rerolled_at,
+                    page.c.completed_at,
+                )
+            ),
+        )
+    ).one()
+    return PageVersion(rows, id_sum, last_modified)
+
+
+# With the users, channel and PR loaded in the same query
+def fetch_assignments_page(
+    session: Session,
+    filters: AssignmentFilters,
+    after: Optional[Cursor] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+) -> AssignmentsPage:
+    statement = page_statement(filters, after, limit).options(
+        joinedload(AnyAssignedReview.requestor),
+        joinedload(AnyAssignedReview.assignee),
+        joinedload(AnyAssignedReview.channel),
+        joinedload(AnyAssignedReview.pull_request),
+    )
+
+    assignments = list(session.scalars(statement))
+    next_cursor = None
+    if len(assignments) > limit:
+        assignments = assignments[:limit]
+        last = assignments[-1]
+        next_cursor = Cursor(last.assigned_at, last.id)
+    return AssignmentsPage(assignments, next_cursor)
+
+
+def assignment_state(assignment: AssignedReview) -> str:
+    if assignment.rerolled_at is not None:
+        return "rerolled"
+    if assignment.completed_at is not None:
+        return "completed"
+    return "active"
+
+
+@app.route("/assignments")
+def assignments() -> Response:
+    try:
+        filters = AssignmentFilters.from_args(request.args)
+        after = request.args.get("after")
+        cursor = Cursor.decode(after) if after else None
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+    except ValueError as error:
+        abort(400, str(error))
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+
+    with db_session() as session:
+        version = fetch_page_version(session, filters, cursor, limit)
+        etag = version.etag(filters)
+        last_modified = version.last_modified
+        # Timestamps are stored in local time
+        if last_modified is not None:
+            last_modified = last_modified.astimezone(timezone.utc)
+
+        if not is_resource_modified(
+            request.environ, etag=etag, last_modified=last_modified
+        ):
+            response = Response(status=304)
+        else:
+            page = fetch_assignments_page(session, filters, cursor, limit)
+            next_url = None
+            if page.next_cursor is not None:
+                args = {
+                    **filters.args(),
+                    "after": page.next_cursor.encode(),
+                    "limit": str(limit),
+                }
+                next_url = f"{url_for('assignments')}?{urlencode(args)}"
+            response = make_response(
+                render_template(
+                    "assignments.html",
+                    page=page,
+                    filters=filters,
+                    states=STATES,
+                    state_of=assignment_state,
+                    next_url=next_url,
+                )
+            )
+
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Always revalidate, it's cheap when nothing has changed
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+__all__ = [
+    "AssignmentFilters",
+    "AssignmentsPage",
+    "Cursor",
+    "PageVersion",
+    "fetch_assignments_page",
+    "fetch_page_version",
+]
@@ -0,0 +1,27 @@
+import os
+from threading import Lock
+from typing import Callable, Optional
+
+from flask import current_app
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+session_factory_lock = Lock()
+
+
+# A new session for the request. Tests put their own factory in
+# DB_SESSION_FACTORY, otherwise one is made for DATABASE_URL the first
+# time it's needed.
+def db_session() -> Session:
+    with session_factory_lock:
+        factory: Optional[Callable[[], Session]] = current_app.config.get(
+            "DB_SESSION_FACTORY"
+        )
+        if factory is None:
+            engine = create_engine(os.environ.get("DATABASE_URL", ""))
+            factory = sessionmaker(engine)
+            current_app.config["DB_SESSION_FACTORY"] = factory
+    return factory()
+
+
+__all__ = ["db_session"]
@@ -0,0 +1,150 @@
+import hashlib
+import hmac
+import logging
+import os
+from queue import Full, Queue
+from threading import Lock, Thread
+from typing import Any, Callable, Optional
+
+from flask import current_app, request
+from slack_sdk.web import WebClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from slacker.actions.handle_github_event import HandleGitHubEvent
+from slacker.data_broker import DataBroker
+from slacker.github import GitHub, GitHubAppAuth
+
+from . import app
+
+HANDLED_EVENTS = {"pull_request", "pull_request_review"}
+# Deliveries waiting for the worker. GitHub doesn't wait on us, so
+# beyond this we'd rather refuse (and show up as failed deliveries)
+# than grow without bound.
+DEFAULT_QUEUE_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+
+def verify_signature(secret: str, body: bytes, signature: Optional[str]) -> bool:
+    if signature is None or not signature.startswith("sha256="):
+        return False
+    expected = hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+    return hmac.compare_digest(signature.removeprefix("sha256="), expected)
+
+
+# Processes webhook deliveries one at a time on a background thread, so
+# that the endpoint can answer GitHub straight away
+class WebhookWorker:
+    queue: Queue[tuple[str, dict[str, Any]]]
+    thread: Optional[Thread]
+
+    def __init__(
+        self,
+        process: Callable[[str, dict[str, Any]], None],
+        maxsize: int = DEFAULT_QUEUE_SIZE,
+    ):
+        self.process = process
+        self.queue = Queue(maxsize=maxsize)
+        self.thread = None
+
+    def start(self) -> None:
+        self.thread = Thread(target=self.run, name="github-webhooks", daemon=True)
+        self.thread.start()
+
+    def submit(self, event: str, payload: dict[str, Any]) -> bool:
+        try:
+            self.queue.put_nowait((event, payload))
+        except Full:
+            return False
+        return True
+
+    def process_one(self, event: str, payload: dict[str, Any]) -> None:
+        try:
+            self.process(event, payload)
+        except Exception:
+            logger.exception(f"Failed to process {event} webhook")
+
+    def run(self) -> None:
+        while True:
+            event, payload = self.queue.get()
+            self.process_one(event, payload)
+            self.queue.task_done()
+
+    # Processes everything queued so far on the calling thread
+    def process_pending(self) -> None:
+        while not self.queue.empty():
+            event, payload = self.queue.get_nowait()
+            self.process_one(event, payload)
+            self.queue.task_done()
+
+
+def process_github_event_with_database(
+    db_url: str, broker: DataBroker
+) -> Callable[[str, dict[str, Any]], None]:
+    engine = create_engine(db_url)
+
+    def process(event: str, payload: dict[str, Any]) -> None:
+        with Session(engine) as session:
+            HandleGitHubEvent(broker).perform(session, event, payload)
+            session.commit()
+
+    return process
+
+
+worker_lock = Lock()
+
+
+def webhook_worker() -> WebhookWorker:
+    with worker_lock:
+        worker: Optional[WebhookWorker] = current_app.config.get(
+            "GITHUB_WEBHOOK_WORKER"
+        )
+        if worker is None:
+            broker = DataBroker(
+                WebClient(token=os.environ.get("SLACK_BOT_TOKEN")),
+                GitHub(
+                    os.environ.get("GITHUB_TOKEN"),
+                    app_auth=GitHubAppAuth.from_env(),
+                ),
+            )
+            worker = WebhookWorker(
+                process_github_event_with_database(
+                    os.environ.get("DATABASE_URL", ""), broker
+                )
+            )
+            worker.start()
+            current_app.config["GITHUB_WEBHOOK_WORKER"] = worker
+        return worker
+
+
+@app.post("/github/webhook")
+def github_webhook() -> tuple[str, int]:
+    secret = current_app.config.get("GITHUB_WEBHOOK_SECRET") or os.environ.get(
+        "GITHUB_WEBHOOK_SECRET"
+    )
+    if not secret:
+        logger.error("GITHUB_WEBHOOK_SECRET is not set, refusing webhook")
+        return "Webhook secret is not configured", 503
+
+    signature = request.headers.get("X-Hub-Signature-256")
+    if not verify_signature(secret, request.get_data(), signature):
+        return "Bad signature", 401
+
+    event = request.headers.get("X-GitHub-Event", "")
+    if event == "ping":
+        return "pong", 200
+    if event not in HANDLED_EVENTS:
+        return "Ignored", 202
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return "Expected a JSON object", 400
+
+    if not webhook_worker().submit(event, payload):
+        logger.error(f"Webhook queue is full, dropping {event} delivery")
+        return "Too busy", 503
+    return "Queued", 202
+
+
+__all__ = ["WebhookWorker", "verify_signature", "github_webhook"]
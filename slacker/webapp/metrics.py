@@ -0,0 +1,16 @@
+from flask import Response
+
+from slacker.metrics import CONTENT_TYPE, metrics
+
+from . import app
+
+
+# For Prometheus to scrape. Each web app process has its own registry,
+# so scrape every replica. In HTTP mode that includes the GitHub request
+# latencies and rate limits of the bot running inside it.
+@app.route("/metrics")
+def metrics_endpoint() -> Response:
+    return Response(metrics.render(), content_type=CONTENT_TYPE)
+
+
+__all__ = ["metrics_endpoint"]
@@ -0,0 +1,226 @@
+import json
+import logging
+import os
+import uuid
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from datetime import datetime, timedelta
+from threading import Lock
+from typing import TYPE_CHECKING, Any, Optional
+
+from flask import Response, current_app, jsonify, request
+from slack_sdk.signature import SignatureVerifier
+from slack_sdk.socket_mode.request import SocketModeRequest
+
+from . import app
+
+# The bot (and everything it imports) is only loaded once Slack sends
+# the first request, not by every web app process
+if TYPE_CHECKING:
+    from slacker.bot import Bot
+    from slacker.bot.http_mode import HttpRequestClient
+
+# Slack gives up on a request after 3 seconds. Interactive requests wait
+# this long for the listener's acknowledgement, which can carry a
+# response (e.g. a modal's validation errors).
+ACK_TIMEOUT = 2.5
+DEFAULT_WORKERS = 16
+# Requests received but not yet handled. Beyond this we answer 503 and
+# let Slack retry, rather than queue without bound.
+DEFAULT_MAX_PENDING = 1000
+PRUNE_INTERVAL = timedelta(minutes=10)
+
+logger = logging.getLogger(__name__)
+
+
+# Hands requests that arrived over HTTP to the Bot's listeners on a
+# pool of threads, so that the endpoints can answer Slack straight away.
+# Any number of web app replicas can share the load: redeliveries are
+# deduplicated in the database, and each replica's reviewer index
+# applies the membership and reviewer changes the others announce.
+class SlackDispatcher:
+    bot: "Bot"
+    executor: ThreadPoolExecutor
+    max_pending: int
+    pending: int
+    pruned_at: Optional[datetime]
+
+    def __init__(
+        self,
+        bot: "Bot",
+        workers: int = DEFAULT_WORKERS,
+        max_pending: int = DEFAULT_MAX_PENDING,
+    ):
+        self.bot = bot
+        self.executor = ThreadPoolExecutor(
+            max_workers=workers, thread_name_prefix="slack-events"
+        )
+        self.max_pending = max_pending
+        self.pending = 0
+        self.pruned_at = None
+        self.lock = Lock()
+
+    # Resolves with the payload the listener acknowledged with, or None
+    # once they have all finished without one. None rather than a
+    # future when there are too many requests pending.
+    def dispatch(
+        self, slack_request: SocketModeRequest
+    ) -> Optional[Future[Optional[dict[str, Any]]]]:
+        with self.lock:
+            if self.pending >= self.max_pending:
+                return None
+            self.pending += 1
+        from slacker.bot.http_mode import HttpRequestClient
+
+        client = HttpRequestClient(self.bot.client.web_client, logger)
+        self.executor.submit(self.handle, client, slack_request)
+        return client.acknowledged
+
+    def handle(
+        self, client: "HttpRequestClient", slack_request: SocketModeRequest
+    ) -> None:
+        try:
+            event_id = slack_request.payload.get("event_id")
+            if slack_request.type == "events_api" and event_id:
+                if not self.first_delivery(event_id):
+                    logger.info(
+                        f"Dropping redelivery {slack_request.retry_attempt} "
+                        f"({slack_request.retry_reason}) of {event_id}"
+                    )
+                    return
+            for listener in self.bot.listeners():
+                try:
+                    listener(client, slack_request)
+                except Exception:
+                    logger.exception(f"Failed to handle {slack_request.type} request")
+        except Exception:
+            logger.exception(f"Failed to dispatch {slack_request.type} request")
+        finally:
+            if not client.acknowledged.done():
+                client.acknowledged.set_result(None)
+            with self.lock:
+                self.pending -= 1
+
+    def first_delivery(self, event_id: str) -> bool:
+        now = datetime.now()
+        with self.lock:
+            prune = self.pruned_at is None or now - self.pruned_at > PRUNE_INTERVAL
+            if prune:
+                self.pruned_at = now
+        with self.bot.session_factory(self.bot.db_engine) as session:
+            first = self.bot.broker.record_slack_event_delivery(session, event_id, now)
+            if prune:
+                self.bot.broker.prune_slack_event_deliveries(session, now)
+            session.commit()
+        return first
+
+    def shutdown(self) -> None:
+        self.executor.shutdown(wait=True)
+        self.bot.stop_reviewer_index_listener()
+
+
+dispatcher_lock = Lock()
+
+
+def slack_dispatcher() -> SlackDispatcher:
+    with dispatcher_lock:
+        dispatcher: Optional[SlackDispatcher] = current_app.config.get(
+            "SLACK_DISPATCHER"
+        )
+        if dispatcher is None:
+            from slacker.assignment_strategies import DEFAULT_ASSIGNMENT_STRATEGY
+            from slacker.bot import Bot
+            from slacker.github import GitHubAppAuth
+
+            bot = Bot(
+                None,
+                os.environ.get("SLACK_BOT_TOKEN", ""),
+                os.environ.get("GITHUB_TOKEN"),
+                os.environ.get("DATABASE_URL", ""),
+                os.environ.get("ASSIGNMENT_STRATEGY", DEFAULT_ASSIGNMENT_STRATEGY),
+                # The bot process (or the jobs CLI) sweeps, not every replica
+                sweep_interval=None,
+                github_app_auth=GitHubAppAuth.from_env(),
+            )
+            bot.start_reviewer_index_listener()
+            dispatcher = SlackDispatcher(bot)
+            current_app.config["SLACK_DISPATCHER"] = dispatcher
+        return dispatcher
+
+
+# None unless the request was signed with our signing secret in the
+# last five minutes, otherwise the response to send instead
+def reject_unsigned_request() -> Optional[tuple[str, int]]:
+    secret = current_app.config.get("SLACK_SIGNING_SECRET") or os.environ.get(
+        "SLACK_SIGNING_SECRET"
+    )
+    if not secret:
+        logger.error("SLACK_SIGNING_SECRET is not set, refusing Slack request")
+        return "Signing secret is not configured", 503
+    if not SignatureVerifier(secret).is_valid_request(
+        request.get_data(), dict(request.headers)
+    ):
+        return "Bad signature", 401
+    return None
+
+
+@app.post("/slack/events")
+def slack_events() -> Response | tuple[str, int]:
+    if (rejection := reject_unsigned_request()) is not None:
+        return rejection
+
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return "Expected a JSON object", 400
+    if payload.get("type") == "url_verification":
+        return jsonify(challenge=payload.get("challenge"))
+    if payload.get("type") != "event_callback":
+        return "Ignored", 200
+
+    retry = request.headers.get("X-Slack-Retry-Num")
+    slack_request = SocketModeRequest(
+        type="events_api",
+        envelope_id=payload.get("event_id") or uuid.uuid4().hex,
+        payload=payload,
+        retry_attempt=int(retry) if retry and retry.isdigit() else None,
+        retry_reason=request.headers.get("X-Slack-Retry-Reason"),
+    )
+    if slack_dispatcher().dispatch(slack_request) is None:
+        logger.error("Too many Slack requests pending, asking for a retry")
+        return "Too busy", 503
+    # The Events API doesn't take anything back, so there's nothing to
+    # wait for
+    return "", 200
+
+
+@app.post("/slack/interactivity")
+def slack_interactivity() -> Response | tuple[str, int]:
+    if (rejection := reject_unsigned_request()) is not None:
+        return rejection
+
+    try:
+        payload = json.loads(request.form["payload"])
+    except (KeyError, ValueError):
+        return "Expected a payload", 400
+    if not isinstance(payload, dict):
+        return "Expected a JSON object", 400
+
+    acknowledged = slack_dispatcher().dispatch(
+        SocketModeRequest(
+            type="interactive", envelope_id=uuid.uuid4().hex, payload=payload
+        )
+    )
+    if acknowledged is None:
+        logger.error("Too many Slack requests pending, refusing interaction")
+        return "Too busy", 503
+    try:
+        response = acknowledged.result(timeout=ACK_TIMEOUT)
+    except FutureTimeoutError:
+        logger.warning(f"No acknowledgement for {payload.get('type')} in time")
+        response = None
+    if response:
+        return jsonify(response)
+    return "", 200
+
+
+__all__ = ["SlackDispatcher", "slack_dispatcher", "slack_events", "slack_interactivity"]
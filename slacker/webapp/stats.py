@@ -0,0 +1,88 @@
+from datetime import date, timedelta
+from typing import Iterable, Optional
+
+from flask import Response, abort, jsonify, request
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from slacker.model import Channel, User
+from slacker.stats import ReviewStats, fetch_review_stats
+from slacker.webapp.database import db_session
+
+from . import app
+
+DEFAULT_STATS_DAYS = 30
+GROUPS = {"channel": "channel_id", "user": "user_id"}
+
+
+def fetch_id(session: Session, model: type[Channel] | type[User], slack_id: str) -> int:
+    id = session.scalars(select(model.id).where(model.slack_id == slack_id)).first()
+    if id is None:
+        abort(404, f"No {model.__name__.lower()} {slack_id}")
+    return id
+
+
+def fetch_slack_ids(
+    session: Session, model: type[Channel] | type[User], ids: Iterable[int]
+) -> dict[int, str]:
+    statement = select(model.id, model.slack_id).where(model.id.in_(list(ids)))
+    return {id: slack_id for id, slack_id in session.execute(statement)}
+
+
+# Review stats for assignments made from since up to (but not including)
+# until, by default the 30 days up to and including today. channel and
+# user (Slack ids) narrow them down and group_by=channel or user breaks
+# them down. Only reads the rollups kept by slacker.stats.
+@app.route("/stats.json")
+def stats() -> Response:
+    try:
+        since_arg = request.args.get("since")
+        until_arg = request.args.get("until")
+        until = (
+            date.fromisoformat(until_arg)
+            if until_arg
+            else date.today() + timedelta(days=1)
+        )
+        since = (
+            date.fromisoformat(since_arg)
+            if since_arg
+            else until - timedelta(days=DEFAULT_STATS_DAYS)
+        )
+    except ValueError as error:
+        abort(400, str(error))
+    group_by = request.args.get("group_by")
+    if group_by is not None and group_by not in GROUPS:
+        abort(400, "group_by must be channel or user")
+
+    with db_session() as session:
+        channel_id: Optional[int] = None
+        user_id: Optional[int] = None
+        if channel := request.args.get("channel"):
+            channel_id = fetch_id(session, Channel, channel)
+        if user := request.args.get("user"):
+            user_id = fetch_id(session, User, user)
+
+        totals = fetch_review_stats(session, since, until, channel_id, user_id)
+        body = {
+            "since": since.isoformat(),
+            "until": until.isoformat(),
+            "totals": totals.get(None, ReviewStats()).as_json(),
+        }
+        if group_by is not None:
+            groups = fetch_review_stats(
+                session, since, until, channel_id, user_id, GROUPS[group_by]
+            )
+            model = Channel if group_by == "channel" else User
+            slack_ids = fetch_slack_ids(
+                session, model, (key for key in groups if key is not None)
+            )
+            body[group_by] = {
+                slack_ids[key]: summary.as_json()
+                for key, summary in groups.items()
+                if key in slack_ids
+            }
+
+    return jsonify(body)
+
+
+__all__ = ["stats"]
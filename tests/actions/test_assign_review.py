@@ -3,7 +3,9 @@ from unittest.mock import Mock
 from datetime import datetime
 
 from slacker.model import User, Channel, UserChannelConfig, AssignedReview
+from slacker.model import AssignedReviewHistory, PullRequest
 from slacker.actions.assign_review import AssignReview
+from slacker.assignment_strategies import LeastLoadedStrategy, RandomStrategy
 
 
 @pytest.fixture
@@ -26,10 +28,15 @@ def default_slack_state(dummy_slack):
 
 @pytest.fixture
 def mock_pr():
-    mock_pr = Mock()
-    mock_pr.user.login = "bob"
-    mock_pr.html_url = "https://github.com/mock/mock/pull/1"
-    return mock_pr
+    return PullRequest(
+        owner="mock",
+        repo="mock",
+        number=1,
+        html_url="https://github.com/mock/mock/pull/1",
+        author_login="bob",
+        state="open",
+        fetched_at=datetime.now(),
+    )
 
 
 def test_no_eligible_reviewers(broker, default_slack_state, db_session, mock_pr):
@@ -141,12 +148,14 @@ def test_jane_has_already_been_assigned_a_review(
             requestor=bob,
             channel=channel,
             assigned_at=datetime.now(),
+            pull_request=mock_pr,
             pr_url=mock_pr.html_url,
         )
         session.add(jane)
         session.add(bob)
         session.add(channel)
         session.add(existing_assignment)
+        session.flush()
 
         action = AssignReview(broker)
         result = action.perform(session, "bob", "channel", mock_pr)
@@ -156,3 +165,292 @@ def test_jane_has_already_been_assigned_a_review(
         "No eligible reviewers for https://github.com/mock/mock/pull/1"
         in result.messages
     )
+
+
+def test_archived_assignments_are_excluded_too(
+    broker, default_slack_state, dummy_slack, db_session, mock_pr
+):
+    dummy_slack.set_user_presence("jane", "active")
+    with db_session as session:
+        jane = broker.fetch_user_by_slack_id_or_create_from_slack(session, "jane")
+        bob = broker.fetch_user_by_slack_id_or_create_from_slack(session, "bob")
+        session.add(mock_pr)
+        session.flush()
+        # Assigned long ago, completed and since archived
+        session.add(
+            AssignedReviewHistory(
+                id=1,
+                assignee_id=jane.id,
+                requestor_id=bob.id,
+                pull_request_id=mock_pr.id,
+                pr_url=mock_pr.html_url,
+                assigned_at=datetime(2024, 1, 1),
+                completed_at=datetime(2024, 1, 2),
+            )
+        )
+
+        result = AssignReview(broker).perform(session, "bob", "channel", mock_pr)
+
+    assert result.reviewer is None
+
+
+def test_least_loaded_reviewer_is_chosen(
+    broker, default_slack_state, dummy_slack, db_session, mock_pr
+):
+    dummy_slack.set_user(
+        "cheryl",
+        {"real_name": "Cheryl", "profile": {"email": "cheryl@example.com"}},
+    )
+    dummy_slack.set_user_presence("jane", "active")
+    dummy_slack.set_user_presence("cheryl", "active")
+    dummy_slack.set_channel_members("channel", ["bob", "jane", "cheryl"])
+
+    with db_session as session:
+        jane = User(slack_id="jane", name="Jane", email="jane@example.com")
+        cheryl = User(slack_id="cheryl", name="Cheryl", email="cheryl@example.com")
+        channel = Channel(
+            slack_id="channel",
+            name="Test Channel",
+            new_devs_are_reviewers=True,
+            assignment_strategy="least-loaded",
+        )
+        session.add_all(
+            [
+                UserChannelConfig(
+                    user=jane,
+                    channel=channel,
+                    reviewer=True,
+                    notify_on_assignment=False,
+                    open_reviews=3,
+                ),
+                UserChannelConfig(
+                    user=cheryl,
+                    channel=channel,
+                    reviewer=True,
+                    notify_on_assignment=False,
+                    open_reviews=1,
+                ),
+            ]
+        )
+
+        action = AssignReview(broker)
+        result = action.perform(session, "bob", "channel", mock_pr)
+        session.flush()
+        session.expire_all()
+
+        assert result.reviewer.slack_id == "cheryl"
+        counts = broker.fetch_open_review_counts(session, channel, [jane, cheryl])
+        assert counts == {jane.id: 3, cheryl.id: 2}
+
+
+def test_batch_reuses_reviewers_only_when_it_has_to(
+    broker, default_slack_state, dummy_slack, db_session, mock_pr
+):
+    dummy_slack.set_user_presence("jane", "active")
+    second_pr = PullRequest(
+        owner="mock",
+        repo="mock",
+        number=2,
+        html_url="https://github.com/mock/mock/pull/2",
+        author_login="bob",
+        state="open",
+        fetched_at=datetime.now(),
+    )
+
+    with db_session as session:
+        action = AssignReview(broker)
+        results = action.perform_batch(session, "bob", "channel", [mock_pr, second_pr])
+
+    # jane is the only eligible reviewer, so she gets both
+    assert [result.reviewer.slack_id for result in results] == ["jane", "jane"]
+    assert "Assuming that Bob Bobsson is bob on github" in results[0].messages
+    assert results[1].messages == []
+
+
+@pytest.fixture
+def busy_channel(dummy_slack):
+    members = [f"user{n}" for n in range(6)]
+    for member in members:
+        dummy_slack.set_user(
+            member,
+            {"real_name": member, "profile": {"email": f"{member}@example.com"}},
+        )
+        dummy_slack.set_user_presence(member, "active")
+    dummy_slack.set_channel_members("channel", members)
+    return members
+
+
+def test_multiple_reviewers_are_distinct_and_presence_is_lazy(
+    broker, busy_channel, db_session, mock_pr, monkeypatch
+):
+    presence_checks = []
+    check_presence = broker.get_user_presence_for_slack_id
+
+    def counting_presence(slack_user_id):
+        presence_checks.append(slack_user_id)
+        return check_presence(slack_user_id)
+
+    monkeypatch.setattr(broker, "get_user_presence_for_slack_id", counting_presence)
+
+    with db_session as session:
+        action = AssignReview(broker)
+        result = action.perform(session, "user0", "channel", mock_pr, reviewers=2)
+        session.flush()
+        assignments = broker.fetch_assignments_for_pr_url(session, mock_pr.html_url)
+
+    assert len(result.reviewers) == 2
+    assert len(set(result.reviewers)) == 2
+    assert sorted(a.assignee.slack_id for a in assignments) == sorted(
+        reviewer.slack_id for reviewer in result.reviewers
+    )
+    # Only the users that were drawn needed a presence check
+    assert len(presence_checks) == 2
+
+
+def test_presence_is_looked_up_for_as_many_as_are_needed_at_once(
+    broker, busy_channel, dummy_slack, db_session, mock_pr, monkeypatch
+):
+    for member in busy_channel[1:4]:
+        dummy_slack.set_user_presence(member, "away")
+    lookups = []
+    lookup_presences = broker.get_user_presences_for_slack_ids
+
+    def recording_lookups(slack_user_ids):
+        lookups.append(len(slack_user_ids))
+        return lookup_presences(slack_user_ids)
+
+    monkeypatch.setattr(broker, "get_user_presences_for_slack_ids", recording_lookups)
+
+    with db_session as session:
+        action = AssignReview(broker)
+        result = action.perform(session, "user0", "channel", mock_pr, reviewers=2)
+
+    assert sorted(user.slack_id for user in result.reviewers) == ["user4", "user5"]
+    # Each lookup covers the reviewers still missing
+    assert lookups[0] == 2
+    assert sum(lookups) <= 5
+
+
+def test_fewer_reviewers_than_requested(
+    broker, default_slack_state, dummy_slack, db_session, mock_pr
+):
+    dummy_slack.set_user_presence("jane", "active")
+
+    with db_session as session:
+        action = AssignReview(broker)
+        result = action.perform(session, "bob", "channel", mock_pr, reviewers=3)
+
+    assert [reviewer.slack_id for reviewer in result.reviewers] == ["jane"]
+    assert (
+        "Only found 1 of 3 reviewers for https://github.com/mock/mock/pull/1"
+        in result.messages
+    )
+
+
+def test_channels_without_a_strategy_use_random(broker):
+    channel = Channel(slack_id="channel", name="Test Channel")
+
+    assert isinstance(
+        AssignReview(broker).strategy_for_channel(channel), RandomStrategy
+    )
+    assert isinstance(
+        AssignReview(broker, "least-loaded").strategy_for_channel(channel),
+        LeastLoadedStrategy,
+    )
+
+
+def test_channel_strategy_is_used(broker, busy_channel, db_session, mock_pr):
+    with db_session as session:
+        channel = Channel(
+            slack_id="channel",
+            name="Test Channel",
+            new_devs_are_reviewers=True,
+            assignment_strategy="round-robin",
+        )
+        session.add(channel)
+
+        second_pr = PullRequest(
+            owner="mock",
+            repo="mock",
+            number=2,
+            html_url="https://github.com/mock/mock/pull/2",
+            author_login="someone-else",
+            state="open",
+            fetched_at=datetime.now(),
+        )
+
+        action = AssignReview(broker)
+        first = action.perform(session, "user0", "channel", mock_pr)
+        second = action.perform(session, "user0", "channel", second_pr)
+
+    # Round robin goes through users in id order, and user0 (the
+    # requestor) was created first
+    assert first.reviewer.slack_id == "user1"
+    assert second.reviewer.slack_id == "user2"
+    assert channel.round_robin_last_user_id == second.reviewer.id
+
+
+def test_round_robin_chooses_again_after_losing_a_race(
+    broker, busy_channel, db_session, mock_pr, monkeypatch
+):
+    advance = broker.advance_round_robin_position
+    raced = []
+
+    def racing_advance(session, channel, seen, user_id):
+        if not raced:
+            # Another assignment in the channel takes the same user first
+            raced.append(user_id)
+            advance(session, channel, seen, user_id)
+        return advance(session, channel, seen, user_id)
+
+    monkeypatch.setattr(broker, "advance_round_robin_position", racing_advance)
+
+    with db_session as session:
+        channel = Channel(
+            slack_id="channel",
+            name="Test Channel",
+            new_devs_are_reviewers=True,
+            assignment_strategy="round-robin",
+        )
+        session.add(channel)
+
+        result = AssignReview(broker).perform(session, "user0", "channel", mock_pr)
+
+    assert result.reviewer.slack_id == "user2"
+    assert channel.round_robin_last_user_id == result.reviewer.id
+
+
+def test_reviewer_index_is_reused_and_kept_up_to_date(
+    broker, busy_channel, db_session, mock_pr, monkeypatch
+):
+    member_fetches = []
+    fetch_members = broker.fetch_slack_user_ids_from_channel
+
+    def counting_fetch_members(channel):
+        member_fetches.append(channel.slack_id)
+        return fetch_members(channel)
+
+    monkeypatch.setattr(
+        broker, "fetch_slack_user_ids_from_channel", counting_fetch_members
+    )
+
+    with db_session as session:
+        action = AssignReview(broker)
+        channel = broker.fetch_channel_by_slack_id_or_create_from_slack(
+            session, "channel"
+        )
+        first = action.calculate_eligible_reviewers_in_channel(session, channel)
+
+        # Everyone but user1 stops reviewing
+        for user in first:
+            if user.slack_id != "user1":
+                config = broker.fetch_or_create_channel_config_for_user_in_channel(
+                    session, user, channel
+                )
+                broker.set_channel_reviewer(session, config, False)
+
+        result = action.perform(session, "user0", "channel", mock_pr)
+
+    assert len(first) == 6
+    assert member_fetches == ["channel"]
+    assert result.reviewer.slack_id == "user1"
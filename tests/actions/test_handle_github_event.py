@@ -0,0 +1,137 @@
+import json
+import pytest
+
+from datetime import datetime
+
+from sqlalchemy import select
+
+from slacker.actions.handle_github_event import HandleGitHubEvent
+from slacker.model import User, Channel, UserChannelConfig, AssignedReview, PullRequest
+from tests.fixtures.github import PULL_JSON
+
+PR_URL = "https://github.com/nrw505/slacker2/pull/1"
+
+
+def pull_request_payload(**changes):
+    pull_request = json.loads(PULL_JSON)
+    pull_request.update(changes)
+    return pull_request
+
+
+@pytest.fixture
+def assignments(db_session):
+    jane = User(
+        slack_id="jane", name="Jane", email="jane@example.com", github_username="Jane"
+    )
+    bob = User(
+        slack_id="bob", name="Bob", email="bob@example.com", github_username="bob"
+    )
+    channel = Channel(slack_id="channel", name="Test", new_devs_are_reviewers=True)
+    pull_request = PullRequest(
+        owner="nrw505",
+        repo="slacker2",
+        number=1,
+        html_url=PR_URL,
+        author_login="nrw505",
+        title="Old title",
+        state="open",
+        fetched_at=datetime(2023, 1, 1),
+    )
+    configs = [
+        UserChannelConfig(
+            user=user,
+            channel=channel,
+            reviewer=True,
+            notify_on_assignment=False,
+            open_reviews=1,
+        )
+        for user in (jane, bob)
+    ]
+    rows = {
+        name: AssignedReview(
+            assignee=user,
+            requestor=user,
+            channel=channel,
+            pull_request=pull_request,
+            pr_url=PR_URL,
+            assigned_at=datetime(2023, 1, 1),
+        )
+        for name, user in (("jane", jane), ("bob", bob))
+    }
+    db_session.add_all([*configs, *rows.values()])
+    db_session.flush()
+    return {name: row.id for name, row in rows.items()}
+
+
+def completed_ids(session):
+    statement = select(AssignedReview.id).where(AssignedReview.completed_at != None)
+    return set(session.scalars(statement))
+
+
+def test_review_by_assignee_completes_their_assignment(broker, db_session, assignments):
+    payload = {
+        "action": "submitted",
+        "review": {"state": "approved", "user": {"login": "jane"}},
+        "pull_request": pull_request_payload(),
+    }
+
+    completed = HandleGitHubEvent(broker).perform(
+        db_session, "pull_request_review", payload
+    )
+
+    assert completed == 1
+    assert completed_ids(db_session) == {assignments["jane"]}
+    open_reviews = db_session.scalars(
+        select(UserChannelConfig.open_reviews).order_by(UserChannelConfig.id)
+    ).all()
+    assert open_reviews == [0, 1]
+
+
+def test_comment_review_does_not_complete(broker, db_session, assignments):
+    payload = {
+        "action": "submitted",
+        "review": {"state": "commented", "user": {"login": "jane"}},
+        "pull_request": pull_request_payload(),
+    }
+
+    assert (
+        HandleGitHubEvent(broker).perform(db_session, "pull_request_review", payload)
+        == 0
+    )
+    assert completed_ids(db_session) == set()
+
+
+def test_review_by_someone_else_does_not_complete(broker, db_session, assignments):
+    payload = {
+        "action": "submitted",
+        "review": {"state": "approved", "user": {"login": "stranger"}},
+        "pull_request": pull_request_payload(),
+    }
+
+    HandleGitHubEvent(broker).perform(db_session, "pull_request_review", payload)
+
+    assert completed_ids(db_session) == set()
+
+
+def test_closing_the_pr_completes_every_assignment(broker, db_session, assignments):
+    payload = {
+        "action": "closed",
+        "pull_request": pull_request_payload(state="closed", merged=True),
+    }
+
+    completed = HandleGitHubEvent(broker).perform(db_session, "pull_request", payload)
+
+    assert completed == 2
+    assert completed_ids(db_session) == set(assignments.values())
+
+
+def test_pr_metadata_is_refreshed_from_payload(broker, db_session, assignments):
+    payload = {
+        "action": "edited",
+        "pull_request": pull_request_payload(title="New title"),
+    }
+
+    assert HandleGitHubEvent(broker).perform(db_session, "pull_request", payload) == 0
+    pull_request = broker.fetch_pull_request_by_url(db_session, PR_URL)
+    assert pull_request.title == "New title"
+    assert completed_ids(db_session) == set()
@@ -0,0 +1,107 @@
+import json
+
+import pytest
+from sqlalchemy import func, select
+
+from slacker.bench.fakes import FakeSlack, SyntheticWorkspace
+from slacker.bench.simulate import (
+    Simulator,
+    compare,
+    main,
+    percentile,
+    run_simulation,
+)
+from slacker.model import AssignedReview
+
+
+@pytest.fixture
+def workspace():
+    return SyntheticWorkspace.generate(
+        users=30, channels=3, members_per_channel=10, presence_ratio=0.5
+    )
+
+
+def test_workspace_generation(workspace):
+    assert len(workspace.users) == 30
+    assert len(workspace.channels) == 3
+    assert all(len(members) == 10 for members in workspace.channels.values())
+    assert set(workspace.presence.values()) <= {"active", "away"}
+
+
+def test_fake_slack_counts_calls(workspace):
+    slack = FakeSlack(workspace)
+    channel = next(iter(workspace.channels))
+
+    pages = list(slack.conversations_members(channel=channel))
+    slack.users_getPresence(user=pages[0]["members"][0])
+
+    assert pages[0]["members"] == workspace.channels[channel]
+    assert slack.counter.calls == {"conversations.members": 1, "users.getPresence": 1}
+
+
+def test_percentile():
+    values = [float(n) for n in range(1, 101)]
+
+    assert percentile(values, 50) == 50.0
+    assert percentile(values, 99) == 99.0
+    assert percentile([3.0], 95) == 3.0
+
+
+def test_simulator_records_every_operation(db_connection, workspace):
+    transaction = db_connection.begin()
+    try:
+        simulator = Simulator(db_connection, workspace)
+        simulator.run(40, {"review": 0.5, "reroll": 0.2, "complete": 0.3})
+        report = simulator.report()
+    finally:
+        transaction.rollback()
+
+    assert sum(metrics["count"] for metrics in report.values()) == 40
+    review = report["review"]
+    assert review["p50_ms"] <= review["p95_ms"] <= review["p99_ms"]
+    assert review["queries"] > 0
+    assert review["github_calls"] == 1
+
+
+def test_run_simulation_leaves_no_rows_behind(db_connection, workspace):
+    report = run_simulation(db_connection, workspace, operations=10)
+
+    assert report["review"]["count"] >= 1
+    with db_connection.begin():
+        count = db_connection.execute(
+            select(func.count()).select_from(AssignedReview)
+        ).scalar_one()
+    assert count == 0
+
+
+def test_compare():
+    baseline = {"review": {"count": 10, "p95_ms": 10.0, "queries": 0.0}}
+    current = {"review": {"count": 20, "p95_ms": 15.0, "queries": 0.0}}
+
+    assert compare(current, baseline) == {
+        "review": {"p95_ms": (10.0, 15.0, 1.5), "queries": (0.0, 0.0, 1.0)}
+    }
+
+
+def test_cli_saves_and_compares_baseline(test_database_url, tmp_path, capsys):
+    baseline = tmp_path / "baseline.json"
+    arguments = [
+        "--database-url",
+        test_database_url,
+        "--users",
+        "20",
+        "--channels",
+        "2",
+        "--members-per-channel",
+        "5",
+        "--operations",
+        "10",
+    ]
+
+    assert main(arguments + ["--save", str(baseline)]) == 0
+    saved = json.loads(baseline.read_text())
+    assert "database_url" not in saved["parameters"]
+    assert "review" in saved["results"]
+
+    assert main(arguments + ["--compare", str(baseline)]) == 0
+    assert "p95_ms" in capsys.readouterr().out
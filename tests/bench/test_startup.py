@@ -0,0 +1,61 @@
+import json
+import pytest
+
+from slacker.bench import startup
+from slacker.bench.startup import (
+    BUDGETS_MS,
+    IMPORT_SCRIPT,
+    SCRIPTS,
+    StartupReport,
+    benchmark_startup,
+    main,
+    run_script,
+)
+
+
+@pytest.fixture(scope="module")
+def report():
+    return benchmark_startup(runs=2)
+
+
+def test_heavy_dependencies_are_imported_lazily(report):
+    assert report.eager_imports == {stage: [] for stage in SCRIPTS}
+
+
+@pytest.mark.bench
+def test_startup_is_within_budget(report):
+    assert report.failures() == []
+    for stage, metrics in report.times.items():
+        assert 0 < metrics["min_ms"] <= metrics["median_ms"]
+
+
+def test_failures():
+    report = StartupReport(
+        {"started": {"count": 1, "min_ms": BUDGETS_MS["started"] + 1}},
+        {"import slacker.bot": ["github"]},
+    )
+
+    assert report.failures() == [
+        f"started took {BUDGETS_MS['started'] + 1:.0f}ms,"
+        f" over its budget of {BUDGETS_MS['started']:.0f}ms",
+        "import slacker.bot imports github",
+    ]
+
+
+def test_run_script():
+    output = run_script(IMPORT_SCRIPT.format(module="slacker.model"))
+
+    assert output["seconds"] > 0
+    assert "sqlalchemy" in output["modules"]
+
+
+def test_cli_saves_and_compares_baseline(report, monkeypatch, tmp_path, capsys):
+    # Already measured once, no need to start more interpreters
+    monkeypatch.setattr(startup, "benchmark_startup", lambda runs: report)
+    baseline = tmp_path / "baseline.json"
+
+    assert main(["--runs", "1", "--save", str(baseline)]) == 0
+    assert set(json.loads(baseline.read_text())["results"]) == set(SCRIPTS)
+
+    assert main(["--runs", "1", "--compare", str(baseline)]) == 0
+    assert "median_ms" in capsys.readouterr().out
@@ -0,0 +1,19 @@
+import pytest
+
+from slacker.assignment_strategies import STRATEGY_NAMES
+from slacker.bench.strategies import benchmark_strategies, main
+
+
+def test_benchmark_covers_every_strategy():
+    results = benchmark_strategies(candidates=20, number=5)
+
+    assert sorted(results) == sorted(STRATEGY_NAMES)
+    assert all(seconds > 0 for seconds in results.values())
+
+
+def test_benchmark_cli(capsys):
+    main(["--candidates", "10", "--number", "2"])
+
+    out = capsys.readouterr().out
+    for name in STRATEGY_NAMES:
+        assert name in out
@@ -1,7 +1,8 @@
 import pytest
-from datetime import datetime
+from datetime import date, datetime
 
 from slacker.model import User, Channel, UserChannelConfig, AssignedReview
+from slacker.stats import StatsChange, record_changes
 
 
 def test_empty_app_view(bot, db_session):
@@ -116,3 +117,33 @@ def test_app_view_with_assigned_reviews(bot, db_session):
     # Right now I'm not so fussed by the content of the rest of the
     # blocks, just want to make sure we don't error generate them and
     # that we cover all the different rendering possibilities.
+
+
+def test_app_view_with_review_stats(bot, db_session):
+    jane = User(
+        slack_id="jane",
+        name="Jane Janesdottir",
+        email="jane.janesdottir@example.com",
+    )
+    channel = Channel(
+        slack_id="channel", name="Test Channel", new_devs_are_reviewers=False
+    )
+    db_session.add_all([jane, channel])
+    db_session.flush()
+    record_changes(
+        db_session,
+        [
+            StatsChange(date.today(), channel.id, jane.id, assigned=4, rerolled=1),
+            StatsChange(
+                date.today(), channel.id, jane.id, completed=1, complete_seconds=5400
+            ),
+        ],
+    )
+
+    view = bot.app_home_view_for_user("jane")
+
+    assert len(view["blocks"]) == 9
+    stats_text = view["blocks"][2]["text"]["text"]
+    assert "assigned *4* reviews and completed *1*" in stats_text
+    assert "Median time to complete: 1.5h" in stats_text
+    assert "Rerolled: 25%" in stats_text
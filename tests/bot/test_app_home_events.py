@@ -1,6 +1,8 @@
 import pytest
 from unittest.mock import Mock
 
+from slacker.actions.assign_review import AssignReview
+
 
 def test_non_events_api_event(bot):
     request = Mock()
@@ -36,3 +38,69 @@ def test_app_home_opened_event(bot, default_slack_state):
 
     bot.client.send_socket_mode_response.assert_called()
     assert "bob" in bot.client.web_client.views_published
+
+
+def membership_event(event_type, user, channel="channel"):
+    request = Mock()
+    request.type = "events_api"
+    request.payload = {"event": {"type": event_type, "user": user, "channel": channel}}
+    return request
+
+
+def indexed_reviewers(bot, db_session):
+    channel = bot.broker.fetch_channel_by_slack_id(db_session, "channel")
+    ids = bot.broker.reviewer_index.reviewers_in_channel(channel.id)
+    return sorted(
+        user.slack_id for user in bot.broker.fetch_users_by_ids(db_session, ids)
+    )
+
+
+@pytest.fixture
+def indexed_channel(bot, db_session, default_slack_state):
+    channel = bot.broker.fetch_channel_by_slack_id_or_create_from_slack(
+        db_session, "channel"
+    )
+    AssignReview(bot.broker).calculate_eligible_reviewers_in_channel(
+        db_session, channel
+    )
+    return channel
+
+
+def test_member_joined_channel_event(bot, db_session, dummy_slack, indexed_channel):
+    dummy_slack.set_user(
+        "alice", {"real_name": "Alice", "profile": {"email": "alice@example.com"}}
+    )
+
+    bot.membership_listener(
+        bot.client, membership_event("member_joined_channel", "alice")
+    )
+
+    bot.client.send_socket_mode_response.assert_called()
+    assert indexed_reviewers(bot, db_session) == ["alice", "bob", "jane"]
+
+
+def test_member_left_channel_event(bot, db_session, indexed_channel):
+    bot.membership_listener(bot.client, membership_event("member_left_channel", "jane"))
+
+    assert indexed_reviewers(bot, db_session) == ["bob"]
+
+
+def test_deleted_user_change_event(bot, db_session, indexed_channel):
+    request = Mock()
+    request.type = "events_api"
+    request.payload = {
+        "event": {"type": "user_change", "user": {"id": "bob", "deleted": True}}
+    }
+
+    bot.membership_listener(bot.client, request)
+
+    assert indexed_reviewers(bot, db_session) == ["jane"]
+
+
+def test_membership_event_for_unknown_channel(bot, db_session, default_slack_state):
+    bot.membership_listener(
+        bot.client, membership_event("member_joined_channel", "bob", "elsewhere")
+    )
+
+    bot.client.send_socket_mode_response.assert_called()
+    assert bot.broker.fetch_channel_by_slack_id(db_session, "elsewhere") is None
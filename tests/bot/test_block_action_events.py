@@ -3,6 +3,7 @@ from datetime import datetime
 from unittest.mock import Mock
 
 from slacker.model import User, Channel, UserChannelConfig, AssignedReview
+from slacker.model import PullRequest
 
 
 @pytest.fixture
@@ -169,6 +170,40 @@ def test_reviewed_assignment_event(bot, db_session, preloaded_assignment_id):
     assert reloaded.completed_at is not None
 
 
+def test_reviewed_assignment_releases_open_review(
+    bot, db_session, preloaded_assignment_id
+):
+    assignment = bot.broker.fetch_assignment_for_id(db_session, preloaded_assignment_id)
+    config = bot.broker.fetch_or_create_channel_config_for_user_in_channel(
+        db_session, assignment.assignee, assignment.channel
+    )
+    config.open_reviews = 1
+    db_session.flush()
+
+    request = Mock()
+    request.type = "interactive"
+    request.payload = {
+        "type": "block_actions",
+        "user": {"id": "jane"},
+        "actions": [
+            {
+                "action_id": "assignment-reviewed",
+                "value": str(preloaded_assignment_id),
+            },
+        ],
+        "trigger_id": "1",
+    }
+    request.envelope_id = "test-envelope-id"
+
+    bot.block_actions_listener(bot.client, request)
+
+    assignment = bot.broker.fetch_assignment_for_id(db_session, preloaded_assignment_id)
+    counts = bot.broker.fetch_open_review_counts(
+        db_session, assignment.channel, [assignment.assignee]
+    )
+    assert counts == {assignment.assignee.id: 0}
+
+
 def test_reviewed_assignment_event_from_wrong_person(
     bot, db_session, preloaded_assignment_id
 ):
@@ -248,6 +283,59 @@ def test_reroll_assignment_event(
 
     reloaded = bot.broker.fetch_assignment_for_id(db_session, preloaded_assignment_id)
     assert reloaded.rerolled_at is not None
+    # It was made without a stored PR, so is linked to the one fetched
+    assert reloaded.pull_request is not None
+    assert reloaded.pull_request.html_url == mocked_pr_url
+
+    bob = bot.broker.fetch_user_by_slack_id_or_create_from_slack(db_session, "bob")
+    counts = bot.broker.fetch_open_review_counts(
+        db_session, reloaded.channel, [reloaded.assignee, bob]
+    )
+    # jane's assignment was made without going through the broker, so
+    # her counter was never incremented; it must not go negative
+    assert counts == {bob.id: 1, reloaded.assignee.id: 0}
+
+
+def test_reroll_assignment_with_stored_pr_makes_no_github_calls(
+    bot,
+    default_slack_state,
+    db_session,
+    preloaded_assignment_id,
+    mocked_pr_url,
+    requests_mock,
+):
+    assignment = bot.broker.fetch_assignment_for_id(db_session, preloaded_assignment_id)
+    assignment.pull_request = PullRequest(
+        owner="nrw505",
+        repo="slacker2",
+        number=1,
+        html_url=mocked_pr_url,
+        author_login="nrw505",
+        state="open",
+        fetched_at=datetime.now(),
+    )
+    db_session.flush()
+
+    request = Mock()
+    request.type = "interactive"
+    request.payload = {
+        "type": "block_actions",
+        "user": {"id": "jane"},
+        "actions": [
+            {
+                "action_id": "assignment-reroll",
+                "value": str(preloaded_assignment_id),
+            },
+        ],
+        "trigger_id": "1",
+    }
+    request.envelope_id = "test-envelope-id"
+
+    bot.block_actions_listener(bot.client, request)
+
+    messages = bot.client.web_client.sent_messages["channel"]
+    assert f"Bob Bobsson (<@bob>) to review {mocked_pr_url}" in messages
+    assert requests_mock.call_count == 0
 
 
 def test_reroll_assignment_where_nobody_is_eligible_event(
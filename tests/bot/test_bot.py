@@ -2,6 +2,7 @@ import pytest
 
 from threading import Thread
 from unittest.mock import Mock
+from urllib.request import urlopen
 
 
 def test_bot_runs(bot):
@@ -22,6 +23,22 @@ def test_bot_runs(bot):
     assert not bot_thread.is_alive()
 
 
+def test_bot_serves_metrics(bot):
+    bot.metrics_port = 0
+    bot_thread = Thread(target=bot.run)
+    bot_thread.start()
+    assert bot.wait_for_start(timeout=5)
+
+    port = bot.metrics_server.server_address[1]
+    with urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+        assert response.status == 200
+
+    bot.terminate()
+    bot_thread.join(timeout=2)
+    assert not bot_thread.is_alive()
+    assert bot.metrics_server is None
+
+
 def test_logging_events(bot, capsys):
     request = Mock()
     request.type = "test"
@@ -31,3 +48,38 @@ def test_logging_events(bot, capsys):
     captured = capsys.readouterr()
     assert "request.type: test" in captured.out
     assert "request.payload: " in captured.out
+
+
+def test_sweep_refreshes_app_homes_of_affected_users(bot, db_engine, monkeypatch):
+    from slacker.jobs.sweep_finished_assignments import SweepResult
+
+    bot.db_engine = db_engine
+    monkeypatch.setattr(
+        "slacker.bot.SweepFinishedAssignments.perform",
+        lambda self, session: SweepResult(completed=1, affected_slack_ids={"bob"}),
+    )
+    refreshed = []
+    monkeypatch.setattr(
+        bot, "send_app_home_to_user", lambda client, user: refreshed.append(user)
+    )
+
+    result = bot.sweep_finished_assignments()
+
+    assert result.completed == 1
+    assert refreshed == ["bob"]
+
+
+def test_sweep_is_skipped_while_another_process_sweeps(bot, db_engine, monkeypatch):
+    from slacker.jobs.sweep_finished_assignments import sweep_lock
+
+    bot.db_engine = db_engine
+    monkeypatch.setattr(
+        "slacker.bot.SweepFinishedAssignments.perform",
+        lambda self, session: pytest.fail("swept while another process was"),
+    )
+
+    with sweep_lock(db_engine) as locked:
+        assert locked
+        result = bot.sweep_finished_assignments()
+
+    assert result.completed == 0
@@ -1,5 +1,8 @@
 import pytest
 from unittest.mock import Mock
+from threading import Event
+
+from slacker.github import NoInstallationError
 
 
 def test_non_events_api_event(bot):
@@ -99,3 +102,202 @@ def test_review_with_no_reviewer_message_event(bot, default_slack_state, mocked_
     assert f"Review request received for {mocked_pr_url}" in sent_messages
     assert "Assuming that Jane Janesdottir is nrw505 on github" in sent_messages
     assert f"No eligible reviewers for {mocked_pr_url}" in sent_messages
+
+
+def test_repeated_review_requests_reuse_stored_pr(
+    bot, default_slack_state, mocked_pr_url, requests_mock
+):
+    request = Mock()
+    request.type = "events_api"
+    request.payload = {
+        "event": {
+            "type": "message",
+            "user": "jane",
+            "channel": "channel",
+            "text": f"!review {mocked_pr_url}/files",
+        }
+    }
+
+    bot.message_listener(bot.client, request)
+    github_calls = requests_mock.call_count
+
+    request.payload["event"]["text"] = f"!review {mocked_pr_url}?w=1"
+    bot.message_listener(bot.client, request)
+
+    assert requests_mock.call_count == github_calls
+    sent_messages = bot.client.web_client.sent_messages["channel"]
+    assert sent_messages.count(f"Bob Bobsson (<@bob>) to review {mocked_pr_url}") == 1
+    assert f"No eligible reviewers for {mocked_pr_url}" in sent_messages
+
+
+def test_review_with_several_urls_message_event(
+    bot, default_slack_state, mocked_pr_url, mocked_second_pr_url
+):
+    bot.client.web_client.set_user(
+        "cheryl",
+        {"real_name": "Cheryl Chernobyl", "profile": {"email": "cheryl@example.com"}},
+    )
+    bot.client.web_client.set_user_presence("cheryl", "active")
+    bot.client.web_client.set_channel_members("channel", ["bob", "jane", "cheryl"])
+
+    request = Mock()
+    request.type = "events_api"
+    request.payload = {
+        "event": {
+            "type": "message",
+            "user": "jane",
+            "channel": "channel",
+            "text": f"!review {mocked_pr_url} {mocked_second_pr_url} {mocked_pr_url}/files",
+        }
+    }
+
+    bot.message_listener(bot.client, request)
+
+    sent_messages = bot.client.web_client.sent_messages["channel"]
+    assert sent_messages[0] == (
+        f"Review requests received for\n{mocked_pr_url}\n{mocked_second_pr_url}"
+    )
+    assert len(sent_messages) == 2
+    lines = sent_messages[1].split("\n")
+    assert lines[0] == "Assuming that Jane Janesdottir is nrw505 on github"
+    assignments = sorted(lines[1:])
+    assert assignments in (
+        [
+            f"Bob Bobsson (<@bob>) to review {mocked_pr_url}",
+            f"Cheryl Chernobyl (<@cheryl>) to review {mocked_second_pr_url}",
+        ],
+        [
+            f"Bob Bobsson (<@bob>) to review {mocked_second_pr_url}",
+            f"Cheryl Chernobyl (<@cheryl>) to review {mocked_pr_url}",
+        ],
+    )
+
+
+def test_review_with_reviewer_count_message_event(
+    bot, default_slack_state, mocked_pr_url
+):
+    bot.client.web_client.set_user(
+        "cheryl",
+        {"real_name": "Cheryl Chernobyl", "profile": {"email": "cheryl@example.com"}},
+    )
+    bot.client.web_client.set_user_presence("cheryl", "active")
+    bot.client.web_client.set_channel_members("channel", ["bob", "jane", "cheryl"])
+
+    request = Mock()
+    request.type = "events_api"
+    request.payload = {
+        "event": {
+            "type": "message",
+            "user": "jane",
+            "channel": "channel",
+            "text": f"!review x2 {mocked_pr_url}",
+        }
+    }
+
+    bot.message_listener(bot.client, request)
+
+    sent_messages = bot.client.web_client.sent_messages["channel"]
+    assert f"Bob Bobsson (<@bob>) to review {mocked_pr_url}" in sent_messages
+    assert f"Cheryl Chernobyl (<@cheryl>) to review {mocked_pr_url}" in sent_messages
+
+
+@pytest.mark.parametrize(
+    "text, reviewers",
+    [
+        ("!review x3 {url}", 3),
+        ("!review   x2 {url} please", 2),
+        ("!review {url} fixes the x86 build", 1),
+        ("!review {url} for a x2 speedup", 1),
+        ("x2 speedup, !review {url}", 1),
+        ("!review {url} x2", 1),
+        ("!review https://github.com/x2/x2/pull/1", 1),
+    ],
+)
+def test_review_reviewer_count_only_follows_the_command(
+    bot, mocked_pr_url, monkeypatch, text, reviewers
+):
+    requests = []
+    monkeypatch.setattr(bot, "assign_reviews", lambda *args: requests.append(args))
+    request = Mock()
+    request.type = "events_api"
+    request.payload = {
+        "event": {
+            "type": "message",
+            "user": "jane",
+            "channel": "channel",
+            "text": text.format(url=mocked_pr_url),
+        }
+    }
+
+    bot.message_listener(bot.client, request)
+
+    assert [args[-1] for args in requests] == [reviewers]
+
+
+def test_review_when_github_rate_limit_has_run_out(
+    bot, default_slack_state, requests_mock
+):
+    requests_mock.get(
+        "https://api.github.com:443/repos/nrw505/slacker2/pulls/1",
+        status_code=403,
+        text='{"message": "API rate limit exceeded for user ID 1."}',
+        headers={"X-RateLimit-Remaining": "0", "X-RateLimit-Reset": "1700000000"},
+    )
+    request = Mock()
+    request.type = "events_api"
+    request.payload = {
+        "event": {
+            "type": "message",
+            "user": "jane",
+            "channel": "channel",
+            "text": "!review https://github.com/nrw505/slacker2/pull/1",
+        }
+    }
+
+    bot.message_listener(bot.client, request)
+
+    sent_messages = bot.client.web_client.sent_messages["channel"]
+    assert sent_messages[-1].startswith("GitHub's API rate limit has run out")
+
+
+def test_review_fetches_pr_while_working_out_reviewers(
+    bot, default_slack_state, mocked_pr_url, monkeypatch
+):
+    members_fetched = Event()
+    overlapped = []
+    fetch_members = bot.broker.fetch_slack_user_ids_from_channel
+    fetch_pr = bot.github.pull_request
+
+    def slow_fetch_members(channel):
+        members_fetched.set()
+        return fetch_members(channel)
+
+    def slow_fetch_pr(url, *args):
+        # Only returns early if the channel members are being fetched at
+        # the same time
+        overlapped.append(members_fetched.wait(timeout=2))
+        return fetch_pr(url, *args)
+
+    monkeypatch.setattr(
+        bot.broker, "fetch_slack_user_ids_from_channel", slow_fetch_members
+    )
+    monkeypatch.setattr(bot.github, "pull_request", slow_fetch_pr)
+
+    bot.assign_review("jane", "channel", mocked_pr_url)
+
+    assert overlapped == [True]
+    sent_messages = bot.client.web_client.sent_messages["channel"]
+    assert sent_messages[0] == f"Review request received for {mocked_pr_url}"
+    assert f"Bob Bobsson (<@bob>) to review {mocked_pr_url}" in sent_messages
+
+
+def test_review_when_github_app_isnt_installed(bot, default_slack_state, monkeypatch):
+    def not_installed(url, *args):
+        raise NoInstallationError("nrw505")
+
+    monkeypatch.setattr(bot.github, "pull_request", not_installed)
+
+    bot.assign_review("jane", "channel", "https://github.com/nrw505/slacker2/pull/1")
+
+    sent_messages = bot.client.web_client.sent_messages["channel"]
+    assert sent_messages[-1] == "The GitHub App needs installing on nrw505 first"
@@ -110,6 +110,50 @@ def test_view_submission_event_review_with_good_pr_url(
     assert f"Bob Bobsson (<@bob>) to review {mocked_pr_url}" in sent_messages
 
 
+def test_view_submission_event_review_with_reviewer_count(
+    bot, default_slack_state, mocked_pr_url
+):
+    bot.client.web_client.set_user_presence("jane", "active")
+
+    request = Mock()
+    request.type = "interactive"
+    request.payload = {
+        "type": "view_submission",
+        "view": {
+            "callback_id": "review-modal",
+            "state": {
+                "values": {
+                    "pr": {
+                        "pr_url": {
+                            "value": mocked_pr_url,
+                        },
+                    },
+                    "channel": {
+                        "channel": {"selected_channel": "channel"},
+                    },
+                    "reviewers": {
+                        "reviewers": {"value": "2"},
+                    },
+                },
+            },
+        },
+        "user": {
+            "id": "cheryl",
+        },
+    }
+    request.envelope_id = "test-envelope-id"
+    bot.client.web_client.set_user(
+        "cheryl",
+        {"real_name": "Cheryl Chernobyl", "profile": {"email": "cheryl@example.com"}},
+    )
+
+    bot.view_submission_listener(bot.client, request)
+
+    sent_messages = bot.client.web_client.sent_messages["channel"]
+    assert f"Bob Bobsson (<@bob>) to review {mocked_pr_url}" in sent_messages
+    assert f"Jane Janesdottir (<@jane>) to review {mocked_pr_url}" in sent_messages
+
+
 def test_view_submission_event_edit_github_username_with_username(
     bot, default_slack_state
 ):
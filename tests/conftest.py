@@ -104,8 +104,8 @@ def dummy_slack() -> DummySlack:
 
 
 @pytest.fixture
-def broker(dummy_slack) -> DataBroker:
-    return DataBroker(dummy_slack)
+def broker(dummy_slack, dummy_github) -> DataBroker:
+    return DataBroker(dummy_slack, dummy_github)
 
 
 @pytest.fixture
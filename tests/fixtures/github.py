@@ -1,11 +1,12 @@
-import pytest
+import asyncio
+import json
+import re
 
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
 
-@pytest.fixture
-def mocked_pr_url(requests_mock) -> str:
-    requests_mock.get(
-        "https://api.github.com:443/repos/nrw505/slacker2",
-        text="""{
+REPO_JSON = """{
   "id": 588425690,
   "node_id": "R_kgDOIxKp2g",
   "name": "slacker2",
@@ -133,11 +134,9 @@ def mocked_pr_url(requests_mock) -> str:
   },
   "network_count": 0,
   "subscribers_count": 1
-}""",
-    )
-    requests_mock.get(
-        "https://api.github.com:443/repos/nrw505/slacker2/pulls/1",
-        text="""{
+}"""
+
+PULL_JSON = """{
   "url": "https://api.github.com/repos/nrw505/slacker2/pulls/1",
   "id": 1279569145,
   "node_id": "PR_kwDOIxKp2s5MRKz5",
@@ -478,6 +477,190 @@ def mocked_pr_url(requests_mock) -> str:
   "additions": 315,
   "deletions": 7,
   "changed_files": 12
-}""",
+}"""
+
+
+@pytest.fixture
+def mocked_pr_url(requests_mock) -> str:
+    requests_mock.get(
+        "https://api.github.com:443/repos/nrw505/slacker2",
+        text=REPO_JSON,
+    )
+    requests_mock.get(
+        "https://api.github.com:443/repos/nrw505/slacker2/pulls/1",
+        text=PULL_JSON,
     )
     return "https://github.com/nrw505/slacker2/pull/1"
+
+
+# Several PRs at once are fetched with the async client, so this one
+# comes from the fake server
+@pytest.fixture
+def mocked_second_pr_url(mocked_pr_url, fake_github_server) -> str:
+    return "https://github.com/nrw505/slacker2/pull/2"
+
+
+GRAPHQL_URL = "https://api.github.com:443/graphql"
+
+REPOSITORY_RE = re.compile(
+    r"(r\d+): repository\(owner: \$(owner\d+), name: \$(name\d+)\) \{(.*)\}"
+)
+PULL_REQUEST_RE = re.compile(r"(p\d+): pullRequest\(number: \$(number\d+)\)")
+
+
+# A stand-in for GitHub's GraphQL endpoint that understands the queries
+# GitHub.pull_request_states builds, answering from a dict of PRs
+class FakeGraphQL:
+    def __init__(self):
+        self.pull_requests = {}
+        self.queries = []
+
+    def add(self, owner, repo, number, state="OPEN", merged=False):
+        self.pull_requests[(owner, repo, number)] = {
+            "number": number,
+            "url": f"https://github.com/{owner}/{repo}/pull/{number}",
+            "title": f"PR {number}",
+            "state": state,
+            "merged": merged,
+            "headRefOid": "0" * 40,
+            "author": {"login": f"{owner}-author"},
+        }
+
+    def __call__(self, request, context):
+        body = json.loads(request.body)
+        self.queries.append(body)
+        variables = body["variables"]
+        data = {}
+        errors = []
+        for line in body["query"].splitlines():
+            match = REPOSITORY_RE.search(line)
+            if match is None:
+                continue
+            repo_alias, owner_var, name_var, selections = match.groups()
+            owner, name = variables[owner_var], variables[name_var]
+            data[repo_alias] = {}
+            for pr_alias, number_var in PULL_REQUEST_RE.findall(selections):
+                pull_request = self.pull_requests.get(
+                    (owner, name, variables[number_var])
+                )
+                data[repo_alias][pr_alias] = pull_request
+                if pull_request is None:
+                    errors.append({"type": "NOT_FOUND", "path": [repo_alias, pr_alias]})
+        context.headers["X-RateLimit-Resource"] = "graphql"
+        context.headers["X-RateLimit-Remaining"] = "4990"
+        context.headers["X-RateLimit-Limit"] = "5000"
+        response = {"data": data}
+        if errors:
+            response["errors"] = errors
+        return response
+
+
+@pytest.fixture
+def fake_graphql(requests_mock):
+    fake = FakeGraphQL()
+    requests_mock.post(GRAPHQL_URL, json=fake)
+    return fake
+
+
+def pull_json(number: int) -> str:
+    return (
+        PULL_JSON.replace("/pull/1", f"/pull/{number}")
+        .replace("/pulls/1", f"/pulls/{number}")
+        .replace('"number": 1,', f'"number": {number},')
+    )
+
+
+# A local stand-in for the parts of the GitHub API the client uses.
+# failures makes the next few requests fail with that status.
+class FakeGitHubServer:
+    def __init__(self) -> None:
+        self.requests: list[web.Request] = []
+        # The client's address for each request, to tell connections apart
+        self.peers: list[tuple[str, int]] = []
+        self.bodies: list[dict] = []
+        self.failures: list[int] = []
+        self.reviewers: list[str] = ["alice"]
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delay = 0.0
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/repos/{owner}/{repo}", self.repo)
+        app.router.add_get("/repos/{owner}/{repo}/pulls/{number}", self.pull)
+        app.router.add_route(
+            "*",
+            "/repos/{owner}/{repo}/pulls/{number}/requested_reviewers",
+            self.requested_reviewers,
+        )
+        return app
+
+    def failure(self) -> web.Response | None:
+        if self.failures:
+            return web.json_response(
+                {"message": "Server Error"}, status=self.failures.pop(0)
+            )
+        return None
+
+    async def repo(self, request: web.Request) -> web.Response:
+        self.requests.append(request)
+        return web.Response(text=REPO_JSON, content_type="application/json")
+
+    async def pull(self, request: web.Request) -> web.Response:
+        self.requests.append(request)
+        if request.transport is not None:
+            self.peers.append(request.transport.get_extra_info("peername"))
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.in_flight -= 1
+        if (failure := self.failure()) is not None:
+            return failure
+        number = int(request.match_info["number"])
+        if number == 404:
+            return web.json_response({"message": "Not Found"}, status=404)
+        etag = f'"pull-{number}"'
+        if request.headers.get("If-None-Match") == etag:
+            return web.Response(status=304, headers={"ETag": etag})
+        return web.Response(
+            text=pull_json(number),
+            content_type="application/json",
+            headers={"ETag": etag, "X-RateLimit-Remaining": "4999"},
+        )
+
+    async def requested_reviewers(self, request: web.Request) -> web.Response:
+        self.requests.append(request)
+        if request.method == "GET":
+            return web.json_response(
+                {
+                    "users": [{"login": login} for login in self.reviewers],
+                    "teams": [{"slug": "backend"}],
+                }
+            )
+        body = await request.json()
+        self.bodies.append(body)
+        if request.method == "POST":
+            self.reviewers += body["reviewers"]
+        else:
+            self.reviewers = [
+                login for login in self.reviewers if login not in body["reviewers"]
+            ]
+        return web.Response(text=PULL_JSON, content_type="application/json")
+
+
+# The fake server on the loop of dummy_github's async client, which is
+# what the bot fetches several PRs at once with
+@pytest.fixture
+def fake_github_server(dummy_github):
+    fake = FakeGitHubServer()
+    client = dummy_github.async_client
+    server = TestServer(fake.app())
+    client.run(server.start_server())
+    client.base_url = str(server.make_url("")).rstrip("/")
+    yield fake
+    client.run(client.close())
+    client.run(server.close())
+    assert client.loop is not None
+    client.loop.call_soon_threadsafe(client.loop.stop)
@@ -1,6 +1,6 @@
 import pytest
 
-from slacker.github import GitHub, InvalidURLError
+from slacker.github import GitHub, InvalidURLError, PullRequestRef, parse_pr_url
 
 
 def test_creation(dummy_github: GitHub):
@@ -24,3 +24,62 @@ def test_pr_with_valid_url(dummy_github: GitHub, mocked_pr_url: str):
     pr = dummy_github.pr(mocked_pr_url)
 
     assert pr.user.login == "nrw505"
+
+
+def test_parse_pr_url_canonicalises_variants():
+    expected = PullRequestRef(owner="user", repo="repo", number=1234)
+
+    assert parse_pr_url("https://github.com/user/repo/pull/1234") == expected
+    assert parse_pr_url("https://github.com/User/Repo/pull/1234") == expected
+    assert parse_pr_url("https://github.com/user/repo/pull/1234/") == expected
+    assert parse_pr_url("https://github.com/user/repo/pull/1234/files") == expected
+    assert parse_pr_url("https://github.com/user/repo/pull/1234?w=1") == expected
+    assert expected.url == "https://github.com/user/repo/pull/1234"
+
+
+def test_parse_pr_url_with_invalid_url():
+    with pytest.raises(InvalidURLError):
+        parse_pr_url("https://github.com/user/repo/issue/1234")
+
+
+def test_pull_request_is_a_single_request(
+    dummy_github: GitHub, mocked_pr_url: str, requests_mock
+):
+    pr = dummy_github.pull_request(mocked_pr_url)
+
+    assert requests_mock.call_count == 1
+    assert requests_mock.last_request.path == "/repos/nrw505/slacker2/pulls/1"
+    assert pr.html_url == "https://github.com/nrw505/slacker2/pull/1"
+    assert pr.author_login == "nrw505"
+    assert pr.state == "open"
+    assert pr.merged is False
+
+
+def test_pull_request_builds_full_object_lazily(
+    dummy_github: GitHub, mocked_pr_url: str, requests_mock
+):
+    record = dummy_github.pull_request(mocked_pr_url)
+    full = record.full()
+
+    assert full.number == record.number
+    assert full.head.sha == record.head_sha
+    assert record.full() is full
+    assert requests_mock.call_count == 1
+
+
+def test_pull_requests_are_fetched_by_the_async_client(
+    dummy_github: GitHub, fake_github_server
+):
+    client = dummy_github.async_client
+    assert dummy_github.async_client is client
+    assert client.cache is dummy_github.cache
+    assert client.budget is dummy_github.budget
+
+    urls = [f"https://github.com/nrw505/slacker2/pull/{n}" for n in (1, 2)]
+    records = dummy_github.pull_requests(urls)
+
+    assert [record.number for record in records.values()] == [1, 2]
+    assert len(fake_github_server.requests) == 2
+    assert fake_github_server.requests[0].headers["Authorization"] == (
+        "Bearer dummy-token"
+    )
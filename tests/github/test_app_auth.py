@@ -0,0 +1,150 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from threading import Event, Thread
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from slacker.github import GitHub, NoInstallationError
+from slacker.github.app_auth import GitHubAppAuth
+from tests.fixtures.github import PULL_JSON
+
+INSTALLATIONS_URL = "https://api.github.com/app/installations?per_page=100&page=1"
+TOKEN_URL = "https://api.github.com/app/installations/42/access_tokens"
+PULL_API_URL = "https://api.github.com:443/repos/nrw505/slacker2/pulls/1"
+PR_URL = "https://github.com/nrw505/slacker2/pull/1"
+NOW = datetime(2024, 5, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture(scope="module")
+def private_key():
+    return rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+
+@pytest.fixture
+def clock():
+    class Clock:
+        now = NOW
+
+        def __call__(self):
+            return self.now
+
+    return Clock()
+
+
+@pytest.fixture
+def app_auth(private_key, clock):
+    pem = private_key.private_bytes(
+        serialization.Encoding.PEM,
+        serialization.PrivateFormat.PKCS8,
+        serialization.NoEncryption(),
+    ).decode()
+    return GitHubAppAuth("1234", pem, clock=clock)
+
+
+@pytest.fixture
+def installations(requests_mock):
+    return requests_mock.get(
+        INSTALLATIONS_URL, json=[{"id": 42, "account": {"login": "nrw505"}}]
+    )
+
+
+@pytest.fixture
+def access_tokens(requests_mock):
+    tokens = iter(range(1, 100))
+
+    def issue(request, context):
+        return {
+            "token": f"ghs_{next(tokens)}",
+            "expires_at": (NOW + timedelta(hours=1)).isoformat().replace("+00:00", "Z"),
+        }
+
+    return requests_mock.post(TOKEN_URL, json=issue)
+
+
+def test_jwt_is_signed_with_the_app_key(app_auth, private_key):
+    token = app_auth.jwt()
+
+    claims = jwt.decode(
+        token,
+        private_key.public_key(),
+        algorithms=["RS256"],
+        options={"verify_exp": False, "verify_iat": False},
+    )
+    assert claims["iss"] == "1234"
+    assert claims["exp"] - claims["iat"] <= 600
+    assert app_auth.jwt() == token
+
+
+def test_installation_token_is_cached(app_auth, installations, access_tokens):
+    assert app_auth.token("nrw505") == "ghs_1"
+    assert app_auth.token("NRW505") == "ghs_1"
+
+    assert installations.call_count == 1
+    assert access_tokens.call_count == 1
+    assert access_tokens.last_request.headers["Authorization"].startswith("Bearer ")
+
+
+def test_token_is_refreshed_before_it_expires(
+    app_auth, clock, installations, access_tokens
+):
+    app_auth.token("nrw505")
+    clock.now = NOW + timedelta(minutes=56)
+
+    assert app_auth.token("nrw505") == "ghs_2"
+
+
+def test_refresh_doesnt_block_other_requests(
+    app_auth, clock, installations, requests_mock
+):
+    release = Event()
+    started = Event()
+    responses = iter(["ghs_1", "ghs_2"])
+
+    def issue(request, context):
+        token = next(responses)
+        if token == "ghs_2":
+            started.set()
+            release.wait(timeout=5)
+        return {"token": token, "expires_at": "2024-05-01T13:00:00Z"}
+
+    requests_mock.post(TOKEN_URL, json=issue)
+    app_auth.token("nrw505")
+    clock.now = NOW + timedelta(minutes=56)
+
+    refreshed = []
+    refresher = Thread(target=lambda: refreshed.append(app_auth.token("nrw505")))
+    refresher.start()
+    assert started.wait(timeout=5)
+
+    # The old token is still good for a few minutes
+    assert app_auth.token("nrw505") == "ghs_1"
+
+    release.set()
+    refresher.join(timeout=5)
+    assert refreshed == ["ghs_2"]
+
+
+def test_unknown_owner(app_auth, installations):
+    with pytest.raises(NoInstallationError):
+        app_auth.token("someone-else")
+
+    assert installations.call_count == 1
+
+
+def test_github_uses_installation_tokens(
+    app_auth, installations, access_tokens, requests_mock
+):
+    pull = requests_mock.get(
+        PULL_API_URL, text=PULL_JSON, headers={"X-RateLimit-Remaining": "14999"}
+    )
+    github = GitHub(None, app_auth=app_auth)
+
+    record = github.pull_request(PR_URL)
+
+    assert record.number == 1
+    assert pull.last_request.headers["Authorization"] == "token ghs_1"
+    # Each installation has its own rate limit
+    assert github.budget_for("nrw505").remaining == 14999
+    assert github.budget.remaining is None
@@ -0,0 +1,167 @@
+import pytest
+import pytest_asyncio
+from aiohttp.test_utils import TestServer
+
+from slacker.github.async_client import AsyncGitHub, GitHubRequestError
+from slacker.github.rate_limit import RateLimitBudget
+from slacker.github.transport import TransportConfig
+from tests.fixtures.github import FakeGitHubServer
+
+PR_URL = "https://github.com/nrw505/slacker2/pull/1"
+
+
+@pytest.fixture
+def fake_server() -> FakeGitHubServer:
+    return FakeGitHubServer()
+
+
+@pytest_asyncio.fixture
+async def async_github(fake_server):
+    server = TestServer(fake_server.app())
+    await server.start_server()
+    github = AsyncGitHub(
+        "dummy-token",
+        base_url=str(server.make_url("")),
+        transport=TransportConfig(pool_size=4, backoff_factor=0, backoff_jitter=0),
+    )
+    yield github
+    await github.close()
+    await server.close()
+
+
+@pytest.mark.asyncio
+async def test_pull_request(async_github, fake_server):
+    record = await async_github.pull_request(PR_URL)
+
+    assert record.number == 1
+    assert record.html_url == PR_URL
+    assert record.author_login == "nrw505"
+    assert record.client is None
+    assert fake_server.requests[0].headers["Authorization"] == "Bearer dummy-token"
+    assert async_github.budget.remaining == 4999
+
+
+@pytest.mark.asyncio
+async def test_stale_pull_request_is_revalidated(async_github, fake_server):
+    await async_github.pull_request(PR_URL)
+    async_github.cache.ttl = async_github.cache.ttl * 0
+
+    record = await async_github.pull_request(PR_URL)
+
+    assert record.number == 1
+    assert fake_server.requests[1].headers["If-None-Match"] == '"pull-1"'
+    assert async_github.cache.stats.not_modified == 1
+
+
+@pytest.mark.asyncio
+async def test_missing_pull_request(async_github):
+    with pytest.raises(GitHubRequestError) as error:
+        await async_github.pull_request("https://github.com/nrw505/slacker2/pull/404")
+
+    assert error.value.status == 404
+
+
+@pytest.mark.asyncio
+async def test_pull_requests_are_fetched_concurrently(async_github, fake_server):
+    fake_server.delay = 0.05
+    urls = [f"https://github.com/nrw505/slacker2/pull/{n}" for n in range(1, 11)]
+
+    records = await async_github.pull_requests(urls + urls[:2])
+
+    assert list(records) == urls
+    assert [record.number for record in records.values()] == list(range(1, 11))
+    assert len(fake_server.requests) == 10
+    # Limited to the pool size
+    assert 1 < fake_server.max_in_flight <= 4
+
+
+@pytest.mark.asyncio
+async def test_server_errors_are_retried(async_github, fake_server):
+    fake_server.failures = [502, 503]
+
+    record = await async_github.pull_request(PR_URL)
+
+    assert record.number == 1
+    assert len(fake_server.requests) == 3
+
+
+@pytest.mark.asyncio
+async def test_retries_give_up(async_github, fake_server):
+    fake_server.failures = [502] * 10
+
+    with pytest.raises(GitHubRequestError) as error:
+        await async_github.pull_request(PR_URL)
+
+    assert error.value.status == 502
+    assert len(fake_server.requests) == async_github.transport.retries + 1
+
+
+@pytest.mark.asyncio
+async def test_repo(async_github):
+    repo = await async_github.repo("nrw505", "slacker2")
+
+    assert repo.full_name == "nrw505/slacker2"
+    assert repo.owner_login == "nrw505"
+    assert repo.default_branch == "main"
+
+
+@pytest.mark.asyncio
+async def test_review_requests(async_github, fake_server):
+    await async_github.request_reviewers(PR_URL, ["bob"])
+    requested = await async_github.requested_reviewers(PR_URL)
+
+    assert requested.user_logins == ["alice", "bob"]
+    assert requested.team_slugs == ["backend"]
+    assert fake_server.bodies == [{"reviewers": ["bob"], "team_reviewers": []}]
+
+    await async_github.remove_requested_reviewers(PR_URL, ["alice"])
+    requested = await async_github.requested_reviewers(PR_URL)
+
+    assert requested.user_logins == ["bob"]
+
+
+@pytest.mark.asyncio
+async def test_connections_are_reused(async_github, fake_server):
+    for number in range(1, 6):
+        await async_github.pull_request(
+            f"https://github.com/nrw505/slacker2/pull/{number}"
+        )
+
+    assert len(fake_server.peers) == 5
+    assert len(set(fake_server.peers)) == 1
+
+
+class FakeAppAuth:
+    def authorization(self, owner):
+        return f"token ghs_{owner}"
+
+
+@pytest.mark.asyncio
+async def test_app_auth_uses_the_installation_token_and_budget(fake_server):
+    server = TestServer(fake_server.app())
+    await server.start_server()
+    budgets = {"nrw505": RateLimitBudget()}
+    github = AsyncGitHub(
+        None,
+        base_url=str(server.make_url("")),
+        app_auth=FakeAppAuth(),
+        budget_for=budgets.__getitem__,
+    )
+    try:
+        await github.pull_request(PR_URL)
+    finally:
+        await github.close()
+        await server.close()
+
+    assert fake_server.requests[0].headers["Authorization"] == "token ghs_nrw505"
+    assert budgets["nrw505"].remaining == 4999
+    assert github.budget.remaining is None
+
+
+def test_rate_limited_errors():
+    exceeded = {"message": "API rate limit exceeded for user ID 1."}
+
+    assert GitHubRequestError(403, exceeded).rate_limited
+    assert GitHubRequestError(429, {}).rate_limited
+    assert not GitHubRequestError(403, {"message": "Forbidden"}).rate_limited
+    assert not GitHubRequestError(404, exceeded).rate_limited
@@ -0,0 +1,98 @@
+import pytest
+from datetime import datetime, timedelta
+
+from github import UnknownObjectException
+
+from slacker.github import GitHub
+from slacker.github.cache import CachedResponse, ResponseCache
+from tests.fixtures.github import PULL_JSON
+
+PULL_API_URL = "https://api.github.com:443/repos/nrw505/slacker2/pulls/1"
+PR_URL = "https://github.com/nrw505/slacker2/pull/1"
+
+
+@pytest.fixture
+def etagged_pr(requests_mock):
+    return requests_mock.get(
+        PULL_API_URL,
+        [
+            {"text": PULL_JSON, "headers": {"ETag": '"v1"'}},
+            {"status_code": 304, "text": "", "headers": {"ETag": '"v1"'}},
+        ],
+    )
+
+
+def expire_everything(github: GitHub):
+    for entry in github.cache.entries.values():
+        entry.fetched_at = datetime.now() - timedelta(days=1)
+
+
+def test_fresh_response_is_served_from_cache(dummy_github, etagged_pr):
+    first = dummy_github.pr(PR_URL)
+    second = dummy_github.pr(PR_URL)
+
+    assert first.user.login == second.user.login == "nrw505"
+    assert etagged_pr.call_count == 1
+    assert dummy_github.cache.stats.misses == 1
+    assert dummy_github.cache.stats.hits == 1
+
+
+def test_stale_response_is_revalidated(dummy_github, etagged_pr):
+    dummy_github.pr(PR_URL)
+    expire_everything(dummy_github)
+
+    pr = dummy_github.pr(PR_URL)
+
+    assert pr.number == 1
+    assert etagged_pr.call_count == 2
+    assert etagged_pr.last_request.headers["If-None-Match"] == '"v1"'
+    assert dummy_github.cache.stats.not_modified == 1
+    # Revalidating makes the entry fresh again
+    dummy_github.pr(PR_URL)
+    assert etagged_pr.call_count == 2
+
+
+def test_changed_response_replaces_cached_one(dummy_github, requests_mock):
+    requests_mock.get(
+        PULL_API_URL,
+        [
+            {"text": PULL_JSON, "headers": {"ETag": '"v1"'}},
+            {
+                "text": PULL_JSON.replace('"state": "open"', '"state": "closed"'),
+                "headers": {"ETag": '"v2"'},
+            },
+        ],
+    )
+    assert dummy_github.pr(PR_URL).state == "open"
+    expire_everything(dummy_github)
+
+    assert dummy_github.pr(PR_URL).state == "closed"
+    assert dummy_github.cache.stats.misses == 2
+    assert dummy_github.cache.get("/repos/nrw505/slacker2/pulls/1").etag == '"v2"'
+
+
+def test_errors_are_not_cached(dummy_github, requests_mock):
+    missing = requests_mock.get(
+        PULL_API_URL, status_code=404, text='{"message": "Not Found"}'
+    )
+
+    for _ in range(2):
+        with pytest.raises(UnknownObjectException):
+            dummy_github.pr(PR_URL)
+
+    assert missing.call_count == 2
+    assert dummy_github.cache.entries == {}
+
+
+def test_cache_evicts_least_recently_used():
+    cache = ResponseCache(max_entries=2)
+
+    def response():
+        return CachedResponse(etag=None, headers={}, data={}, fetched_at=datetime.now())
+
+    cache.put("/a", response())
+    cache.put("/b", response())
+    cache.get("/a")
+    cache.put("/c", response())
+
+    assert list(cache.entries) == ["/a", "/c"]
@@ -0,0 +1,103 @@
+import pytest
+from github import GithubException
+
+from slacker.github import GitHub
+
+from tests.fixtures.github import GRAPHQL_URL
+
+
+def test_many_prs_take_a_handful_of_queries(dummy_github: GitHub, fake_graphql):
+    urls = []
+    for number in range(1, 251):
+        repo = f"repo{number % 3}"
+        fake_graphql.add("acme", repo, number)
+        urls.append(f"https://github.com/acme/{repo}/pull/{number}")
+
+    records = dummy_github.pull_request_states(urls)
+
+    assert len(fake_graphql.queries) == 3
+    assert sorted(records) == sorted(urls)
+    assert records[urls[0]].number == 1
+    assert records[urls[0]].author_login == "acme-author"
+
+
+def test_values_are_passed_as_variables(dummy_github: GitHub, fake_graphql):
+    fake_graphql.add("acme", "widgets", 7)
+
+    dummy_github.pull_request_states(["https://github.com/acme/widgets/pull/7"])
+
+    query = fake_graphql.queries[0]
+    assert "acme" not in query["query"]
+    assert query["variables"] == {"owner0": "acme", "name0": "widgets", "number0": 7}
+
+
+def test_states_are_mapped_like_rest(dummy_github: GitHub, fake_graphql):
+    fake_graphql.add("acme", "widgets", 1, state="OPEN")
+    fake_graphql.add("acme", "widgets", 2, state="MERGED", merged=True)
+    fake_graphql.add("acme", "widgets", 3, state="CLOSED")
+
+    records = dummy_github.pull_request_states(
+        [f"https://github.com/acme/widgets/pull/{n}" for n in (1, 2, 3)]
+    )
+
+    assert [(r.state, r.merged) for r in records.values()] == [
+        ("open", False),
+        ("closed", True),
+        ("closed", False),
+    ]
+
+
+def test_duplicate_and_variant_urls_are_fetched_once(
+    dummy_github: GitHub, fake_graphql
+):
+    fake_graphql.add("acme", "widgets", 1)
+    urls = [
+        "https://github.com/acme/widgets/pull/1",
+        "https://github.com/Acme/Widgets/pull/1/files",
+    ]
+
+    records = dummy_github.pull_request_states(urls)
+
+    assert fake_graphql.queries[0]["variables"] == {
+        "owner0": "acme",
+        "name0": "widgets",
+        "number0": 1,
+    }
+    assert records[urls[0]] == records[urls[1]]
+
+
+def test_missing_prs_are_left_out(dummy_github: GitHub, fake_graphql):
+    fake_graphql.add("acme", "widgets", 1)
+
+    records = dummy_github.pull_request_states(
+        [
+            "https://github.com/acme/widgets/pull/1",
+            "https://github.com/acme/widgets/pull/2",
+        ]
+    )
+
+    assert list(records) == ["https://github.com/acme/widgets/pull/1"]
+
+
+def test_other_errors_are_raised(dummy_github: GitHub, requests_mock):
+    requests_mock.post(
+        GRAPHQL_URL,
+        json={"errors": [{"type": "MAX_NODE_LIMIT_EXCEEDED", "message": "Too big"}]},
+    )
+
+    with pytest.raises(GithubException):
+        dummy_github.pull_request_states(["https://github.com/acme/widgets/pull/1"])
+
+
+def test_graphql_rate_limit_is_tracked_separately(dummy_github: GitHub, fake_graphql):
+    fake_graphql.add("acme", "widgets", 1)
+
+    dummy_github.pull_request_states(["https://github.com/acme/widgets/pull/1"])
+
+    assert dummy_github.graphql_budget.remaining == 4990
+    assert dummy_github.budget.remaining is None
+
+
+def test_no_urls_means_no_queries(dummy_github: GitHub, fake_graphql):
+    assert dummy_github.pull_request_states([]) == {}
+    assert fake_graphql.queries == []
@@ -0,0 +1,106 @@
+import pytest
+from datetime import datetime, timedelta
+
+from slacker.github import GitHub
+from slacker.github.rate_limit import BudgetExhausted, Priority, RateLimitBudget
+from slacker.metrics import Metrics
+from tests.fixtures.github import PULL_JSON
+
+
+def rate_limit_headers(remaining, limit=100, reset_in=timedelta(minutes=30)):
+    reset_at = datetime.now() + reset_in
+    return {
+        "X-RateLimit-Limit": str(limit),
+        "X-RateLimit-Remaining": str(remaining),
+        "X-RateLimit-Reset": str(int(reset_at.timestamp())),
+    }
+
+
+@pytest.fixture
+def sleeps():
+    return []
+
+
+@pytest.fixture
+def budget(sleeps):
+    return RateLimitBudget(reserve=0.2, sleep=sleeps.append, metrics=Metrics())
+
+
+def test_unknown_budget_lets_everything_through(budget, sleeps):
+    budget.acquire(Priority.BACKGROUND)
+    budget.acquire(Priority.INTERACTIVE)
+
+    assert sleeps == []
+
+
+def test_update_reads_headers(budget):
+    budget.update(rate_limit_headers(remaining=42))
+
+    assert budget.limit == 100
+    assert budget.remaining == 42
+    assert budget.reset_at > datetime.now()
+    assert budget.metrics.snapshot()["github_rate_limit_remaining"] == 42
+
+
+def test_background_work_runs_freely_with_plenty_left(budget, sleeps):
+    budget.update(rate_limit_headers(remaining=90))
+
+    budget.acquire(Priority.BACKGROUND)
+
+    assert sleeps == []
+    assert budget.remaining == 89
+
+
+def test_background_work_is_paced_when_budget_is_low(budget, sleeps):
+    budget.update(rate_limit_headers(remaining=30))
+
+    budget.acquire(Priority.BACKGROUND)
+
+    # 10 spare requests over the rest of the window, capped at 30s
+    assert sleeps == [pytest.approx(30, abs=1)]
+    assert budget.metrics.snapshot()["github_background_requests_delayed"] == 1
+
+
+def test_background_work_cannot_touch_the_reserve(budget, sleeps):
+    budget.update(rate_limit_headers(remaining=20))
+
+    with pytest.raises(BudgetExhausted) as raised:
+        budget.acquire(Priority.BACKGROUND)
+
+    assert raised.value.retry_at == budget.reset_at
+    assert budget.metrics.snapshot()["github_background_requests_deferred"] == 1
+
+
+def test_interactive_work_can_use_the_reserve(budget, sleeps):
+    budget.update(rate_limit_headers(remaining=5))
+
+    budget.acquire(Priority.INTERACTIVE)
+
+    assert sleeps == []
+    assert budget.remaining == 4
+
+
+def test_budget_forgets_counts_after_reset(budget):
+    budget.update(rate_limit_headers(remaining=1, reset_in=timedelta(seconds=-1)))
+
+    budget.acquire(Priority.BACKGROUND)
+
+    assert budget.remaining is None
+
+
+def test_github_tracks_rate_limit_from_responses(requests_mock, budget):
+    github = GitHub("dummy-token", budget=budget)
+    requests_mock.get(
+        "https://api.github.com:443/repos/nrw505/slacker2/pulls/1",
+        text=PULL_JSON,
+        headers=rate_limit_headers(remaining=10),
+    )
+
+    github.pull_request("https://github.com/nrw505/slacker2/pull/1")
+
+    assert budget.remaining == 10
+    with pytest.raises(BudgetExhausted):
+        github.pull_request(
+            "https://github.com/nrw505/slacker2/pull/2", Priority.BACKGROUND
+        )
+    assert requests_mock.call_count == 1
@@ -0,0 +1,71 @@
+from slacker.github import GitHub, TransportConfig
+from slacker.metrics import Metrics
+from tests.fixtures.github import PULL_JSON
+
+PULL_API_URL = "https://api.github.com:443/repos/nrw505/slacker2/pulls/1"
+PR_URL = "https://github.com/nrw505/slacker2/pull/1"
+
+
+def test_from_env():
+    config = TransportConfig.from_env(
+        {
+            "GITHUB_POOL_SIZE": "4",
+            "GITHUB_TIMEOUT": "20",
+            "GITHUB_RETRIES": "0",
+        }
+    )
+
+    assert config.pool_size == 4
+    assert config.timeout == 20
+    assert config.retries == 0
+
+
+def test_from_env_defaults():
+    assert TransportConfig.from_env({}) == TransportConfig()
+
+
+def test_retry_policy():
+    retry = TransportConfig(retries=2, backoff_factor=1, backoff_jitter=0.5).retry()
+
+    assert retry.total == 2
+    for status in [429, 500, 502, 503, 504]:
+        assert retry.is_retry("GET", status)
+    assert not retry.is_retry("GET", 404)
+    # The GraphQL queries are POSTs
+    assert retry.is_retry("POST", 502)
+
+
+def test_backoff_is_jittered():
+    retry = TransportConfig(backoff_factor=1, backoff_jitter=0.5).retry()
+    retry = retry.increment("GET", "/", error=ConnectionError()).increment(
+        "GET", "/", error=ConnectionError()
+    )
+
+    backoffs = {retry.get_backoff_time() for _ in range(20)}
+
+    assert all(2 <= backoff <= 2.5 for backoff in backoffs)
+    assert len(backoffs) > 1
+
+
+def test_client_uses_transport_config():
+    config = TransportConfig(pool_size=7, timeout=9)
+
+    github = GitHub("dummy-token", transport=config)
+
+    kwargs = github.client.requester.kwargs
+    assert kwargs["pool_size"] == 7
+    assert kwargs["timeout"] == 9
+    assert kwargs["retry"].total == config.retries
+
+
+def test_request_latency_is_recorded(requests_mock):
+    requests_mock.get(PULL_API_URL, text=PULL_JSON)
+    metrics = Metrics()
+    github = GitHub("dummy-token", metrics=metrics)
+
+    github.pull_request(PR_URL)
+
+    snapshot = metrics.snapshot()
+    assert snapshot["github_request_seconds_count"] == 1
+    assert snapshot["github_rest_request_seconds_count"] == 1
+    assert snapshot["github_request_seconds_sum"] >= 0
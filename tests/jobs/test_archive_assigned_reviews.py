@@ -0,0 +1,109 @@
+import pytest
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select, text
+
+from slacker.model import User, Channel, AssignedReview, AssignedReviewHistory
+from slacker.jobs.archive_assigned_reviews import ArchiveAssignedReviews
+
+NOW = datetime(2023, 6, 1, 12, 0)
+
+
+@pytest.fixture
+def assignments(db_session):
+    jane = User(slack_id="jane", name="Jane", email="jane@example.com")
+    bob = User(slack_id="bob", name="Bob", email="bob@example.com")
+    channel = Channel(slack_id="channel", name="Test", new_devs_are_reviewers=True)
+
+    def assignment(n: int, completed_at) -> AssignedReview:
+        return AssignedReview(
+            assignee=jane,
+            requestor=bob,
+            channel=channel,
+            pr_url=f"https://github.com/mock/mock/pull/{n}",
+            assigned_at=NOW - timedelta(days=90),
+            completed_at=completed_at,
+        )
+
+    rows = {
+        "old1": assignment(1, NOW - timedelta(days=60)),
+        "old2": assignment(2, NOW - timedelta(days=45)),
+        "old3": assignment(3, NOW - timedelta(days=31)),
+        "recent": assignment(4, NOW - timedelta(days=1)),
+        "active": assignment(5, None),
+    }
+    db_session.add_all(rows.values())
+    db_session.flush()
+    # Archived rows get deleted out from under the ORM, so just hand
+    # out the ids
+    return {name: row.id for name, row in rows.items()}
+
+
+def count(session, model) -> int:
+    return session.scalar(select(func.count()).select_from(model))
+
+
+def test_archives_old_completed_reviews_in_batches(db_session, assignments):
+    job = ArchiveAssignedReviews(age=timedelta(days=30), batch_size=2)
+
+    archived = job.perform(db_session, now=NOW)
+
+    assert archived == 3
+    hot_ids = set(db_session.scalars(select(AssignedReview.id)))
+    assert hot_ids == {assignments["recent"], assignments["active"]}
+
+    history = db_session.scalars(
+        select(AssignedReviewHistory).order_by(AssignedReviewHistory.id)
+    ).all()
+    assert [row.id for row in history] == [
+        assignments["old1"],
+        assignments["old2"],
+        assignments["old3"],
+    ]
+    assert history[0].pr_url == "https://github.com/mock/mock/pull/1"
+    assert history[0].assignee.slack_id == "jane"
+
+
+def test_nothing_to_archive(db_session, assignments):
+    job = ArchiveAssignedReviews(age=timedelta(days=365))
+
+    assert job.perform(db_session, now=NOW) == 0
+    assert count(db_session, AssignedReviewHistory) == 0
+
+
+def test_reporting_view_covers_hot_and_archived(db_session, assignments):
+    ArchiveAssignedReviews(age=timedelta(days=30)).perform(db_session, now=NOW)
+
+    rows = db_session.execute(
+        text("SELECT archived, count(*) FROM assigned_reviews_all GROUP BY archived")
+    ).all()
+
+    assert dict(rows) == {False: 2, True: 3}
+
+
+def test_archives_old_rerolled_reviews(db_session, assignments):
+    jane = db_session.scalars(select(User).where(User.slack_id == "jane")).one()
+    bob = db_session.scalars(select(User).where(User.slack_id == "bob")).one()
+
+    # Never completed, since someone else was assigned instead
+    def rerolled(n: int, rerolled_at) -> AssignedReview:
+        return AssignedReview(
+            assignee=jane,
+            requestor=bob,
+            pr_url=f"https://github.com/mock/mock/pull/{n}",
+            assigned_at=NOW - timedelta(days=90),
+            rerolled_at=rerolled_at,
+        )
+
+    old = rerolled(6, NOW - timedelta(days=60))
+    recent = rerolled(7, NOW - timedelta(days=1))
+    db_session.add_all([old, recent])
+    db_session.flush()
+    old_id, recent_id = old.id, recent.id
+
+    ArchiveAssignedReviews(age=timedelta(days=30)).perform(db_session, now=NOW)
+
+    hot_ids = set(db_session.scalars(select(AssignedReview.id)))
+    assert hot_ids == {assignments["recent"], assignments["active"], recent_id}
+    assert db_session.get(AssignedReviewHistory, old_id) is not None
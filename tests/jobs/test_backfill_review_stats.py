@@ -0,0 +1,226 @@
+import pytest
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, select
+
+from slacker.model import (
+    AssignedReview,
+    AssignedReviewHistory,
+    Channel,
+    PullRequest,
+    ReviewStatsDaily,
+    ReviewStatsHistogram,
+    User,
+)
+from slacker.jobs.backfill_review_stats import BackfillReviewStats
+from slacker.stats import (
+    StatsChange,
+    assignment_acknowledged,
+    fetch_review_stats,
+    record_changes,
+)
+
+START = datetime(2024, 5, 1, 9, 0)
+DAY = START.date()
+
+
+@pytest.fixture
+def people(db_session):
+    jane = User(slack_id="jane", name="Jane", email="jane@example.com")
+    bob = User(slack_id="bob", name="Bob", email="bob@example.com")
+    channel = Channel(slack_id="channel", name="Test", new_devs_are_reviewers=True)
+    db_session.add_all([jane, bob, channel])
+    db_session.flush()
+    return {"jane": jane, "bob": bob, "channel": channel}
+
+
+@pytest.fixture
+def history(db_session, people):
+    def assignment(n: int, **times) -> AssignedReview:
+        return AssignedReview(
+            assignee=people["jane"],
+            requestor=people["bob"],
+            channel=people["channel"],
+            pr_url=f"https://github.com/mock/mock/pull/{n}",
+            **times,
+        )
+
+    db_session.add_all(
+        [
+            assignment(
+                1,
+                assigned_at=START,
+                acknowledged_at=START + timedelta(minutes=10),
+                completed_at=START + timedelta(hours=3),
+            ),
+            assignment(
+                2,
+                assigned_at=START + timedelta(hours=1),
+                acknowledged_at=START + timedelta(hours=1, minutes=2),
+            ),
+            assignment(
+                3,
+                assigned_at=START + timedelta(hours=2),
+                rerolled_at=START + timedelta(hours=4),
+                # Completing a rerolled assignment doesn't count
+                completed_at=START + timedelta(hours=5),
+            ),
+            # Another day
+            assignment(4, assigned_at=START + timedelta(days=1)),
+            # No channel, so not counted
+            AssignedReview(
+                assignee=people["jane"],
+                requestor=people["bob"],
+                pr_url="https://github.com/mock/mock/pull/5",
+                assigned_at=START,
+            ),
+        ]
+    )
+    # Archived assignments count too
+    db_session.add(
+        AssignedReviewHistory(
+            id=1000,
+            assignee_id=people["jane"].id,
+            requestor_id=people["bob"].id,
+            channel_id=people["channel"].id,
+            pr_url="https://github.com/mock/mock/pull/6",
+            assigned_at=START,
+            completed_at=START + timedelta(days=3),
+        )
+    )
+    db_session.flush()
+
+
+def test_backfill(db_session, people, history):
+    rows = BackfillReviewStats().perform(db_session)
+
+    assert rows == 2
+    stats = fetch_review_stats(db_session, DAY, DAY + timedelta(days=1))[None]
+    assert stats.assigned == 4
+    assert stats.acknowledged == 2
+    assert stats.rerolled == 1
+    assert stats.completed == 2
+    assert stats.acknowledge.total_seconds == 12 * 60
+    # 2 minutes and 10 minutes
+    assert stats.acknowledge.histogram[:2] == [1, 1]
+    assert stats.complete.total_seconds == 3 * 3600 + 3 * 86400
+    # 3 hours and 3 days
+    assert stats.complete.histogram[5] == 1
+    assert stats.complete.histogram[9] == 1
+
+    next_day = fetch_review_stats(
+        db_session, DAY + timedelta(days=1), DAY + timedelta(days=2)
+    )[None]
+    assert next_day.assigned == 1
+
+
+def test_backfill_replaces_only_its_days(db_session, people, history):
+    jane = people["jane"].id
+    channel = people["channel"].id
+    record_changes(
+        db_session,
+        [
+            StatsChange(DAY, channel, jane, assigned=100),
+            StatsChange(DAY + timedelta(days=1), channel, jane, assigned=100),
+        ],
+    )
+
+    BackfillReviewStats(since=DAY, until=DAY + timedelta(days=1)).perform(db_session)
+
+    by_day = dict(
+        db_session.execute(
+            select(ReviewStatsDaily.day, ReviewStatsDaily.assigned)
+        ).all()
+    )
+    assert by_day == {DAY: 4, DAY + timedelta(days=1): 100}
+
+
+def test_backfill_matches_incremental_stats(broker, db_session, people):
+    pull_request = PullRequest(
+        owner="mock",
+        repo="mock",
+        number=1,
+        html_url="https://github.com/mock/mock/pull/1",
+        author_login="bob",
+        state="open",
+        fetched_at=datetime.now(),
+    )
+    jane = people["jane"]
+    first, second, third = broker.create_assignments(
+        db_session,
+        [jane, jane, people["bob"]],
+        people["bob"],
+        people["channel"],
+        pull_request,
+    )
+    broker.acknowledge_assignment(db_session, first)
+    broker.complete_assignment(db_session, first)
+    broker.reroll_assignment(db_session, second)
+    broker.complete_assignments(db_session, [second.id, third.id])
+    db_session.flush()
+
+    def snapshot():
+        daily = db_session.execute(
+            select(
+                ReviewStatsDaily.day,
+                ReviewStatsDaily.channel_id,
+                ReviewStatsDaily.user_id,
+                ReviewStatsDaily.assigned,
+                ReviewStatsDaily.acknowledged,
+                ReviewStatsDaily.rerolled,
+                ReviewStatsDaily.completed,
+            )
+        ).all()
+        histograms = db_session.execute(
+            select(
+                ReviewStatsHistogram.day,
+                ReviewStatsHistogram.user_id,
+                ReviewStatsHistogram.metric,
+                ReviewStatsHistogram.bucket,
+                ReviewStatsHistogram.count,
+            )
+        ).all()
+        return sorted(daily), sorted(histograms)
+
+    incremental = snapshot()
+    BackfillReviewStats().perform(db_session)
+
+    assert snapshot() == incremental
+
+
+def test_backfill_buckets_like_incremental_stats(db_session, people):
+    assignments = [
+        AssignedReview(
+            assignee=people["jane"],
+            requestor=people["bob"],
+            channel=people["channel"],
+            pr_url=f"https://github.com/mock/mock/pull/{n}",
+            assigned_at=START,
+            acknowledged_at=START + delay,
+        )
+        for n, delay in enumerate(
+            [
+                timedelta(seconds=300),
+                timedelta(seconds=299, microseconds=999999),
+                timedelta(hours=1),
+                # Acknowledged before the assignment was recorded
+                timedelta(seconds=-5),
+            ]
+        )
+    ]
+    db_session.add_all(assignments)
+    db_session.flush()
+
+    BackfillReviewStats().perform(db_session)
+
+    backfilled = fetch_review_stats(db_session, DAY, DAY + timedelta(days=1))[None]
+    db_session.execute(delete(ReviewStatsDaily))
+    db_session.execute(delete(ReviewStatsHistogram))
+    record_changes(
+        db_session,
+        [assignment_acknowledged(assignment) for assignment in assignments],
+    )
+    incremental = fetch_review_stats(db_session, DAY, DAY + timedelta(days=1))[None]
+    assert backfilled.acknowledge == incremental.acknowledge
+    assert backfilled.acknowledge.histogram[:5] == [2, 1, 0, 0, 1]
@@ -0,0 +1,55 @@
+import pytest
+
+from datetime import datetime
+
+from slacker.model import User, Channel, UserChannelConfig, AssignedReview
+from slacker.jobs.reconcile_open_review_counts import ReconcileOpenReviewCounts
+
+
+def test_reconciles_drifted_counters(db_session):
+    jane = User(slack_id="jane", name="Jane", email="jane@example.com")
+    bob = User(slack_id="bob", name="Bob", email="bob@example.com")
+    channel = Channel(slack_id="channel", name="Test", new_devs_are_reviewers=True)
+    jane_config = UserChannelConfig(
+        user=jane,
+        channel=channel,
+        reviewer=True,
+        notify_on_assignment=False,
+        open_reviews=5,
+    )
+    bob_config = UserChannelConfig(
+        user=bob,
+        channel=channel,
+        reviewer=True,
+        notify_on_assignment=False,
+        open_reviews=0,
+    )
+    db_session.add_all([jane_config, bob_config])
+
+    def assignment(n: int, **kwargs) -> AssignedReview:
+        return AssignedReview(
+            assignee=jane,
+            requestor=bob,
+            channel=channel,
+            pr_url=f"https://github.com/mock/mock/pull/{n}",
+            assigned_at=datetime.now(),
+            **kwargs,
+        )
+
+    db_session.add_all(
+        [
+            assignment(1),
+            assignment(2),
+            assignment(3, completed_at=datetime.now()),
+            assignment(4, rerolled_at=datetime.now()),
+        ]
+    )
+    db_session.flush()
+
+    fixed = ReconcileOpenReviewCounts().perform(db_session)
+
+    assert fixed == 1
+    db_session.refresh(jane_config)
+    db_session.refresh(bob_config)
+    assert jane_config.open_reviews == 2
+    assert bob_config.open_reviews == 0
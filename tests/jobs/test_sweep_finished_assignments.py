@@ -0,0 +1,161 @@
+import pytest
+
+from datetime import datetime
+
+from sqlalchemy import select
+
+from slacker.github.rate_limit import BudgetExhausted, Priority
+from slacker.jobs.sweep_finished_assignments import SweepFinishedAssignments
+from slacker.jobs.sweep_finished_assignments import sweep_lock
+from slacker.model import (
+    User,
+    Channel,
+    UserChannelConfig,
+    AssignedReview,
+    PullRequest,
+)
+
+NOW = datetime(2023, 6, 1, 12, 0)
+
+
+@pytest.fixture
+def assignments(db_session, fake_graphql):
+    jane = User(slack_id="jane", name="Jane", email="jane@example.com")
+    bob = User(slack_id="bob", name="Bob", email="bob@example.com")
+    channel = Channel(slack_id="channel", name="Test", new_devs_are_reviewers=True)
+    jane_config = UserChannelConfig(
+        user=jane,
+        channel=channel,
+        reviewer=True,
+        notify_on_assignment=False,
+        open_reviews=3,
+    )
+    merged_pr = PullRequest(
+        owner="acme",
+        repo="widgets",
+        number=1,
+        html_url="https://github.com/acme/widgets/pull/1",
+        author_login="bob",
+        state="open",
+        fetched_at=NOW,
+    )
+    fake_graphql.add("acme", "widgets", 1, state="MERGED", merged=True)
+    fake_graphql.add("acme", "widgets", 2, state="CLOSED")
+    fake_graphql.add("acme", "widgets", 3, state="OPEN")
+
+    def assignment(n, assignee, **kwargs):
+        return AssignedReview(
+            assignee=assignee,
+            requestor=bob,
+            channel=channel,
+            pull_request=merged_pr if n == 1 else None,
+            pr_url=f"https://github.com/acme/widgets/pull/{n}",
+            assigned_at=NOW,
+            **kwargs,
+        )
+
+    rows = {
+        "merged": assignment(1, jane),
+        "closed": assignment(2, jane),
+        "open": assignment(3, jane),
+        "rerolled": assignment(2, bob, rerolled_at=NOW),
+        "legacy": AssignedReview(
+            assignee=jane, requestor=bob, pr_url="not a url", assigned_at=NOW
+        ),
+    }
+    db_session.add_all([jane_config, *rows.values()])
+    db_session.flush()
+    return {name: row.id for name, row in rows.items()}
+
+
+def test_completes_assignments_for_finished_prs(
+    broker, db_session, assignments, fake_graphql
+):
+    job = SweepFinishedAssignments(broker, batch_size=2)
+
+    result = job.perform(db_session, now=NOW)
+
+    completed = set(
+        db_session.scalars(
+            select(AssignedReview.id).where(AssignedReview.completed_at == NOW)
+        )
+    )
+    assert completed == {
+        assignments["merged"],
+        assignments["closed"],
+        assignments["rerolled"],
+    }
+    assert result.completed == 3
+    assert result.affected_slack_ids == {"jane", "bob"}
+    assert result.deferred is False
+    # Batches of 2 over 5 rows, with the last batch (just the legacy
+    # row) not needing a query
+    assert len(fake_graphql.queries) == 2
+
+
+def test_releases_open_reviews_except_for_rerolled(broker, db_session, assignments):
+    SweepFinishedAssignments(broker).perform(db_session, now=NOW)
+
+    counts = dict(
+        db_session.execute(
+            select(User.slack_id, UserChannelConfig.open_reviews).join(User)
+        ).all()
+    )
+    assert counts == {"jane": 1}
+
+
+def test_refreshes_stored_pr_state(broker, db_session, assignments):
+    SweepFinishedAssignments(broker).perform(db_session, now=NOW)
+
+    state = db_session.scalar(select(PullRequest.state).where(PullRequest.number == 1))
+    assert state == "closed"
+
+
+def test_nothing_to_do_the_second_time(broker, db_session, assignments):
+    SweepFinishedAssignments(broker).perform(db_session, now=NOW)
+    result = SweepFinishedAssignments(broker).perform(db_session, now=NOW)
+
+    assert result.completed == 0
+    assert result.affected_slack_ids == set()
+
+
+def test_sweep_is_deferred_when_budget_runs_low(
+    broker, db_session, assignments, monkeypatch
+):
+    def exhausted(urls, priority):
+        assert priority is Priority.BACKGROUND
+        raise BudgetExhausted(None)
+
+    monkeypatch.setattr(broker.github, "pull_request_states", exhausted)
+
+    result = SweepFinishedAssignments(broker).perform(db_session, now=NOW)
+
+    assert result.deferred is True
+    assert result.completed == 0
+
+
+def test_assignments_completed_meanwhile_are_not_counted(
+    broker, db_session, assignments, monkeypatch
+):
+    refresh = broker.refresh_pull_request_states
+
+    def refresh_after_a_webhook(session, records):
+        # The merge's webhook completes the assignment first
+        broker.complete_assignments(session, [assignments["merged"]], NOW)
+        refresh(session, records)
+
+    monkeypatch.setattr(broker, "refresh_pull_request_states", refresh_after_a_webhook)
+
+    result = SweepFinishedAssignments(broker).perform(db_session, now=NOW)
+
+    assert result.completed == 2
+
+
+def test_only_one_process_sweeps_at_a_time(db_engine):
+    with sweep_lock(db_engine) as first:
+        with sweep_lock(db_engine) as second:
+            assert first
+            assert not second
+
+    with sweep_lock(db_engine) as again:
+        assert again
@@ -0,0 +1,111 @@
+import pytest
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from slacker import assignment_events
+from slacker.assignment_events import AssignmentEvent, AssignmentEventPublisher
+from slacker.model import Channel, PullRequest, User
+
+AT = datetime(2024, 5, 1, 9, 30)
+
+
+def event(kind="new", id=1, assignee_id=2, channel_id=3):
+    return AssignmentEvent(
+        kind, id, assignee_id, channel_id, "https://github.com/mock/mock/pull/1", AT
+    )
+
+
+@pytest.fixture
+def publisher(test_database_url):
+    publisher = AssignmentEventPublisher(test_database_url, buffer_size=2)
+    yield publisher
+    publisher.close()
+
+
+def test_events_round_trip_through_json():
+    assert AssignmentEvent.from_json(event().as_json()) == event()
+
+
+def test_committed_events_reach_subscribers(publisher, db_engine):
+    subscription = publisher.subscribe()
+    assert publisher.listening.wait(timeout=5)
+
+    with db_engine.connect() as connection:
+        session = Session(connection)
+        assignment_events.publish(session, [event(id=1), event("completed", id=2)])
+        session.commit()
+
+    assert subscription.queue.get(timeout=5) == event(id=1)
+    assert subscription.queue.get(timeout=5) == event("completed", id=2)
+
+
+def test_subscribers_only_get_matching_events(publisher):
+    mine = publisher.subscribe(lambda event: event.channel_id == 3)
+    everything = publisher.subscribe()
+
+    publisher.deliver(event(channel_id=4))
+    publisher.deliver(event(channel_id=3))
+
+    assert mine.queue.qsize() == 1
+    assert everything.queue.qsize() == 2
+
+
+def test_slow_subscribers_are_dropped(publisher):
+    slow = publisher.subscribe()
+    fast = publisher.subscribe()
+
+    for id in range(3):
+        publisher.deliver(event(id=id))
+        fast.queue.get_nowait()
+
+    assert slow.dropped
+    assert not fast.dropped
+    assert publisher.subscriptions == {fast}
+
+
+@pytest.fixture
+def published(monkeypatch):
+    events = []
+    monkeypatch.setattr(
+        assignment_events, "publish", lambda _session, new: events.extend(new)
+    )
+    return events
+
+
+def test_state_changes_are_published(broker, db_session, published):
+    jane = User(slack_id="jane", name="Jane", email="jane@example.com")
+    bob = User(slack_id="bob", name="Bob", email="bob@example.com")
+    channel = Channel(slack_id="channel", name="Test", new_devs_are_reviewers=True)
+    pull_request = PullRequest(
+        owner="mock",
+        repo="mock",
+        number=1,
+        html_url="https://github.com/mock/mock/pull/1",
+        author_login="bob",
+        state="open",
+        fetched_at=datetime.now(),
+    )
+    first, second, third = broker.create_assignments(
+        db_session, [jane, jane, bob], bob, channel, pull_request
+    )
+    broker.acknowledge_assignment(db_session, first)
+    # Only the first acknowledgement counts
+    broker.acknowledge_assignment(db_session, first)
+    broker.reroll_assignment(db_session, second)
+    broker.complete_assignment(db_session, first)
+    # The rerolled one isn't active any more
+    broker.complete_assignments(db_session, [second.id, third.id])
+
+    assert [(event.event, event.id) for event in published] == [
+        ("new", first.id),
+        ("new", second.id),
+        ("new", third.id),
+        ("acknowledged", first.id),
+        ("rerolled", second.id),
+        ("completed", first.id),
+        ("completed", third.id),
+    ]
+    assert published[-1].assignee_id == bob.id
+    assert published[-1].channel_id == channel.id
+    assert published[-1].pr_url == pull_request.html_url
@@ -0,0 +1,148 @@
+import pytest
+
+from slacker.model import User, Channel
+from slacker.assignment_strategies import (
+    STRATEGY_NAMES,
+    LeastLoadedStrategy,
+    RandomStrategy,
+    RoundRobinStrategy,
+    WeightedStrategy,
+    strategy_for_name,
+)
+from slacker.bench.strategies import InMemoryRoundRobinPositions
+
+
+@pytest.fixture
+def candidates():
+    return [
+        User(id=n, slack_id=f"user{n}", name=f"User {n}", email=f"{n}@example.com")
+        for n in (3, 1, 2)
+    ]
+
+
+@pytest.fixture
+def channel():
+    return Channel(id=1, slack_id="channel", name="Test")
+
+
+def test_strategy_for_name():
+    positions = InMemoryRoundRobinPositions()
+    for name in STRATEGY_NAMES:
+        assert strategy_for_name(name, positions).name == name
+
+    with pytest.raises(ValueError):
+        strategy_for_name("alphabetical", positions)
+
+
+def test_random_keeps_every_candidate(candidates, channel):
+    ranked = RandomStrategy().rank(None, channel, candidates, {}, 1)
+
+    assert sorted(user.id for user in ranked) == [1, 2, 3]
+
+
+def test_least_loaded(candidates, channel):
+    open_reviews = {1: 4, 2: 0, 3: 2}
+
+    ranked = LeastLoadedStrategy().rank(None, channel, candidates, open_reviews, 1)
+
+    assert [user.id for user in ranked] == [2, 3, 1]
+
+
+def test_weighted_prefers_less_loaded(candidates, channel):
+    open_reviews = {1: 50, 2: 0, 3: 50}
+    strategy = WeightedStrategy()
+
+    firsts = [
+        strategy.rank(None, channel, candidates, open_reviews, 1)[0].id
+        for _ in range(200)
+    ]
+
+    assert firsts.count(2) > 150
+
+
+def test_round_robin_rotates_in_id_order(candidates, channel):
+    strategy = RoundRobinStrategy(InMemoryRoundRobinPositions())
+
+    firsts = []
+    for _ in range(4):
+        first = strategy.rank(None, channel, candidates, {}, 1)[0]
+        strategy.assigned(None, channel, [first])
+        firsts.append(first.id)
+
+    assert firsts == [1, 2, 3, 1]
+
+
+def test_round_robin_stays_fair_as_candidates_change(channel):
+    users = {
+        n: User(id=n, slack_id=f"user{n}", name=f"User {n}", email=f"{n}@example.com")
+        for n in range(1, 6)
+    }
+    strategy = RoundRobinStrategy(InMemoryRoundRobinPositions())
+
+    def assign(*ids):
+        ranked = strategy.rank(None, channel, [users[n] for n in ids], {}, 1)
+        strategy.assigned(None, channel, ranked[:1])
+        return ranked[0].id
+
+    assert assign(1, 2, 3, 4, 5) == 1
+    # 2 is the PR's author, so 3 goes next
+    assert assign(1, 3, 4, 5) == 3
+    # 2 is back, but the rotation has already passed them
+    assert assign(2, 3, 4, 5) == 4
+    # 5 has stopped reviewing, so it's back round to 1
+    assert assign(1, 2, 3, 4) == 1
+    assert assign(1, 2, 3, 4) == 2
+
+
+def test_round_robin_advances_past_the_last_reviewer(candidates, channel):
+    strategy = RoundRobinStrategy(InMemoryRoundRobinPositions())
+
+    ranked = strategy.rank(None, channel, candidates, {}, 2)
+    # 1 was away, so 2 and 3 were assigned
+    strategy.assigned(None, channel, ranked[1:3])
+
+    assert [user.id for user in strategy.rank(None, channel, candidates, {}, 1)] == [
+        1,
+        2,
+        3,
+    ]
+
+
+def test_round_robin_position_is_persisted(broker, db_session):
+    channel = Channel(slack_id="channel", name="Test", new_devs_are_reviewers=True)
+    user = User(slack_id="jane", name="Jane", email="jane@example.com")
+    db_session.add_all([channel, user])
+
+    assert broker.fetch_round_robin_position(db_session, channel) is None
+    assert broker.advance_round_robin_position(db_session, channel, None, user.id)
+    assert broker.fetch_round_robin_position(db_session, channel) == user.id
+
+    db_session.refresh(channel)
+    assert channel.round_robin_last_user_id == user.id
+
+
+def test_round_robin_position_only_advances_from_where_it_was(broker, db_session):
+    channel = Channel(slack_id="channel", name="Test", new_devs_are_reviewers=True)
+    jane = User(slack_id="jane", name="Jane", email="jane@example.com")
+    bob = User(slack_id="bob", name="Bob", email="bob@example.com")
+    db_session.add_all([channel, jane, bob])
+    db_session.flush()
+
+    assert broker.advance_round_robin_position(db_session, channel, None, jane.id)
+    # Someone else got there first
+    assert not broker.advance_round_robin_position(db_session, channel, None, bob.id)
+    assert broker.fetch_round_robin_position(db_session, channel) == jane.id
+
+
+def test_round_robin_ranks_again_after_losing_a_race(candidates, channel):
+    positions = InMemoryRoundRobinPositions()
+    strategy = RoundRobinStrategy(positions)
+
+    ranked = strategy.rank(None, channel, candidates, {}, 1)
+    # Another assignment in the channel takes 1 in the meantime
+    positions.advance_round_robin_position(None, channel, None, 1)
+
+    assert not strategy.assigned(None, channel, ranked[:1])
+    ranked = strategy.rank(None, channel, candidates, {}, 1)
+    assert ranked[0].id == 2
+    assert strategy.assigned(None, channel, ranked[:1])
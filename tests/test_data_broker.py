@@ -0,0 +1,86 @@
+from datetime import datetime
+
+from sqlalchemy import select
+
+from slacker.model import AssignedReview, AssignedReviewHistory, PullRequest
+from slacker.model import User
+
+
+def test_pull_request_added_in_the_meantime_is_updated(
+    broker, db_session, mocked_pr_url
+):
+    pending = broker.start_fetching_pull_requests(db_session, [mocked_pr_url])
+    # As another request or a webhook would have, after the lookup
+    db_session.add(
+        PullRequest(
+            owner="nrw505",
+            repo="slacker2",
+            number=1,
+            html_url="https://github.com/nrw505/slacker2/pull/1",
+            author_login="someone",
+            title="Stale",
+            state="closed",
+            fetched_at=datetime(2020, 1, 1),
+        )
+    )
+    db_session.flush()
+    db_session.expunge_all()
+
+    [pull_request] = broker.finish_fetching_pull_requests(db_session, pending)
+
+    assert pull_request.id is not None
+    assert pull_request.title != "Stale"
+    assert pull_request.fetched_at > datetime(2020, 1, 1)
+    assert db_session.scalars(select(PullRequest)).all() == [pull_request]
+
+
+def test_new_pull_requests_are_returned_in_order(
+    broker, db_session, mocked_pr_url, mocked_second_pr_url
+):
+    urls = [mocked_second_pr_url, mocked_pr_url, mocked_second_pr_url]
+
+    pull_requests = broker.fetch_pull_requests_by_url_or_create_from_github(
+        db_session, urls
+    )
+
+    assert [pr.number for pr in pull_requests] == [2, 1, 2]
+    assert pull_requests[0] is pull_requests[2]
+    assert all(pr.id is not None for pr in pull_requests)
+
+
+def test_old_assignments_are_linked_when_their_pull_request_is_stored(
+    broker, db_session, mocked_pr_url
+):
+    jane = User(slack_id="jane", name="Jane", email="jane@example.com")
+    bob = User(slack_id="bob", name="Bob", email="bob@example.com")
+    db_session.add_all([jane, bob])
+    db_session.flush()
+    # Made before PRs were stored, so only have the URL
+    db_session.add_all(
+        [
+            AssignedReview(
+                assignee=jane,
+                requestor=bob,
+                pr_url=mocked_pr_url,
+                assigned_at=datetime(2024, 1, 1),
+            ),
+            AssignedReviewHistory(
+                id=1,
+                assignee_id=bob.id,
+                requestor_id=jane.id,
+                pr_url=mocked_pr_url,
+                assigned_at=datetime(2023, 1, 1),
+                completed_at=datetime(2023, 1, 2),
+            ),
+        ]
+    )
+    db_session.flush()
+
+    pull_request = broker.fetch_pull_request_by_url_or_create_from_github(
+        db_session, mocked_pr_url
+    )
+
+    assert broker.fetch_assignee_ids_for_pull_request(db_session, pull_request) == {
+        jane.id,
+        bob.id,
+    }
@@ -0,0 +1,62 @@
+import pytest
+from urllib.error import HTTPError
+from urllib.request import urlopen
+
+from slacker.metrics import Metrics, serve_metrics
+
+
+def test_counters_and_gauges():
+    metrics = Metrics()
+    metrics.increment("requests")
+    metrics.increment("requests", 2)
+    metrics.set_gauge("remaining", 10)
+    metrics.set_gauge("remaining", 7)
+
+    assert metrics.snapshot() == {"requests": 3, "remaining": 7}
+
+
+def test_render():
+    metrics = Metrics()
+    metrics.increment("requests")
+    metrics.set_gauge("remaining", 7.5)
+
+    assert metrics.render() == (
+        "# TYPE requests counter\n"
+        "requests 1\n"
+        "# TYPE remaining gauge\n"
+        "remaining 7.5\n"
+    )
+
+
+def test_histogram():
+    metrics = Metrics()
+    metrics.observe("latency", 0.2, buckets=(0.1, 0.5))
+    metrics.observe("latency", 0.3, buckets=(0.1, 0.5))
+    metrics.observe("latency", 2, buckets=(0.1, 0.5))
+
+    assert metrics.snapshot() == {"latency_count": 3, "latency_sum": 2.5}
+    assert metrics.render() == (
+        "# TYPE latency histogram\n"
+        'latency_bucket{le="0.1"} 0\n'
+        'latency_bucket{le="0.5"} 2\n'
+        'latency_bucket{le="+Inf"} 3\n'
+        "latency_sum 2.5\n"
+        "latency_count 3\n"
+    )
+
+
+def test_serve_metrics():
+    metrics = Metrics()
+    metrics.increment("requests")
+    server = serve_metrics(0, "127.0.0.1", metrics)
+    url = f"http://127.0.0.1:{server.server_address[1]}"
+    try:
+        with urlopen(f"{url}/metrics") as response:
+            assert response.headers["Content-Type"].startswith("text/plain")
+            assert response.read().decode() == metrics.render()
+        with pytest.raises(HTTPError) as error:
+            urlopen(f"{url}/elsewhere")
+        assert error.value.code == 404
+    finally:
+        server.shutdown()
+        server.server_close()
@@ -0,0 +1,179 @@
+import pytest
+
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Generator
+
+from sqlalchemy import event, text
+from sqlalchemy.exc import IntegrityError
+
+from slacker.model import User, Channel, UserChannelConfig, AssignedReview
+from slacker.model import PullRequest
+
+
+@contextmanager
+def captured_statements(
+    session,
+) -> Generator[list[tuple[str, Any]], None, None]:
+    statements: list[tuple[str, Any]] = []
+    connection = session.connection()
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    event.listen(connection, "before_cursor_execute", capture)
+    try:
+        yield statements
+    finally:
+        event.remove(connection, "before_cursor_execute", capture)
+
+
+def query_plan(session, statement: str, parameters: Any) -> str:
+    # The test tables are tiny, so the planner would always pick a
+    # sequential scan. Turning seqscans off makes it use an index if
+    # (and only if) a usable one exists.
+    session.execute(text("SET LOCAL enable_seqscan = off"))
+    rows = session.connection().exec_driver_sql("EXPLAIN " + statement, parameters)
+    return "\n".join(row[0] for row in rows)
+
+
+def plan_for_broker_call(session, call) -> str:
+    session.flush()
+    with captured_statements(session) as statements:
+        call()
+    assert len(statements) == 1
+    return query_plan(session, *statements[0])
+
+
+# With a handful of rows every index costs about the same, and once
+# autovacuum has analyzed the (then empty) test tables the planner
+# believes that's all there is. Completed assignments spread over other
+# people and channels, and an ANALYZE (which sees this transaction's
+# rows), make it plan like it would for a real table. Both are rolled
+# back with the test.
+def add_filler_assignments(session, count: int = 2000, spread: int = 20) -> None:
+    users = [
+        User(slack_id=f"filler{n}", name="Filler", email=f"filler{n}@example.com")
+        for n in range(spread)
+    ]
+    channels = [
+        Channel(slack_id=f"filler{n}", name="Filler", new_devs_are_reviewers=True)
+        for n in range(spread)
+    ]
+    session.add_all(users + channels)
+    session.flush()
+    # Negative ids never clash with the sequence's
+    for table in ("assigned_reviews", "assigned_reviews_history"):
+        session.execute(
+            text(
+                f"INSERT INTO {table} (id, assignee_id, requestor_id, channel_id, "
+                "pr_url, assigned_at, completed_at) "
+                "SELECT n, user_ids[1 - n % :spread], user_ids[1 - n % :spread], "
+                "channel_ids[1 - n % :spread], "
+                "'https://github.com/mock/filler/pull/' || n, "
+                "timestamp '2020-01-01' + n * interval '1 minute', "
+                "timestamp '2020-01-01' + n * interval '1 minute' "
+                "FROM generate_series(-:count, -1) AS n, "
+                "CAST(:users AS integer[]) AS user_ids, "
+                "CAST(:channels AS integer[]) AS channel_ids"
+            ),
+            {
+                "users": [user.id for user in users],
+                "channels": [channel.id for channel in channels],
+                "count": count,
+                "spread": spread,
+            },
+        )
+        session.execute(text(f"ANALYZE {table}"))
+
+
+@pytest.fixture
+def populated(db_session):
+    jane = User(slack_id="jane", name="Jane", email="jane@example.com")
+    bob = User(slack_id="bob", name="Bob", email="bob@example.com")
+    channel = Channel(slack_id="channel", name="Test", new_devs_are_reviewers=True)
+    db_session.add_all([jane, bob, channel])
+    for n in range(10):
+        db_session.add(
+            AssignedReview(
+                assignee=jane,
+                requestor=bob,
+                channel=channel,
+                pr_url=f"https://github.com/mock/mock/pull/{n}",
+                assigned_at=datetime.now(),
+                completed_at=datetime.now() if n % 2 else None,
+            )
+        )
+    db_session.flush()
+    add_filler_assignments(db_session)
+    return {"jane": jane, "bob": bob, "channel": channel}
+
+
+def test_assignments_for_pr_url_uses_index(broker, db_session, populated):
+    plan = plan_for_broker_call(
+        db_session,
+        lambda: broker.fetch_assignments_for_pr_url(
+            db_session, "https://github.com/mock/mock/pull/1"
+        ),
+    )
+
+    assert "Seq Scan on assigned_reviews" not in plan
+    assert "ix_assigned_reviews_pr_url" in plan
+
+
+def test_assignee_ids_for_pull_request_use_indexes(broker, db_session, populated):
+    pull_request = PullRequest(
+        owner="mock",
+        repo="mock",
+        number=1,
+        html_url="https://github.com/mock/mock/pull/1",
+        author_login="bob",
+        state="open",
+        fetched_at=datetime.now(),
+    )
+    db_session.add(pull_request)
+    plan = plan_for_broker_call(
+        db_session,
+        lambda: broker.fetch_assignee_ids_for_pull_request(db_session, pull_request),
+    )
+
+    assert "Seq Scan" not in plan
+    assert "ix_assigned_reviews_pull_request_id" in plan
+    assert "ix_assigned_reviews_history_pull_request_id" in plan
+
+
+def test_active_assignments_uses_index(broker, db_session, populated):
+    plan = plan_for_broker_call(
+        db_session,
+        lambda: broker.fetch_active_assignments_for_slack_user_id(db_session, "jane"),
+    )
+
+    assert "Seq Scan on assigned_reviews" not in plan
+    assert "ix_assigned_reviews_active_assignee_id" in plan
+
+
+def test_channel_config_lookup_uses_index(broker, db_session, populated):
+    plan = plan_for_broker_call(
+        db_session,
+        lambda: broker.fetch_or_create_channel_config_for_user_in_channel(
+            db_session, populated["jane"], populated["channel"]
+        ),
+    )
+
+    assert "Seq Scan on user_channel_configs" not in plan
+    assert "uq_user_channel_configs_channel_id_user_id" in plan
+
+
+def test_duplicate_channel_configs_are_rejected(db_session, populated):
+    with pytest.raises(IntegrityError):
+        with db_session.begin_nested():
+            for _ in range(2):
+                db_session.add(
+                    UserChannelConfig(
+                        user=populated["jane"],
+                        channel=populated["channel"],
+                        reviewer=True,
+                        notify_on_assignment=False,
+                    )
+                )
+            db_session.flush()
@@ -0,0 +1,119 @@
+import time
+from datetime import timedelta
+
+import time_machine
+from sqlalchemy.orm import Session
+
+from slacker.notifications import NotificationListener
+from slacker.reviewer_index import (
+    NOTIFY_CHANNEL,
+    ReviewerIndex,
+    ReviewerIndexChange,
+    announce_change,
+)
+
+
+def test_unknown_channel_is_not_indexed():
+    index = ReviewerIndex()
+
+    assert index.reviewers_in_channel(1) is None
+    assert index.reviewers_in_channel(None) is None
+
+
+def test_build_stores_sorted_reviewers():
+    index = ReviewerIndex()
+    index.build(1, [5, 3, 1, 4], [5, 1, 4])
+
+    assert index.reviewers_in_channel(1) == [1, 4, 5]
+
+
+def test_set_reviewer_only_applies_to_members():
+    index = ReviewerIndex()
+    index.build(1, [1, 2, 3], [1])
+
+    index.set_reviewer(1, 3, True)
+    index.set_reviewer(1, 1, False)
+    index.set_reviewer(1, 9, True)
+
+    assert index.reviewers_in_channel(1) == [3]
+
+
+def test_membership_changes():
+    index = ReviewerIndex()
+    index.build(1, [1, 2], [1, 2])
+    index.build(2, [2, 3], [2, 3])
+
+    index.add_member(1, 7, reviewer=True)
+    index.add_member(1, 8, reviewer=False)
+    index.remove_member(1, 1)
+    index.remove_user(2)
+
+    assert index.reviewers_in_channel(1) == [7]
+    assert index.reviewers_in_channel(2) == [3]
+
+    # Now a member, so toggling them works
+    index.set_reviewer(1, 8, True)
+    assert index.reviewers_in_channel(1) == [7, 8]
+
+
+def test_changes_to_unindexed_channels_are_ignored():
+    index = ReviewerIndex()
+
+    index.add_member(1, 1, reviewer=True)
+    index.set_reviewer(1, 1, True)
+
+    assert index.reviewers_in_channel(1) is None
+
+
+def test_entries_expire():
+    index = ReviewerIndex(expiry=timedelta(minutes=10))
+    with time_machine.travel(0, tick=False) as traveller:
+        index.build(1, [1], [1])
+        traveller.shift(timedelta(minutes=11))
+
+        assert index.reviewers_in_channel(1) is None
+
+
+def test_changes_apply_like_the_methods_they_stand_for():
+    index = ReviewerIndex()
+    index.build(1, [1, 2], [1])
+    index.build(2, [2], [2])
+
+    index.apply(ReviewerIndexChange("joined", 3, 1, reviewer=True))
+    index.apply(ReviewerIndexChange("reviewer", 1, 1, reviewer=False))
+    index.apply(ReviewerIndexChange("left", 3, 1))
+    index.apply(ReviewerIndexChange("reviewer", 2, 1, reviewer=True))
+    index.apply(ReviewerIndexChange("deactivated", 2))
+
+    assert index.reviewers_in_channel(1) == []
+    assert index.reviewers_in_channel(2) == []
+
+
+def test_announced_changes_reach_other_indexes(test_database_url, db_engine):
+    # Another process's index
+    index = ReviewerIndex()
+    index.build(1, [1, 2], [1])
+    listener = NotificationListener(
+        test_database_url, NOTIFY_CHANNEL, index.receive, index.clear
+    )
+    listener.start()
+    try:
+        assert listener.listening.wait(timeout=5)
+        # It may have missed changes before it was listening
+        assert index.reviewers_in_channel(1) is None
+        index.build(1, [1, 2], [1])
+
+        with db_engine.connect() as connection:
+            session = Session(connection)
+            announce_change(session, ReviewerIndexChange("left", 1, 1))
+            session.rollback()
+            announce_change(session, ReviewerIndexChange("reviewer", 2, 1, True))
+            session.commit()
+
+        for _ in range(50):
+            if index.reviewers_in_channel(1) != [1]:
+                break
+            time.sleep(0.1)
+        assert index.reviewers_in_channel(1) == [1, 2]
+    finally:
+        listener.close()
@@ -0,0 +1,166 @@
+import pytest
+from datetime import date, datetime, timedelta
+
+from slacker.model import Channel, PullRequest, ReviewStatsDaily, User
+from slacker.stats import (
+    StatsChange,
+    TURNAROUND_BUCKETS,
+    Turnaround,
+    fetch_review_stats,
+    format_duration,
+    record_changes,
+    turnaround_bucket,
+)
+
+DAY = date(2024, 5, 1)
+
+
+@pytest.fixture
+def people(db_session):
+    jane = User(slack_id="jane", name="Jane", email="jane@example.com")
+    bob = User(slack_id="bob", name="Bob", email="bob@example.com")
+    general = Channel(slack_id="general", name="General", new_devs_are_reviewers=True)
+    other = Channel(slack_id="other", name="Other", new_devs_are_reviewers=True)
+    db_session.add_all([jane, bob, general, other])
+    db_session.flush()
+    return {"jane": jane, "bob": bob, "general": general, "other": other}
+
+
+@pytest.fixture
+def pull_request(db_session):
+    pull_request = PullRequest(
+        owner="mock",
+        repo="mock",
+        number=1,
+        html_url="https://github.com/mock/mock/pull/1",
+        author_login="bob",
+        state="open",
+        fetched_at=datetime.now(),
+    )
+    db_session.add(pull_request)
+    return pull_request
+
+
+def test_turnaround_bucket():
+    assert turnaround_bucket(0) == 0
+    assert turnaround_bucket(299.9) == 0
+    assert turnaround_bucket(300) == 1
+    assert turnaround_bucket(4000) == 4
+    assert turnaround_bucket(10**7) == len(TURNAROUND_BUCKETS)
+
+
+def test_percentiles():
+    turnaround = Turnaround(total_seconds=0)
+    # Ten in 15-30 minutes, ten in 1-2 hours
+    turnaround.histogram[2] = 10
+    turnaround.histogram[4] = 10
+
+    assert turnaround.count == 20
+    assert turnaround.percentile(0.25) == pytest.approx(1350)
+    assert turnaround.percentile(0.5) == pytest.approx(1800)
+    assert turnaround.percentile(0.9) == pytest.approx(6480)
+    assert Turnaround().percentile(0.5) is None
+
+    turnaround.histogram[-1] = 100
+    assert turnaround.percentile(0.99) == TURNAROUND_BUCKETS[-1]
+
+
+def test_format_duration():
+    assert format_duration(10) == "1m"
+    assert format_duration(45 * 60) == "45m"
+    assert format_duration(3.5 * 3600) == "3.5h"
+    assert format_duration(2 * 86400) == "2.0d"
+
+
+def test_changes_accumulate(db_session, people):
+    jane = people["jane"].id
+    bob = people["bob"].id
+    general = people["general"].id
+    other = people["other"].id
+
+    record_changes(
+        db_session,
+        [
+            StatsChange(DAY, general, jane, assigned=1),
+            StatsChange(DAY, general, jane, assigned=1),
+            StatsChange(DAY, general, bob, assigned=1),
+            StatsChange(DAY, other, jane, assigned=1),
+            None,
+        ],
+    )
+    record_changes(
+        db_session,
+        [
+            StatsChange(DAY, general, jane, acknowledged=1, acknowledge_seconds=60),
+            StatsChange(DAY, general, jane, completed=1, complete_seconds=4000),
+            StatsChange(DAY, general, bob, rerolled=1),
+        ],
+    )
+    record_changes(
+        db_session,
+        [StatsChange(DAY, general, jane, acknowledged=1, acknowledge_seconds=600)],
+    )
+
+    totals = fetch_review_stats(db_session, DAY, DAY + timedelta(days=1))[None]
+    assert totals.assigned == 4
+    assert totals.acknowledged == 2
+    assert totals.rerolled == 1
+    assert totals.completed == 1
+    assert totals.reroll_rate() == 0.25
+    assert totals.acknowledge.mean() == 330
+    assert totals.acknowledge.histogram[:3] == [1, 1, 0]
+    assert totals.complete.histogram[4] == 1
+
+    by_user = fetch_review_stats(
+        db_session, DAY, DAY + timedelta(days=1), group_by="user_id"
+    )
+    assert by_user[jane].assigned == 3
+    assert by_user[bob].rerolled == 1
+    assert by_user[bob].acknowledge.count == 0
+
+    in_other = fetch_review_stats(
+        db_session, DAY, DAY + timedelta(days=1), channel_id=other
+    )
+    assert in_other[None].assigned == 1
+    assert fetch_review_stats(db_session, DAY + timedelta(days=1), DAY) == {}
+
+    # One row per day, channel and assignee
+    assert db_session.query(ReviewStatsDaily).count() == 3
+
+
+def test_broker_keeps_stats(broker, db_session, people, pull_request):
+    jane = people["jane"]
+    general = people["general"]
+    assignments = broker.create_assignments(
+        db_session,
+        [jane, jane, jane, people["bob"]],
+        people["bob"],
+        general,
+        pull_request,
+    )
+    first, second, third, bobs = assignments
+
+    broker.acknowledge_assignment(db_session, first)
+    # Only the first acknowledgement counts
+    broker.acknowledge_assignment(db_session, first)
+    broker.reroll_assignment(db_session, second)
+    broker.complete_assignment(db_session, first)
+    # Neither completing a rerolled assignment nor rerolling a completed
+    # one counts again
+    broker.complete_assignment(db_session, second)
+    broker.reroll_assignment(db_session, first)
+    broker.complete_assignments(db_session, [third.id, bobs.id])
+
+    day = first.assigned_at.date()
+    stats = fetch_review_stats(
+        db_session,
+        day,
+        day + timedelta(days=1),
+        user_id=jane.id,
+    )[None]
+    assert stats.assigned == 3
+    assert stats.acknowledged == 1
+    assert stats.rerolled == 1
+    assert stats.completed == 2
+    assert stats.complete.count == 2
+    assert stats.acknowledge.count == 1
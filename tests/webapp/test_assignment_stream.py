@@ -0,0 +1,95 @@
+import json
+import pytest
+from datetime import datetime
+
+from slacker.assignment_events import AssignmentEvent, AssignmentEventPublisher
+from slacker.model import Channel, User
+from slacker.webapp import app
+
+
+@pytest.fixture
+def publisher(test_database_url):
+    publisher = AssignmentEventPublisher(test_database_url, buffer_size=2)
+    yield publisher
+    publisher.close()
+
+
+@pytest.fixture
+def client(db_session, publisher):
+    app.config.update(
+        DB_SESSION_FACTORY=lambda: db_session,
+        ASSIGNMENT_EVENT_PUBLISHER=publisher,
+        ASSIGNMENT_STREAM_KEEPALIVE=0.1,
+    )
+    yield app.test_client()
+    for key in (
+        "DB_SESSION_FACTORY",
+        "ASSIGNMENT_EVENT_PUBLISHER",
+        "ASSIGNMENT_STREAM_KEEPALIVE",
+    ):
+        app.config.pop(key)
+
+
+@pytest.fixture
+def people(db_session):
+    jane = User(slack_id="jane", name="Jane", email="jane@example.com")
+    channel = Channel(slack_id="channel", name="Test", new_devs_are_reviewers=True)
+    db_session.add_all([jane, channel])
+    db_session.flush()
+    return {"jane": jane.id, "channel": channel.id}
+
+
+def event(kind, assignee_id, channel_id):
+    return AssignmentEvent(
+        kind,
+        1,
+        assignee_id,
+        channel_id,
+        "https://github.com/mock/mock/pull/1",
+        datetime(2024, 5, 1, 9, 30),
+    )
+
+
+def test_stream(client, publisher, people):
+    response = client.get("/assignments/stream?assignee=jane", buffered=False)
+    chunks = iter(response.response)
+
+    assert response.status_code == 200
+    assert response.mimetype == "text/event-stream"
+    assert next(chunks) == b"retry: 5000\n\n"
+
+    publisher.deliver(event("new", people["jane"] + 1, people["channel"]))
+    publisher.deliver(event("acknowledged", people["jane"], people["channel"]))
+    kind, data = next(chunks).decode().strip().split("\n")
+    assert kind == "event: acknowledged"
+    assert json.loads(data.removeprefix("data: ")) == {
+        "event": "acknowledged",
+        "id": 1,
+        "assignee_id": people["jane"],
+        "channel_id": people["channel"],
+        "pr_url": "https://github.com/mock/mock/pull/1",
+        "at": "2024-05-01T09:30:00",
+    }
+    # Nothing else for jane
+    assert next(chunks) == b": keepalive\n\n"
+
+    response.close()
+    assert publisher.subscriptions == set()
+
+
+def test_slow_streams_are_dropped(client, publisher):
+    response = client.get("/assignments/stream", buffered=False)
+    chunks = iter(response.response)
+    next(chunks)
+
+    for kind in ("new", "acknowledged", "completed"):
+        publisher.deliver(event(kind, 1, 2))
+
+    assert next(chunks) == b"event: dropped\ndata: {}\n\n"
+    assert list(chunks) == []
+
+
+def test_unknown_assignee(client):
+    response = client.get("/assignments/stream?assignee=nobody")
+
+    assert response.status_code == 404
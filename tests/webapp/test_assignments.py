@@ -0,0 +1,241 @@
+import pytest
+from datetime import datetime, timedelta
+
+from sqlalchemy import text, update
+
+from slacker.model import AssignedReview, AssignedReviewHistory, Channel, User
+from slacker.webapp import app
+from slacker.webapp.assignments import (
+    AssignmentFilters,
+    Cursor,
+    fetch_assignments_page,
+)
+from tests.test_query_plans import add_filler_assignments, captured_statements
+
+START = datetime(2024, 5, 1, 9, 0)
+
+
+@pytest.fixture
+def people(db_session):
+    jane = User(slack_id="jane", name="Jane", email="jane@example.com")
+    bob = User(slack_id="bob", name="Bob", email="bob@example.com")
+    general = Channel(slack_id="general", name="General", new_devs_are_reviewers=True)
+    other = Channel(slack_id="other", name="Other", new_devs_are_reviewers=True)
+    db_session.add_all([jane, bob, general, other])
+    db_session.flush()
+    return {"jane": jane, "bob": bob, "general": general, "other": other}
+
+
+@pytest.fixture
+def assignments(db_session, people):
+    rows = []
+    for n in range(25):
+        rows.append(
+            AssignedReview(
+                assignee=people["jane"] if n % 2 else people["bob"],
+                requestor=people["bob"] if n % 2 else people["jane"],
+                channel=people["general"] if n % 3 else people["other"],
+                pr_url=f"https://github.com/mock/mock/pull/{n}",
+                # Pairs share a timestamp so that the id has to break ties
+                assigned_at=START + timedelta(hours=n // 2),
+                completed_at=START + timedelta(days=1) if n % 5 == 0 else None,
+            )
+        )
+    db_session.add_all(rows)
+    db_session.flush()
+    return rows
+
+
+@pytest.fixture
+def client(db_session):
+    app.config["DB_SESSION_FACTORY"] = lambda: db_session
+    yield app.test_client()
+    app.config.pop("DB_SESSION_FACTORY")
+
+
+def all_pages(session, filters, limit):
+    ids = []
+    cursor = None
+    while True:
+        page = fetch_assignments_page(session, filters, cursor, limit)
+        ids += [assignment.id for assignment in page.assignments]
+        if page.next_cursor is None:
+            return ids
+        cursor = page.next_cursor
+
+
+def test_pages_cover_everything_once_newest_first(db_session, assignments):
+    ids = all_pages(db_session, AssignmentFilters(), limit=4)
+
+    expected = sorted(assignments, key=lambda a: (a.assigned_at, a.id), reverse=True)
+    assert ids == [assignment.id for assignment in expected]
+
+
+def test_filters(db_session, people, assignments):
+    filters = AssignmentFilters(channel="general", assignee="jane", state="active")
+
+    ids = all_pages(db_session, filters, limit=3)
+
+    expected = {
+        assignment.id
+        for assignment in assignments
+        if assignment.channel is people["general"]
+        and assignment.assignee is people["jane"]
+        and assignment.completed_at is None
+    }
+    assert set(ids) == expected
+
+
+def test_archived_assignments_are_listed(db_session, people, assignments):
+    archived = AssignedReviewHistory(
+        # Archived rows keep their ids, which are below the live ones
+        id=assignments[0].id - 1,
+        assignee_id=people["jane"].id,
+        requestor_id=people["bob"].id,
+        channel_id=people["general"].id,
+        pr_url="https://github.com/mock/mock/pull/archived",
+        assigned_at=START + timedelta(hours=3),
+        completed_at=START + timedelta(days=1),
+    )
+    db_session.add(archived)
+    db_session.flush()
+
+    ids = all_pages(db_session, AssignmentFilters(channel="general"), limit=4)
+    page = fetch_assignments_page(db_session, AssignmentFilters(state="completed"))
+
+    assert archived.id in ids
+    assert len(ids) == len(set(ids))
+    assert "https://github.com/mock/mock/pull/archived" in [
+        assignment.pr_url for assignment in page.assignments
+    ]
+    assert [a.assignee.name for a in page.assignments if a.id == archived.id] == [
+        "Jane"
+    ]
+
+
+def test_time_range(db_session, assignments):
+    filters = AssignmentFilters(
+        since=START + timedelta(hours=2), until=START + timedelta(hours=4)
+    )
+
+    page = fetch_assignments_page(db_session, filters)
+
+    assert sorted(a.pr_url[-2:] for a in page.assignments) == ["/4", "/5", "/6", "/7"]
+
+
+def test_page_is_one_query(db_session, assignments):
+    db_session.expire_all()
+    with captured_statements(db_session) as statements:
+        page = fetch_assignments_page(db_session, AssignmentFilters(), limit=10)
+        names = [
+            (a.assignee.name, a.requestor.name, a.channel.name)
+            for a in page.assignments
+        ]
+
+    assert len(names) == 10
+    assert len(statements) == 1
+
+
+def test_keyset_query_uses_index(db_session, assignments):
+    add_filler_assignments(db_session)
+    cursor = Cursor(START + timedelta(hours=5), assignments[10].id)
+    with captured_statements(db_session) as statements:
+        fetch_assignments_page(db_session, AssignmentFilters(channel="general"), cursor)
+
+    # Once the tables have been vacuumed the planner knows they're tiny
+    # and would rather sort a bitmap scan, so rule that out as well
+    for setting in ("enable_seqscan", "enable_bitmapscan", "enable_sort"):
+        db_session.execute(text(f"SET LOCAL {setting} = off"))
+    rows = db_session.connection().exec_driver_sql(
+        "EXPLAIN " + statements[0][0], statements[0][1]
+    )
+    plan = "\n".join(row[0] for row in rows)
+    # The live and the archived rows are merged in order, not sorted
+    assert "ix_assigned_reviews_channel_id_assigned_at_id" in plan
+    assert "ix_assigned_reviews_history_channel_id_assigned_at_id" in plan
+    assert "Merge Append" in plan
+    assert "->  Sort" not in plan
+
+
+def test_cursor_round_trip():
+    cursor = Cursor(datetime(2024, 5, 1, 9, 30, 15, 123), 42)
+
+    assert Cursor.decode(cursor.encode()) == cursor
+    with pytest.raises(ValueError):
+        Cursor.decode("not-a-cursor")
+
+
+def test_dashboard(client, assignments):
+    response = client.get("/assignments?limit=10")
+
+    assert response.status_code == 200
+    body = response.get_data(as_text=True)
+    assert body.count("https://github.com/mock/mock/pull/") == 20
+    assert "after=" in body
+    assert response.headers["ETag"]
+    assert response.headers["Last-Modified"]
+
+
+def test_dashboard_bad_filters(client):
+    assert client.get("/assignments?state=lost").status_code == 400
+    assert client.get("/assignments?after=nonsense").status_code == 400
+
+
+def test_dashboard_not_modified(client, db_session, assignments):
+    first = client.get("/assignments?limit=5")
+    etag = first.headers["ETag"]
+
+    again = client.get("/assignments?limit=5", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.get_data() == b""
+
+    # The request closed the session, so the fixture's objects are detached
+    db_session.execute(
+        update(AssignedReview)
+        .where(AssignedReview.pr_url == "https://github.com/mock/mock/pull/24")
+        .values(completed_at=datetime.now())
+    )
+    changed = client.get("/assignments?limit=5", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != etag
+
+
+def test_not_modified_is_answered_without_loading_the_page(
+    client, db_session, assignments
+):
+    etag = client.get("/assignments?limit=5").headers["ETag"]
+
+    with captured_statements(db_session) as statements:
+        again = client.get("/assignments?limit=5", headers={"If-None-Match": etag})
+
+    assert again.status_code == 304
+    assert len(statements) == 1
+    assert "JOIN" not in statements[0][0]
+
+
+def test_new_assignment_changes_the_first_page_only(
+    client, db_session, people, assignments
+):
+    page = fetch_assignments_page(db_session, AssignmentFilters(), None, 5)
+    second_url = f"/assignments?limit=5&after={page.next_cursor.encode()}"
+    first = client.get("/assignments?limit=5")
+    second = client.get(second_url)
+
+    db_session.add(
+        AssignedReview(
+            assignee=db_session.merge(people["jane"]),
+            requestor=db_session.merge(people["bob"]),
+            pr_url="https://github.com/mock/mock/pull/100",
+            assigned_at=START + timedelta(days=30),
+        )
+    )
+    db_session.flush()
+
+    first_again = client.get(
+        "/assignments?limit=5", headers={"If-None-Match": first.headers["ETag"]}
+    )
+    second_again = client.get(
+        second_url, headers={"If-None-Match": second.headers["ETag"]}
+    )
+    assert first_again.status_code == 200
+    assert second_again.status_code == 304
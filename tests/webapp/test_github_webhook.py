@@ -0,0 +1,110 @@
+import hashlib
+import hmac
+import json
+import pytest
+
+from slacker.webapp import app
+from slacker.webapp.github_webhook import WebhookWorker, verify_signature
+from tests.fixtures.github import PULL_JSON
+
+SECRET = "webhook-secret"
+
+
+def sign(body: bytes, secret: str = SECRET) -> str:
+    return "sha256=" + hmac.new(secret.encode(), body, hashlib.sha256).hexdigest()
+
+
+@pytest.fixture
+def processed():
+    return []
+
+
+@pytest.fixture
+def client(processed):
+    worker = WebhookWorker(lambda event, payload: processed.append((event, payload)))
+    app.config.update(GITHUB_WEBHOOK_SECRET=SECRET, GITHUB_WEBHOOK_WORKER=worker)
+    yield app.test_client()
+    app.config.pop("GITHUB_WEBHOOK_SECRET")
+    app.config.pop("GITHUB_WEBHOOK_WORKER")
+
+
+def deliver(client, event, payload, signature=None):
+    body = json.dumps(payload).encode()
+    return client.post(
+        "/github/webhook",
+        data=body,
+        content_type="application/json",
+        headers={
+            "X-GitHub-Event": event,
+            "X-Hub-Signature-256": signature or sign(body),
+        },
+    )
+
+
+def test_verify_signature():
+    assert verify_signature(SECRET, b"body", sign(b"body"))
+    assert not verify_signature(SECRET, b"body", sign(b"body", "other"))
+    assert not verify_signature(SECRET, b"body", None)
+    assert not verify_signature(SECRET, b"body", "sha1=abc")
+
+
+def test_bad_signature_is_rejected(client, processed):
+    response = deliver(client, "pull_request", {}, signature="sha256=nope")
+
+    assert response.status_code == 401
+    assert processed == []
+
+
+def test_ping(client):
+    assert deliver(client, "ping", {"zen": "Keep it simple"}).status_code == 200
+
+
+def test_unhandled_events_are_ignored(client, processed):
+    response = deliver(client, "issues", {"action": "opened"})
+
+    assert response.status_code == 202
+    app.config["GITHUB_WEBHOOK_WORKER"].process_pending()
+    assert processed == []
+
+
+def test_events_are_queued_for_the_worker(client, processed):
+    payload = {"action": "closed", "pull_request": json.loads(PULL_JSON)}
+
+    response = deliver(client, "pull_request", payload)
+
+    assert response.status_code == 202
+    # Nothing happens until the worker gets to it
+    assert processed == []
+    app.config["GITHUB_WEBHOOK_WORKER"].process_pending()
+    assert processed == [("pull_request", payload)]
+
+
+def test_full_queue_is_refused(client, processed):
+    app.config["GITHUB_WEBHOOK_WORKER"] = WebhookWorker(
+        lambda event, payload: None, maxsize=1
+    )
+
+    assert deliver(client, "pull_request", {"action": "opened"}).status_code == 202
+    assert deliver(client, "pull_request", {"action": "opened"}).status_code == 503
+
+
+def test_missing_secret_refuses_everything(client, monkeypatch):
+    app.config["GITHUB_WEBHOOK_SECRET"] = None
+    monkeypatch.delenv("GITHUB_WEBHOOK_SECRET", raising=False)
+
+    assert deliver(client, "pull_request", {}).status_code == 503
+
+
+def test_worker_survives_processing_errors():
+    seen = []
+
+    def process(event, payload):
+        seen.append(event)
+        raise RuntimeError("boom")
+
+    worker = WebhookWorker(process)
+    worker.submit("pull_request", {})
+    worker.submit("pull_request_review", {})
+    worker.process_pending()
+
+    assert seen == ["pull_request", "pull_request_review"]
@@ -0,0 +1,24 @@
+import pytest
+
+from slacker.metrics import metrics
+from slacker.webapp import app
+
+
+@pytest.fixture
+def client():
+    metrics.reset()
+    yield app.test_client()
+    metrics.reset()
+
+
+def test_metrics_endpoint(client):
+    metrics.observe("github_request_seconds", 0.2)
+
+    response = client.get("/metrics")
+
+    assert response.status_code == 200
+    assert response.content_type.startswith("text/plain; version=0.0.4")
+    assert response.get_data(as_text=True) == metrics.render()
+    assert 'github_request_seconds_bucket{le="0.25"} 1' in response.get_data(
+        as_text=True
+    )
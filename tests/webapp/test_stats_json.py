@@ -0,0 +1,91 @@
+import pytest
+from datetime import date, timedelta
+
+from slacker.model import Channel, User
+from slacker.stats import StatsChange, record_changes
+from slacker.webapp import app
+from tests.test_query_plans import captured_statements
+
+DAY = date(2024, 5, 1)
+
+
+@pytest.fixture
+def stats(db_session):
+    jane = User(slack_id="jane", name="Jane", email="jane@example.com")
+    bob = User(slack_id="bob", name="Bob", email="bob@example.com")
+    general = Channel(slack_id="general", name="General", new_devs_are_reviewers=True)
+    db_session.add_all([jane, bob, general])
+    db_session.flush()
+    record_changes(
+        db_session,
+        [
+            StatsChange(DAY, general.id, jane.id, assigned=2),
+            StatsChange(DAY, general.id, bob.id, assigned=1, rerolled=1),
+            StatsChange(
+                DAY, general.id, jane.id, acknowledged=1, acknowledge_seconds=120
+            ),
+            StatsChange(DAY, general.id, jane.id, completed=1, complete_seconds=5400),
+            StatsChange(DAY - timedelta(days=60), general.id, jane.id, assigned=5),
+        ],
+    )
+
+
+@pytest.fixture
+def client(db_session):
+    app.config["DB_SESSION_FACTORY"] = lambda: db_session
+    yield app.test_client()
+    app.config.pop("DB_SESSION_FACTORY")
+
+
+def test_stats(client, stats):
+    response = client.get(f"/stats.json?since={DAY}&until={DAY + timedelta(days=1)}")
+
+    assert response.status_code == 200
+    body = response.get_json()
+    assert body["since"] == "2024-05-01"
+    totals = body["totals"]
+    assert totals["assigned"] == 3
+    assert totals["rerolled"] == 1
+    assert totals["reroll_rate"] == pytest.approx(1 / 3)
+    assert totals["time_to_acknowledge"]["count"] == 1
+    assert totals["time_to_acknowledge"]["mean_seconds"] == 120
+    assert totals["time_to_complete"]["p50_seconds"] == pytest.approx(5400)
+
+
+def test_stats_by_user(client, stats):
+    response = client.get(f"/stats.json?since={DAY}&until=2024-05-02&group_by=user")
+
+    by_user = response.get_json()["user"]
+    assert set(by_user) == {"jane", "bob"}
+    assert by_user["jane"]["completed"] == 1
+    assert by_user["bob"]["rerolled"] == 1
+
+
+def test_stats_for_one_channel_and_user(client, stats):
+    response = client.get(
+        f"/stats.json?since={DAY}&until=2024-05-02&channel=general&user=bob"
+    )
+
+    assert response.get_json()["totals"]["assigned"] == 1
+
+
+def test_stats_default_to_last_30_days(client, stats):
+    response = client.get("/stats.json")
+
+    body = response.get_json()
+    assert body["until"] == (date.today() + timedelta(days=1)).isoformat()
+    assert body["totals"]["assigned"] == 0
+
+
+def test_stats_only_read_rollups(client, db_session, stats):
+    with captured_statements(db_session) as statements:
+        client.get(f"/stats.json?since={DAY}&until=2024-05-02&group_by=channel")
+
+    assert statements
+    assert not any("assigned_reviews" in statement for statement, _ in statements)
+
+
+def test_stats_bad_requests(client, stats):
+    assert client.get("/stats.json?since=yesterday").status_code == 400
+    assert client.get("/stats.json?group_by=team").status_code == 400
+    assert client.get("/stats.json?channel=nowhere").status_code == 404